@@ -1,26 +1,43 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
 from langchain_openai import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
 from dotenv import load_dotenv
 from pathlib import Path
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
 import os
 import re
-import base64
-import requests
-import tempfile
 import time
 import boto3
 import uuid
 import asyncio
-import aiohttp
+import hashlib
+import json
+from contextlib import asynccontextmanager
 from typing import List, Dict, Any
 import openai
-from PIL import Image
-import io
+from llm_client import AsyncLLMClient
+from ttl_cache import TTLCache, DiskTTLCache
+from database import fetch_all, fetch_one, dispose_engine
+from situation_index import SituationIndex
+from outfit_rules import rank_outfit_combinations, format_combinations
+from recommendation_schema import RECOMMENDATION_SCHEMA, load_json_result, repair_structured_result
+from http_client import start_http_session, get_http_session, close_http_session
+from fashn_poller import FashnStatusPoller
+from tryon_graph import TryonStepGraph
+from image_fetcher import ImageFetcher, ImageByteCache
+from image_prep import prepare_image_bytes, to_data_uri
+from rendition_store import RenditionStore
+from s3_store import S3ImageStore
+from virtual_library import VirtualGarmentLibrary, make_library_key
+from virtual_prompts import build_virtual_clothing_prompt
+from closet_index import ClosetIndex
+from closet_prompt import compile_closet, count_tokens
+from request_coalescer import RequestCoalescer
+from observability import TraceMiddleware, start_trace, span, external_call, log, log_event, metrics_payload
+from prometheus_client import Gauge
+from job_store import InMemoryJobStore, SQLiteJobStore, JOB_DONE, JOB_FAILED
 
 # .env 로드
 env_path = Path(__file__).resolve().parent.parent / '.env'
@@ -29,9 +46,28 @@ api_key = os.getenv("OPENAI_API_KEY")
 
 # GPT 초기화
 llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=0.5, api_key=api_key)
+llm_client = AsyncLLMClient(llm)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 외부 HTTP 호출(이미지 다운로드, FASHN)용 공유 커넥션 풀
+    await start_http_session()
+    fashn_poller.start()
+    # 추천 작업 워커 시작 (저장소에 남은 미완료 작업 재개)
+    workers = start_job_workers()
+    yield
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await fashn_poller.stop()
+    # 백그라운드 S3 업로드를 마친 뒤 세션 종료
+    await s3_store.drain()
+    await close_http_session()
+    # 종료 시 DB 커넥션 풀 정리
+    await dispose_engine()
 
 # FastAPI 앱 초기화
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -39,17 +75,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# DB 접속 정보
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_NAME = os.getenv("DB_NAME")
-
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine)
+# 요청 추적 ID + 경로별 소요 시간 (/metrics)
+app.add_middleware(TraceMiddleware)
 
 # 옷 종류 및 카테고리 정의
 CLOTHING_TYPES = {
@@ -139,53 +166,41 @@ class RecommendationRequest(BaseModel):
     status: str
     showClosetOnly: bool
 
-def get_session():
-    """DB 세션 생성"""
-    return SessionLocal()
+# 옷장 스냅샷 캐시 (옷 추가/수정/삭제 시 백엔드가 무효화 엔드포인트 호출)
+CLOSET_CACHE_TTL = int(os.getenv("CLOSET_CACHE_TTL", "600"))
+CLOSET_CACHE_MAXSIZE = int(os.getenv("CLOSET_CACHE_MAXSIZE", "1000"))
+closet_cache = TTLCache(maxsize=CLOSET_CACHE_MAXSIZE, ttl=CLOSET_CACHE_TTL)
+# user_id -> 옷장 변경 횟수 (무효화 엔드포인트 호출 시 증가, 추천 결과 캐시 키에 포함)
+closet_epochs = {}
 
-def load_clothing_types_from_db(user_id: str):
-    """옷장의 옷 종류만 가져오는 함수"""
-    try:
-        session = get_session()
-        query = text("""
-            SELECT DISTINCT type, category
-            FROM clothes
-            WHERE user_id = :user_id
-        """)
-        
-        result = session.execute(query, {"user_id": user_id}).fetchall()
-        
-        items = []
-        for row in result:
-            type_name = row[0].strip().upper()
-            category = row[1].strip().upper()
-            
-            if type_name in CATEGORY_MAP and category in CATEGORY_MAP[type_name]:
-                items.append({"type": type_name, "category": category})
-        
-        return items
-    except Exception as e:
-        print(f"[ERROR] 데이터베이스 조회 중 오류 발생: {e}")
-        return []
-    finally:
-        session.close()
+async def load_closet_snapshot(user_id: str):
+    """옷장을 한 번만 조회해서 옷 종류 목록과 상세 정보를 함께 반환 (사용자별 캐시)"""
+    cache_key = str(user_id)
+    snapshot = closet_cache.get(cache_key)
+    if snapshot is not None:
+        return snapshot
 
-def load_clothing_details_from_db(user_id: str):
-    """옷의 상세 정보를 가져오는 함수"""
     try:
-        session = get_session()
-        query = text("""
+        result = await fetch_all("""
             SELECT id, type, category, pattern, color, image_url
             FROM clothes
             WHERE user_id = :user_id
-        """)
-        
-        result = session.execute(query, {"user_id": user_id}).fetchall()
+        """, {"user_id": user_id})
         
+        types = []
+        seen_types = set()
         items = []
         for row in result:
             type_name = row[1].strip().upper()
             category = row[2].strip().upper()
+
+            # 옷 종류 목록 (첫 번째 프롬프트용)
+            if type_name in CATEGORY_MAP and category in CATEGORY_MAP[type_name]:
+                if (type_name, category) not in seen_types:
+                    seen_types.add((type_name, category))
+                    types.append({"type": type_name, "category": category})
+
+            # 옷 상세 정보 (두 번째 프롬프트 및 가상 피팅용)
             tone = TONE_MAP.get(row[4].strip().upper(), "고려하지 않음")
             image_url = row[5].strip()
 
@@ -202,25 +217,22 @@ def load_clothing_details_from_db(user_id: str):
                     "image_url": image_url
                 }
             })
-        
-        return items
     except Exception as e:
-        print(f"[ERROR] 데이터베이스 조회 중 오류 발생: {e}")
-        return []
-    finally:
-        session.close()
+        log(f"데이터베이스 조회 중 오류 발생: {e}", "ERROR")
+        return {"types": [], "items": []}
 
-def load_user_data(user_id: str):
+    snapshot = {"types": types, "items": items}
+    closet_cache.set(cache_key, snapshot)
+    return snapshot
+
+async def load_user_data(user_id: str):
     """사용자 정보 로드 함수"""
     try:
-        session = get_session()
-        query = text("""
+        result = await fetch_one("""
             SELECT id, gender, age, height, weight, skin_tone, body_image_url
             FROM users
             WHERE id = :user_id
-        """)
-        
-        result = session.execute(query, {"user_id": user_id}).fetchone()
+        """, {"user_id": user_id})
         
         if result:
             user_data = {
@@ -232,10 +244,8 @@ def load_user_data(user_id: str):
         else:
             return None
     except Exception as e:
-        print(f"[ERROR] 사용자 데이터 조회 중 오류 발생: {e}")
+        log(f"사용자 데이터 조회 중 오류 발생: {e}", "ERROR")
         return None
-    finally:
-        session.close()
 
 def get_season_guide(avg_temp):
     """기온에 따른 계절 가이드 반환"""
@@ -333,9 +343,62 @@ def create_gpt_prompt(situation, user_data, available_types_str, target_time, ta
     조합 3: TOP: [옷종류], BOTTOM: [옷종류]
     """
 
-def ask_gpt_for_recommendation(situation, user_data, available_types_str, target_time, target_place, 
+# 1단계 GPT 조합 추천 캐시 (COMBINATION_CACHE_PATH 설정 시 SQLite 디스크 캐시 사용)
+COMBINATION_CACHE_TTL = int(os.getenv("COMBINATION_CACHE_TTL", "21600"))
+COMBINATION_CACHE_MAXSIZE = int(os.getenv("COMBINATION_CACHE_MAXSIZE", "5000"))
+COMBINATION_CACHE_PATH = os.getenv("COMBINATION_CACHE_PATH")
+if COMBINATION_CACHE_PATH:
+    combination_cache = DiskTTLCache(COMBINATION_CACHE_PATH, maxsize=COMBINATION_CACHE_MAXSIZE, ttl=COMBINATION_CACHE_TTL)
+else:
+    combination_cache = TTLCache(maxsize=COMBINATION_CACHE_MAXSIZE, ttl=COMBINATION_CACHE_TTL)
+
+# 자유 입력 상황 문자열을 이전에 본 대표 상황으로 매핑 (유사 상황끼리 조합 캐시 공유)
+situation_index = SituationIndex()
+
+def normalize_text(value) -> str:
+    """공백/대소문자 차이를 없앤 비교용 문자열"""
+    return " ".join(str(value or "").split()).lower()
+
+def get_rain_band(rain_percent):
+    """강수확률 구간"""
+    if rain_percent >= 60:
+        return "RAIN"
+    elif rain_percent >= 30:
+        return "MAYBE"
+    return "DRY"
+
+def build_combination_cache_key(situation, user_data, available_types_str, target_time, target_place,
+                                high_temp, low_temp, rain_percent, status, is_closet_only=True):
+    """1단계 조합 추천 입력을 구간화/정규화한 캐시 키 생성"""
+    avg_temp = (high_temp + low_temp) / 2
+    # 옷장 옷 종류는 줄 순서와 무관하게 비교
+    closet_types = sorted(line.strip() for line in available_types_str.splitlines() if line.strip()) if is_closet_only else []
+
+    context = {
+        "gender": user_data["gender"],
+        "skin_tone": user_data["skin_tone"],
+        "season": get_season_guide(avg_temp)["guide"],
+        "rain": get_rain_band(rain_percent),
+        "status": normalize_text(status),
+        "situation": situation_index.canonicalize(situation),
+        "place": normalize_text(target_place),
+        "time": normalize_text(target_time),
+        "closet_only": bool(is_closet_only),
+        "closet_types": closet_types
+    }
+    raw_key = json.dumps(context, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+async def ask_gpt_for_recommendation(situation, user_data, available_types_str, target_time, target_place, 
                               high_temp, low_temp, rain_percent, status, is_closet_only=True):
-    """GPT에 추천 요청"""
+    """GPT에 추천 요청 (같은 구간의 상황이면 캐시된 조합 재사용)"""
+    cache_key = build_combination_cache_key(situation, user_data, available_types_str, target_time, target_place,
+                                            high_temp, low_temp, rain_percent, status, is_closet_only)
+    cached = await combination_cache.aget(cache_key)
+    if cached is not None:
+        log("GPT 조합 추천 캐시 사용")
+        return cached
+
     prompt = create_gpt_prompt(situation, user_data, available_types_str, target_time, target_place,
                               high_temp, low_temp, rain_percent, status, is_closet_only)
     
@@ -344,12 +407,39 @@ def ask_gpt_for_recommendation(situation, user_data, available_types_str, target
         HumanMessage(content=prompt)
     ]
     
-    response = llm.invoke(messages).content
+    with span("gpt_stage1"):
+        response = await llm_client.ainvoke(messages)
+    await combination_cache.aset(cache_key, response)
     return response
 
-def ask_gpt_for_best_clothing_sets(situation, organized_clothes, recommended_combinations, is_closet_only, 
+# 1단계 조합 추천 엔진 (gpt: GPT 호출, rules: 로컬 규칙 기반 점수 계산)
+COMBINATION_ENGINE = os.getenv("COMBINATION_ENGINE", "gpt").lower()
+
+async def get_recommended_combinations(request: RecommendationRequest, user_data, available_types, available_types_str):
+    """설정된 엔진으로 1단계 카테고리 조합 추천"""
+    is_closet_only = request.showClosetOnly
+    if COMBINATION_ENGINE == "rules":
+        avg_temp = (request.highTemperature + request.lowTemperature) / 2
+        situation_text = f"{request.situation} {request.targetPlace} {request.targetTime}"
+        combinations = rank_outfit_combinations(
+            user_data["gender"], avg_temp, request.rainPercent, situation_text,
+            available_types, is_closet_only
+        )
+        return format_combinations(combinations)
+
+    return await ask_gpt_for_recommendation(
+        request.situation, user_data, available_types_str if is_closet_only else "", request.targetTime,
+        request.targetPlace, request.highTemperature, request.lowTemperature,
+        request.rainPercent, request.status, is_closet_only
+    )
+
+# 두 번째 GPT 프롬프트의 옷장 목록 토큰 예산과 카테고리별 최대 옷 수
+CLOSET_PROMPT_TOKEN_BUDGET = int(os.getenv("CLOSET_PROMPT_TOKEN_BUDGET", "600"))
+CLOSET_PROMPT_MAX_PER_CATEGORY = int(os.getenv("CLOSET_PROMPT_MAX_PER_CATEGORY", "15"))
+
+async def ask_gpt_for_best_clothing_sets(situation, organized_clothes, recommended_combinations, is_closet_only, 
                                   user_data, target_time, target_place, high_temp, low_temp, rain_percent, status):
-    """GPT에 옷장 기반 최종 추천 요청"""
+    """GPT에 옷장 기반 최종 추천 요청 (옷장 목록은 토큰 예산에 맞게 압축, 응답의 짧은 ID는 실제 ID로 복원)"""
     gender = "여성" if user_data["gender"] == "FEMALE" else "남성"
     skin_tone = {
         "COOL": "쿨톤", "WARM": "웜톤", "NEUTRAL": "뉴트럴톤"
@@ -358,20 +448,14 @@ def ask_gpt_for_best_clothing_sets(situation, organized_clothes, recommended_com
     avg_temp = (high_temp + low_temp) / 2
     season_info = get_season_guide(avg_temp)
     
-    # 카테고리별 옷 리스트를 문자열로 변환
-    clothing_list_str = ""
-    for clothing_type, categories in organized_clothes.items():
-        if categories:
-            clothing_list_str += f"\n{clothing_type}:\n"
-            for category, items in categories.items():
-                clothing_list_str += f"  {category}:\n"
-                for item in items:
-                    clothing_list_str += f"    - {item['id']} ({item['category']}, {item['pattern']}, {item['tone']})\n"
-    
-    closet_rule = """
-        각 추천 조합에 대해, 위의 모든 상황과 사용자의 신체 정보를 고려하여 옷장에서 가장 적절한 옷을 하나씩 선택해주세요.
-        **특히 기온({avg_temp:.1f}°C)에 맞는 계절의 옷을 우선적으로 선택해주세요.**
-        
+    # 옷장 목록 압축 (짧은 ID, 같은 패턴/톤 묶음, 예산 초과 시 카테고리별 상위 N벌)
+    compiled = compile_closet(
+        organized_clothes, recommended_combinations,
+        token_budget=CLOSET_PROMPT_TOKEN_BUDGET, max_per_category=CLOSET_PROMPT_MAX_PER_CATEGORY
+    )
+
+    # 추천 이유 작성 가이드 (두 모드 공통)
+    reason_guide = f"""
         **추천 이유 작성 가이드:**
         각 조합의 이유는 다음 요소들을 포함하여 상세하고 구체적으로 설명해주세요:
         - **날씨 적합성**: 현재 기온({avg_temp:.1f}°C)과 날씨 상태({status})에 어떻게 적합한지
@@ -382,9 +466,14 @@ def ask_gpt_for_best_clothing_sets(situation, organized_clothes, recommended_com
         - **피부톤 고려**: {skin_tone} 피부톤에 어울리는 색상과 스타일
         - **실용성**: 편안함, 활동성, 관리의 용이성 등
         - **스타일링 효과**: 전체적인 이미지와 분위기 연출
-        
+    """
+
+    closet_rule = f"""
+        각 추천 조합에 대해, 위의 모든 상황과 사용자의 신체 정보를 고려하여 옷장에서 가장 적절한 옷을 하나씩 선택해주세요.
+        **특히 기온({avg_temp:.1f}°C)에 맞는 계절의 옷을 우선적으로 선택해주세요.**
+        {reason_guide}
         선택한 옷에 대해 왜 그 옷이 상황과 사용자에게 적절한지 상세히 설명해주세요.
-    """ if is_closet_only else """
+    """ if is_closet_only else f"""
         각 추천 조합에 대해, 다음 규칙을 따라 응답해주세요:
         1. 옷장에 있는 옷이면 해당 옷의 ID를 사용하고, 없는 옷이면 "추천: [옷종류] ([패턴], [톤])" 형식으로 표시
         2. **상의+하의 조합에서는 상의와 하의를 각각 독립적으로 선택할 수 있습니다.** 
@@ -398,17 +487,7 @@ def ask_gpt_for_best_clothing_sets(situation, organized_clothes, recommended_com
         6. **특히 기온({avg_temp:.1f}°C)에 맞는 계절의 옷을 우선적으로 선택해주세요.**
         7. 옷장에 없는 옷을 추천한 경우, 왜 그 옷이 필요한지 구체적으로 설명해주세요
         8. **피부톤({skin_tone})에 어울리는 패턴과 톤을 고려해주세요.**
-        
-        **추천 이유 작성 가이드:**
-        각 조합의 이유는 다음 요소들을 포함하여 상세하고 구체적으로 설명해주세요:
-        - **날씨 적합성**: 현재 기온({avg_temp:.1f}°C)과 날씨 상태({status})에 어떻게 적합한지
-        - **상황 적합성**: {situation} 상황에서 왜 이 조합이 적절한지
-        - **시간대 고려**: {target_time} 시간대에 맞는 스타일링 포인트
-        - **장소 적합성**: {target_place} 장소에서의 이미지와 분위기
-        - **신체 정보 활용**: {gender}, {user_data["age"]}세, 키 {user_data["height"]}cm, 체중 {user_data["weight"]}kg에 맞는 스타일링
-        - **피부톤 고려**: {skin_tone} 피부톤에 어울리는 색상과 스타일
-        - **실용성**: 편안함, 활동성, 관리의 용이성 등
-        - **스타일링 효과**: 전체적인 이미지와 분위기 연출
+        {reason_guide}
     """
     
     prompt = f"""
@@ -431,7 +510,7 @@ def ask_gpt_for_best_clothing_sets(situation, organized_clothes, recommended_com
     {recommended_combinations}
 
     그리고 아래는 옷장에 있는 옷들입니다:
-    {clothing_list_str}
+    {compiled.text}
 
     {closet_rule}
 
@@ -452,13 +531,16 @@ def ask_gpt_for_best_clothing_sets(situation, organized_clothes, recommended_com
     이유: [상세하고 구체적인 이유 - 위 가이드에 따라 작성]
     """
 
+    log(f"옷장 매칭 프롬프트 토큰 - 전체 {count_tokens(prompt)}, 옷장 {compiled.stats}")
+
     messages = [
         SystemMessage(content="당신은 패션 코디 전문가입니다."),
         HumanMessage(content=prompt)
     ]
     
-    response = llm.invoke(messages).content
-    return response
+    with span("gpt_stage2"):
+        response = await llm_client.ainvoke(messages)
+    return compiled.expand_ids(response)
 
 def parse_gpt_result(text: str):
     """GPT 응답 파싱 함수"""
@@ -520,198 +602,190 @@ def convert_combination_to_korean(combination: str) -> str:
     # 변환할 수 없는 경우 원본 반환
     return combination
 
-def get_clothing_links(selected_clothing, clothing_data, virtual_clothing_urls=None):
-    """옷 ID에서 링크 정보를 찾는 함수"""
+# 추천 모드 (two_stage: 조합 추천 + 옷장 매칭 2회 호출, single: 구조화 JSON 1회 호출)
+RECOMMENDATION_MODE = os.getenv("RECOMMENDATION_MODE", "two_stage").lower()
+
+# structured output을 쓸 수 없을 때 일반 응답으로 같은 형식의 JSON을 받기 위한 시스템 프롬프트
+STRUCTURED_FALLBACK_SYSTEM_PROMPT = f"""당신은 패션 코디 전문가입니다. 설명이나 코드 블록 없이 아래 JSON 스키마를 따르는 JSON 객체 하나만 응답해주세요.
+
+{json.dumps(RECOMMENDATION_SCHEMA, ensure_ascii=False)}
+
+- 최상위 필드는 summary(문자열)와 outfits(배열) 두 개뿐입니다.
+- outfits의 각 항목은 combination_type("TOP_BOTTOM" 또는 "ONEPIECE"), top, bottom, onepiece, reason 필드를 모두 가집니다.
+- top/bottom/onepiece는 사용하지 않으면 null, 사용하면 clothing_id(옷장 옷ID 문자열, 옷장에 없는 옷이면 null), category, pattern, tone 필드를 가진 객체입니다.
+- category, pattern, tone은 스키마의 enum 값 중 하나를 대문자 그대로 사용해주세요."""
+
+async def ask_gpt_for_structured_recommendation(request: RecommendationRequest, user_data, closet: ClosetIndex):
+    """옷장과 상황을 한 번에 보내고 JSON 스키마로 조합/옷 선택/이유를 받는 단일 호출 추천"""
+    is_closet_only = request.showClosetOnly
+    gender = "여성" if user_data["gender"] == "FEMALE" else "남성"
+    skin_tone = {
+        "COOL": "쿨톤", "WARM": "웜톤", "NEUTRAL": "뉴트럴톤"
+    }.get(user_data["skin_tone"], "뉴트럴톤")
+
+    avg_temp = (request.highTemperature + request.lowTemperature) / 2
+    season_info = get_season_guide(avg_temp)
+
+    clothing_list_str = ""
+    for clothing_type, categories in organize_clothing_by_category(closet.items).items():
+        if categories:
+            clothing_list_str += f"\n{clothing_type}:\n"
+            for category, items in categories.items():
+                clothing_list_str += f"  {category}:\n"
+                for item in items:
+                    clothing_list_str += f"    - {item['id']} ({item['category']}, {item['pattern']}, {item['tone']})\n"
+
+    closet_rule = """
+    - 반드시 옷장에 있는 옷의 clothing_id만 선택해주세요. 옷장에 없는 옷은 추천하지 마세요.
+    """ if is_closet_only else """
+    - 옷장에 있는 옷이면 clothing_id를 넣고, 옷장에 없는 옷이면 clothing_id는 null로 두고 category, pattern, tone을 지정해주세요.
+    - 상의와 하의는 각각 독립적으로 옷장 옷 또는 옷장에 없는 옷을 선택할 수 있습니다.
+    - 옷장에 없는 옷을 추천한 경우, 왜 그 옷이 필요한지 이유에 구체적으로 설명해주세요.
+    """
+
+    prompt = f"""
+    상황: {request.situation}
+    성별: {gender}
+    나이: {user_data["age"]}세
+    키: {user_data["height"]}cm
+    체중: {user_data["weight"]}kg
+    피부톤: {skin_tone}
+    시간: {request.targetTime}
+    장소: {request.targetPlace}
+    기온: {request.highTemperature}°C ~ {request.lowTemperature}°C (평균 {avg_temp:.1f}°C)
+    강수확률: {request.rainPercent}%
+    날씨상태: {request.status}
+
+    **계절별 옷 추천 가이드:**
+    {season_info["guide"]}
+
+    **현재 기온({avg_temp:.1f}°C)에 적합한 카테고리별 추천:**
+    - TOP: {season_info["top"]}
+    - BOTTOM: {season_info["bottom"]}
+    - ONEPIECE: {season_info["onepiece"]}
+
+    아래는 옷장에 있는 옷들입니다 (옷ID (종류, 패턴, 톤)):
+    {clothing_list_str or "    (없음)"}
+
+    위 상황과 사용자의 신체 정보를 고려하여 가장 적합한 옷 조합을 3개 추천해주세요.
+    - 조합은 TOP_BOTTOM(상의 1벌 + 하의 1벌) 또는 ONEPIECE(원피스 1벌, 여성인 경우에만) 중 하나입니다.
+    - 사용하지 않는 항목(top/bottom/onepiece)은 null로 두세요.
+    - **남성인 경우 3개 조합 모두 TOP_BOTTOM으로 추천해주세요.**
+    - 기온({avg_temp:.1f}°C)에 맞는 계절의 옷과 피부톤({skin_tone})에 어울리는 색상을 우선적으로 고려해주세요.
+    {closet_rule}
+    summary는 "20XX년 X월 X일에 [장소]에서 [상황]을 위한 스타일링" 형식으로 작성해주세요.
+    reason은 날씨, 상황, 시간대, 장소, 신체 정보, 피부톤, 실용성을 고려해 한국어로 상세히 작성해주세요.
+    """
+
+    messages = [
+        SystemMessage(content="당신은 패션 코디 전문가입니다. 주어진 JSON 스키마에 맞춰서만 응답해주세요."),
+        HumanMessage(content=prompt)
+    ]
+
+    with span("gpt_structured"):
+        try:
+            raw = await llm_client.ainvoke_structured(messages, RECOMMENDATION_SCHEMA)
+        except Exception as e:
+            # structured output을 지원하지 않거나 스키마 검증에 실패한 경우 일반 응답에서 JSON 추출
+            # (스키마를 강제할 수 없으므로 필드 이름과 형식을 프롬프트에 직접 명시)
+            log(f"구조화 응답 실패, 일반 응답으로 재시도: {e}", "WARN")
+            fallback_messages = [SystemMessage(content=STRUCTURED_FALLBACK_SYSTEM_PROMPT), HumanMessage(content=prompt)]
+            raw = load_json_result(await llm_client.ainvoke(fallback_messages))
+            if raw is None:
+                log("일반 응답에서 추천 JSON을 찾지 못했습니다", "ERROR")
+
+    result = repair_structured_result(raw, closet, is_closet_only, user_data["gender"])
+    for outfit in result["outfits"]:
+        outfit["combination"] = convert_combination_to_korean(outfit["combination"])
+    return result
+
+def get_clothing_links(selected_clothing, closet: ClosetIndex):
+    """조합의 옷(상의 + 하의, 원피스, 가상 옷)별 링크 정보 (옷장 인덱스에서 바로 조회)"""
     links = []
-    
-    # 상의 + 하의 조합인 경우 (혼합 조합 처리)
-    if " + " in selected_clothing:
-        top_part, bottom_part = selected_clothing.split(" + ")
-        
-        # 상의 처리
-        if top_part.startswith("추천:"):
-            # 상의는 가상 옷
-            if virtual_clothing_urls:
-                top_type = re.sub(r'\s*\([^)]+\)', '', top_part).replace("추천: ", "").strip()
-                for virtual_item in virtual_clothing_urls:
-                    if virtual_item["type"] == top_type:
-                        link_info = {
-                            "id": None,  # 가상 옷이므로 ID 없음
-                            "category": top_type,
-                            "image_url": virtual_item["url"]
-                        }
-                        links.append(link_info)
-                        break
-        else:
-            # 상의는 옷장 옷
-            top_id = top_part.split(" ")[0]
-            for item in clothing_data:
-                if item['clothing_id'] == top_id:
-                    link_info = {
-                        "id": top_id,
-                        "category": item['attributes']['category'],
-                        "image_url": item['attributes']['image_url']
-                    }
-                    links.append(link_info)
-                    break
-        
-        # 하의 처리
-        if bottom_part.startswith("추천:"):
-            # 하의는 가상 옷
-            if virtual_clothing_urls:
-                bottom_type = re.sub(r'\s*\([^)]+\)', '', bottom_part).replace("추천: ", "").strip()
-                for virtual_item in virtual_clothing_urls:
-                    if virtual_item["type"] == bottom_type:
-                        link_info = {
-                            "id": None,  # 가상 옷이므로 ID 없음
-                            "category": bottom_type,
-                            "image_url": virtual_item["url"]
-                        }
-                        links.append(link_info)
-                        break
-        else:
-            # 하의는 옷장 옷
-            bottom_id = bottom_part.split(" ")[0]
-            for item in clothing_data:
-                if item['clothing_id'] == bottom_id:
-                    link_info = {
-                        "id": bottom_id,
-                        "category": item['attributes']['category'],
-                        "image_url": item['attributes']['image_url']
-                    }
-                    links.append(link_info)
-                    break
-        
-        return links
-    
-    # 단일 옷인 경우 (원피스 또는 단일 가상 옷)
-    if selected_clothing.startswith("추천:"):
-        # 가상 옷인 경우
-        if virtual_clothing_urls:
-            clothing_type = re.sub(r'\s*\([^)]+\)', '', selected_clothing).replace("추천: ", "").strip()
-            for virtual_item in virtual_clothing_urls:
-                if virtual_item["type"] == clothing_type:
-                    link_info = {
-                        "id": None,  # 가상 옷이므로 ID 없음
-                        "category": clothing_type,
-                        "image_url": virtual_item["url"]
-                    }
-                    links.append(link_info)
-                    break
-        return links
-    
-    # 원피스인 경우 (옷장 옷)
-    clothing_id = selected_clothing.split(" ")[0]
-    for item in clothing_data:
-        if item['clothing_id'] == clothing_id:
-            link_info = {
-                "id": clothing_id,
-                "category": item['attributes']['category'],
-                "image_url": item['attributes']['image_url']
-            }
+    for part in selected_clothing.split(" + "):
+        link_info = closet.link(part)
+        if link_info is not None:
             links.append(link_info)
-            break
-    
     return links
 
 # FASHN API 설정
 API_KEY = os.getenv("FASHN_API_KEY")
 if not API_KEY:
     raise ValueError("FASHN API 키가 설정되지 않았습니다. .env 파일을 확인해주세요.")
-BASE_URL = "https://api.fashn.ai/v1"
+BASE_URL = os.getenv("FASHN_BASE_URL", "https://api.fashn.ai/v1")
+
+# 진행 중인 모든 예측의 상태를 조회하는 공유 폴러
+fashn_poller = FashnStatusPoller(BASE_URL, API_KEY, get_http_session)
+
+# 가상 피팅 결과 캐시 (리사이즈된 모델/의류 이미지 해시 + 카테고리 + 모드 -> S3 URL)
+TRYON_MODE = "quality"
+TRYON_CACHE_TTL = int(os.getenv("TRYON_CACHE_TTL", str(30 * 24 * 3600)))
+TRYON_CACHE_MAXSIZE = int(os.getenv("TRYON_CACHE_MAXSIZE", "20000"))
+TRYON_CACHE_PATH = os.getenv("TRYON_CACHE_PATH")
+if TRYON_CACHE_PATH:
+    tryon_cache = DiskTTLCache(TRYON_CACHE_PATH, maxsize=TRYON_CACHE_MAXSIZE, ttl=TRYON_CACHE_TTL)
+else:
+    tryon_cache = TTLCache(maxsize=TRYON_CACHE_MAXSIZE, ttl=TRYON_CACHE_TTL)
+
+def build_tryon_cache_key(model_jpeg, garment_jpeg, category, mode=TRYON_MODE):
+    """이미지 내용 해시 기반 가상 피팅 캐시 키 (같은 이미지면 URL/사용자가 달라도 같은 키)"""
+    model_digest = hashlib.sha256(model_jpeg).hexdigest()
+    garment_digest = hashlib.sha256(garment_jpeg).hexdigest()
+    return f"{model_digest}:{garment_digest}:{category}:{mode}"
 
 # AWS S3 설정
 s3_client = boto3.client('s3')
 BUCKET_NAME = 'amzn-s3-fitu-bucket'
 RESULT_FOLDER = 'FASHNAI_result/'
 
-def encode_image_to_base64(image_path):
-    """이미지를 Base64로 인코딩"""
-    try:
-        with open(image_path, "rb") as image_file:
-            binary_data = image_file.read()
-            encoded = base64.b64encode(binary_data)
-            return encoded.decode('utf-8')
-    except Exception as e:
-        print(f"[ERROR] Base64 인코딩 실패: {e}")
-        raise
-
-def resize_image_for_fashn(image_path, max_size=640):
-    """FASHN API용으로 이미지 크기 조정"""
-    try:
-        with Image.open(image_path) as img:
-            # 이미지가 RGB 모드가 아니면 변환
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # 원본 크기
-            width, height = img.size
-            
-            # 비율 유지하면서 크기 조정
-            if width > height:
-                new_width = max_size
-                new_height = int(height * (max_size / width))
-            else:
-                new_height = max_size
-                new_width = int(width * (max_size / height))
-            
-            # 이미지 리사이즈
-            resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # 임시 파일로 저장
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                resized_img.save(tmp_file.name, 'JPEG', quality=85, optimize=True)
-                return tmp_file.name
-                
-    except Exception as e:
-        print(f"[ERROR] 이미지 리사이즈 실패: {e}")
-        return image_path  # 실패시 원본 반환
-
-def save_image_to_s3(image_url: str, user_id: str, folder: str = RESULT_FOLDER) -> tuple:
-    """이미지를 S3에 저장"""
-    try:
-        response = requests.get(image_url)
-        if response.status_code != 200:
-            return None, "이미지 다운로드 실패"
-
-        timestamp = int(time.time())
-        file_name = f"{folder}{user_id}_{timestamp}_{uuid.uuid4()}.jpg"
-
-        s3_client.put_object(
-            Bucket=BUCKET_NAME,
-            Key=file_name,
-            Body=response.content,
-            ContentType='image/jpeg'
-        )
+# 저장한 객체의 공개 URL 접두사 (로컬 S3 대역으로 부하 테스트할 때 변경)
+S3_PUBLIC_BASE_URL = os.getenv("S3_PUBLIC_BASE_URL", f"https://{BUCKET_NAME}.s3.ap-northeast-2.amazonaws.com")
 
-        s3_url = f"https://{BUCKET_NAME}.s3.ap-northeast-2.amazonaws.com/{file_name}"
-        return s3_url, None
+s3_store = S3ImageStore(s3_client, BUCKET_NAME, S3_PUBLIC_BASE_URL, get_http_session)
 
-    except Exception as e:
-        return None, f"S3 저장 중 오류 발생: {str(e)}"
+async def save_image_to_s3(image_url: str, user_id: str, folder: str = RESULT_FOLDER, image_fetcher: ImageFetcher = None, on_uploaded=None) -> tuple:
+    """이미지를 S3에 저장 (image_fetcher가 있으면 저장한 바이트를 등록해 다음 단계에서 다시 받지 않음)"""
+    timestamp = int(time.time())
+    file_name = f"{folder}{user_id}_{timestamp}_{uuid.uuid4()}.jpg"
+    with external_call("s3", "save", stage="s3") as call:
+        s3_url, error = await s3_store.save(image_url, file_name, image_fetcher=image_fetcher, on_uploaded=on_uploaded)
+        if error:
+            call.fail(error)
+    return s3_url, error
 
-async def process_virtual_tryon_async(model_image_path, garment_image_path, category, user_id):
-    """가상 피팅 처리"""
+async def process_virtual_tryon_async(model_image, garment_image, category, user_id, image_fetcher: ImageFetcher = None, garment_prepared: bool = False):
+    """가상 피팅 처리 (모델/의류 이미지 바이트 입력, garment_prepared면 의류는 이미 FASHN용 렌디션)"""
     try:
-        print(f"[INFO] FASHN API 가상 피팅 시작 - 카테고리: {category}")
+        log(f"FASHN API 가상 피팅 시작 - 카테고리: {category}")
         
-        # 이미지 리사이즈 (FASHN API 제한에 맞춤)
-        resized_model_path = resize_image_for_fashn(model_image_path)
-        resized_garment_path = resize_image_for_fashn(garment_image_path)
-        
-        model_image_base64 = encode_image_to_base64(resized_model_path)
-        garment_image_base64 = encode_image_to_base64(resized_garment_path)
+        # 이미지 리사이즈 (FASHN API 제한에 맞춤, 메모리에서 처리)
+        with span("image_prep"):
+            if garment_prepared:
+                model_jpeg = await asyncio.to_thread(prepare_image_bytes, model_image)
+                garment_jpeg = garment_image
+            else:
+                model_jpeg, garment_jpeg = await asyncio.gather(
+                    asyncio.to_thread(prepare_image_bytes, model_image),
+                    asyncio.to_thread(prepare_image_bytes, garment_image)
+                )
 
         # 카테고리 매핑
         category_mapping = {"tops": "tops", "bottoms": "bottoms", "one-pieces": "one-pieces"}
         mapped_category = category_mapping.get(category, "auto")
 
+        # 같은 모델/의류 이미지 조합을 이미 피팅했다면 저장된 결과 재사용
+        cache_key = build_tryon_cache_key(model_jpeg, garment_jpeg, mapped_category)
+        cached_url = await tryon_cache.aget(cache_key)
+        if cached_url is not None:
+            log(f"가상 피팅 캐시 사용 - 카테고리: {category}")
+            return cached_url, None
+
         # API 요청 데이터 준비
         input_data = {
-            "model_image": f"data:image/jpeg;base64,{model_image_base64}",
-            "garment_image": f"data:image/jpeg;base64,{garment_image_base64}",
+            "model_image": to_data_uri(model_jpeg),
+            "garment_image": to_data_uri(garment_jpeg),
             "category": mapped_category,
-            "mode": "quality",
+            "mode": TRYON_MODE,
             "garment_photo_type": "auto",
             "num_samples": 1
         }
@@ -721,54 +795,41 @@ async def process_virtual_tryon_async(model_image_path, garment_image_path, cate
             "Authorization": f"Bearer {API_KEY}"
         }
 
-        async with aiohttp.ClientSession() as session:
-            # 1. /run 엔드포인트로 요청
+        session = get_http_session()
+        # 1. /run 엔드포인트로 요청
+        with external_call("fashn", "run", stage="fashn_submit") as call:
             async with session.post(f"{BASE_URL}/run", json=input_data, headers=headers) as run_response:
                 if run_response.status != 200:
                     error_text = await run_response.text()
+                    call.fail(f"HTTP {run_response.status}")
                     return None, f"API 호출 실패: {run_response.status}, message='{error_text}', url='{run_response.url}'"
-                
+
                 run_data = await run_response.json()
                 prediction_id = run_data.get("id")
                 if not prediction_id:
+                    call.fail("예측 ID 없음")
                     return None, "예측 ID를 받지 못했습니다"
                 
-                # 2. 상태 확인 및 결과 대기
-                while True:
-                    async with session.get(f"{BASE_URL}/status/{prediction_id}", headers=headers) as status_response:
-                        if status_response.status != 200:
-                            error_text = await status_response.text()
-                            return None, f"상태 확인 실패: {error_text}"
-                        
-                        status_data = await status_response.json()
-
-                        if status_data["status"] == "completed":
-                            result_url = status_data["output"][0] if isinstance(status_data["output"], list) else status_data["output"]
-                            
-                            # S3에 이미지 저장
-                            s3_url, error = save_image_to_s3(result_url, user_id)
-                            if error:
-                                return None, error
-                                
-                            print(f"[INFO] FASHN API 가상 피팅 완료 - 카테고리: {category}")
-                            return s3_url, None
-
-                        elif status_data["status"] in ["starting", "in_queue", "processing"]:
-                            await asyncio.sleep(3)
-                        else:
-                            return None, f"예측 실패: {status_data.get('error')}"
-
-        # 임시 리사이즈된 이미지 파일들 삭제
-        if resized_model_path != model_image_path:
-            try:
-                os.unlink(resized_model_path)
-            except:
-                pass
-        if resized_garment_path != garment_image_path:
-            try:
-                os.unlink(resized_garment_path)
-            except:
-                pass
+        # 2. 공유 폴러에서 상태 확인 및 결과 대기 (FASHN 대기열 + 처리 시간)
+        with span("fashn_wait") as wait_span:
+            status_data, error = await fashn_poller.wait(prediction_id)
+            if error:
+                wait_span.fail(error)
+        if error:
+            return None, error
+
+        result_url = status_data["output"][0] if isinstance(status_data["output"], list) else status_data["output"]
+
+        # S3에 이미지 저장 (업로드가 실제로 끝난 URL만 캐시)
+        s3_url, error = await save_image_to_s3(
+            result_url, user_id, image_fetcher=image_fetcher,
+            on_uploaded=lambda url: run_in_background(tryon_cache.aset(cache_key, url))
+        )
+        if error:
+            return None, error
+
+        log(f"FASHN API 가상 피팅 완료 - 카테고리: {category}")
+        return s3_url, None
 
     except Exception as e:
         return None, f"예상치 못한 에러가 발생했습니다: {e}"
@@ -776,85 +837,45 @@ async def process_virtual_tryon_async(model_image_path, garment_image_path, cate
 # OpenAI 설정 추가
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-async def generate_virtual_clothing_with_dalle(clothing_type, description, user_id):
-    """DALL-E로 가상 옷 생성 (비동기)"""
+def parse_virtual_clothing_item(item):
+    """"추천: TSHIRT (STRIPE, DARK)" -> (옷 종류, 패턴, 톤) (패턴/톤이 없으면 PLAIN, LIGHT)"""
+    clothing_type = re.sub(r'\s*\([^)]+\)', '', item).replace("추천: ", "").strip()
+    pattern_match = re.search(r'\(([^,]+),\s*([^)]+)\)', item)
+    if pattern_match:
+        return clothing_type, pattern_match.group(1).strip(), pattern_match.group(2).strip()
+    return clothing_type, "PLAIN", "LIGHT"
+
+async def generate_virtual_clothing_with_dalle(clothing_type, description, user_id, image_fetcher: ImageFetcher = None, on_uploaded=None):
+    """DALL-E로 가상 옷 생성 (비동기, on_uploaded(S3 URL)는 S3 업로드가 실제로 끝난 뒤 호출)"""
     try:
-        print(f"[INFO] DALL-E 가상 옷 생성 시작 - {clothing_type}")
+        log(f"DALL-E 가상 옷 생성 시작 - {clothing_type}")
         
-        # 패턴과 톤 정보 추출
-        pattern = "PLAIN"  # 기본값
-        tone = "LIGHT"     # 기본값
+        # "추천: TSHIRT (STRIPE, DARK)" 형식에서 옷 종류, 패턴, 톤 추출
+        clothing_type, pattern, tone = parse_virtual_clothing_item(clothing_type)
         
-        # "추천: TSHIRT (STRIPE, DARK)" 형식에서 패턴과 톤 추출
-        pattern_match = re.search(r'\(([^,]+),\s*([^)]+)\)', clothing_type)
-        if pattern_match:
-            pattern = pattern_match.group(1).strip()
-            tone = pattern_match.group(2).strip()
-            # 순수 옷 종류만 추출
-            clothing_type = re.sub(r'\s*\([^)]+\)', '', clothing_type).replace("추천: ", "").strip()
-        
-        # 패턴별 프롬프트 매핑
-        pattern_prompts = {
-            "PLAIN": "solid color, minimal design",
-            "STRIPE": "striped pattern, clean lines",
-            "CHECK": "checkered pattern, classic design",
-            "DOT": "polka dot pattern, playful design",
-            "ANIMAL": "animal print pattern, bold design",
-            "ARTIFACT": "geometric artifact pattern, artistic design",
-            "ETC": "unique pattern, distinctive design",
-            "NATURE": "nature-inspired pattern, organic design",
-            "GEOMETRIC": "geometric pattern, modern design",
-            "PLANT": "floral pattern, botanical design",
-            "SYMBOL": "symbolic pattern, meaningful design"
-        }
-        
-        # 톤별 색상 매핑
-        tone_colors = {
-            "LIGHT": "light colors, pastel tones, soft hues",
-            "DARK": "dark colors, deep tones, rich hues",
-            "NOT_CONSIDERED": "neutral colors, balanced tones"
-        }
-        
-        # 옷 종류별 프롬프트 생성
-        clothing_prompts = {
-            "BLOUSE": "elegant blouse, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "SHIRT": "classic shirt, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "TSHIRT": "stylish t-shirt, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "SWEATER": "comfortable sweater, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "CARDIGAN": "elegant cardigan, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "JACKET": "stylish jacket, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "COAT": "elegant coat, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "JEANS": "classic jeans, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic denim texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "PANTS": "elegant pants, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "SKIRT": "stylish skirt, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "DRESS": "elegant dress, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
-            "JUMPSUIT": "stylish jumpsuit, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment"
-        }
-        
-        base_prompt = clothing_prompts.get(clothing_type, f"{clothing_type.lower()} laid flat on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment")
-        pattern_prompt = pattern_prompts.get(pattern, "solid color, minimal design")
-        tone_prompt = tone_colors.get(tone, "neutral colors, balanced tones")
-        
-        # 상세 설명 추가
-        full_prompt = f"{base_prompt}, {pattern_prompt}, {tone_prompt}, {description}"
+        full_prompt = build_virtual_clothing_prompt(clothing_type, pattern, tone, description)
         
         # OpenAI 1.0.0+ API 형식으로 수정
         from openai import AsyncOpenAI
         client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         
-        response = await client.images.generate(
-            model="dall-e-3",
-            prompt=full_prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1
-        )
+        with external_call("openai", "image", stage="dalle"):
+            response = await client.images.generate(
+                model="dall-e-3",
+                prompt=full_prompt,
+                size="1024x1024",
+                quality="standard",
+                n=1
+            )
         
         generated_image_url = response.data[0].url
-        print(f"[INFO] DALL-E 가상 옷 생성 완료 - {clothing_type} ({pattern}, {tone})")
+        log(f"DALL-E 가상 옷 생성 완료 - {clothing_type} ({pattern}, {tone})")
         
         # 생성된 이미지를 S3에 저장
-        s3_url, error = save_image_to_s3(generated_image_url, f"{user_id}_virtual_{clothing_type}", "New_clothes_gpt/")
+        s3_url, error = await save_image_to_s3(
+            generated_image_url, f"{user_id}_virtual_{clothing_type}", "New_clothes_gpt/",
+            image_fetcher=image_fetcher, on_uploaded=on_uploaded
+        )
         if error:
             return None, f"가상 옷 이미지 저장 실패: {error}"
             
@@ -863,20 +884,68 @@ async def generate_virtual_clothing_with_dalle(clothing_type, description, user_
     except Exception as e:
         return None, f"DALL-E 가상 옷 생성 실패: {e}"
 
-async def generate_virtual_clothing_batch(clothing_items, user_data, situation):
-    """여러 가상 옷을 동시에 생성"""
+# 사용자 공용 가상 옷 라이브러리 (같은 종류/패턴/톤/설명은 DALL-E를 다시 호출하지 않음)
+VIRTUAL_LIBRARY_PATH = os.getenv("VIRTUAL_LIBRARY_PATH", ":memory:")
+VIRTUAL_LIBRARY_MAXSIZE = int(os.getenv("VIRTUAL_LIBRARY_MAXSIZE", "5000"))
+VIRTUAL_LIBRARY_MAX_VARIANTS = int(os.getenv("VIRTUAL_LIBRARY_MAX_VARIANTS", "4"))
+# 상황별 항목이 없으면 미리 생성한 카탈로그 항목(종류/패턴/톤만으로 식별) 사용
+VIRTUAL_LIBRARY_CATALOG_FALLBACK = os.getenv("VIRTUAL_LIBRARY_CATALOG_FALLBACK", "true").lower() == "true"
+virtual_library = VirtualGarmentLibrary(
+    VIRTUAL_LIBRARY_PATH, maxsize=VIRTUAL_LIBRARY_MAXSIZE, max_variants=VIRTUAL_LIBRARY_MAX_VARIANTS
+)
+# 라이브러리 키 -> 생성 중인 asyncio.Task (동시에 같은 옷이 필요하면 생성 1회만 실행)
+virtual_generations = {}
+
+async def get_virtual_clothing(item, description, user_id, image_fetcher: ImageFetcher = None):
+    """가상 옷 라이브러리에서 이미지 URL 조회, 없을 때만 DALL-E로 생성해 등록 -> (URL, 에러)
+
+    새로 생성한 이미지는 image_fetcher에 바이트를 등록해 가상 피팅에서 S3를 다시 읽지 않는다.
+    """
+    clothing_type, pattern, tone = parse_virtual_clothing_item(item)
+    key = make_library_key(clothing_type, pattern, tone, description)
+    lookup_keys = [key]
+    if VIRTUAL_LIBRARY_CATALOG_FALLBACK:
+        lookup_keys.append(make_library_key(clothing_type, pattern, tone))
+    url = await virtual_library.alookup(lookup_keys, user_id)
+    if url is not None:
+        log(f"가상 옷 라이브러리 사용 - {clothing_type} ({pattern}, {tone})")
+        return url, None
+
+    async def generate():
+        # 함께 기다리는 요청마다 바이트를 넘겨주기 위한 생성 전용 fetcher
+        generation_fetcher = ImageFetcher(get_http_session, image_cache)
+        # 지연 업로드에서는 URL이 업로드가 끝난 뒤에야 유효하므로 그때 라이브러리에 등록
+        url, error = await generate_virtual_clothing_with_dalle(
+            item, description, user_id, generation_fetcher,
+            on_uploaded=lambda s3_url: run_in_background(virtual_library.aadd(key, s3_url))
+        )
+        content = await generation_fetcher.fetch(url) if not error else None
+        return url, error, content
+
+    task = virtual_generations.get(key)
+    if task is None:
+        task = asyncio.ensure_future(generate())
+        virtual_generations[key] = task
+        task.add_done_callback(lambda _: virtual_generations.pop(key, None))
+    url, error, content = await task
+    if content is not None and image_fetcher is not None:
+        image_fetcher.seed(url, content)
+    return url, error
+
+async def generate_virtual_clothing_batch(clothing_items, user_data, situation, image_fetcher: ImageFetcher = None):
+    """여러 가상 옷을 동시에 준비 (라이브러리에 없는 옷만 생성)"""
     tasks = []
     for item in clothing_items:
         if item.startswith("추천:"):
             clothing_type = re.sub(r'\s*\([^)]+\)', '', item).replace("추천: ", "").strip()
             description = f"elegant {clothing_type.lower()}, suitable for {situation} occasion"
-            task = generate_virtual_clothing_with_dalle(item, description, user_data["id"])
+            task = get_virtual_clothing(item, description, user_data["id"], image_fetcher)
             tasks.append((item, task))
     
     if not tasks:
         return {}
     
-    print(f"[INFO] {len(tasks)}개의 가상 옷 생성 시작")
+    log(f"{len(tasks)}개의 가상 옷 생성 시작")
     results = {}
     
     # 모든 가상 옷 생성을 동시에 실행
@@ -885,378 +954,179 @@ async def generate_virtual_clothing_batch(clothing_items, user_data, situation):
     for i, (original_item, _) in enumerate(tasks):
         result = task_results[i]
         if isinstance(result, Exception):
-            print(f"[ERROR] 가상 옷 생성 실패: {result}")
+            log(f"가상 옷 생성 실패: {result}", "ERROR")
             results[original_item] = None
         else:
             url, error = result
             if error:
-                print(f"[ERROR] 가상 옷 생성 실패: {error}")
+                log(f"가상 옷 생성 실패: {error}", "ERROR")
                 results[original_item] = None
             else:
                 clothing_type = re.sub(r'\s*\([^)]+\)', '', original_item).replace("추천: ", "").strip()
                 results[original_item] = {"type": clothing_type, "url": url}
     
-    print(f"[INFO] 가상 옷 생성 완료 - {len([r for r in results.values() if r is not None])}개 성공")
+    log(f"가상 옷 생성 완료 - {len([r for r in results.values() if r is not None])}개 성공")
     return results
 
-async def apply_virtual_tryon_with_generated_clothing(user_data, outfit_combination, show_closet_only, virtual_clothing_results=None):
-    """가상 옷 생성과 가상 피팅 적용 (개선된 비동기 버전)"""
-    try:
-        print(f"[INFO] 가상 옷 생성 및 피팅 시작 - 조합: {outfit_combination['combination']}")
-        
-        # 사용자 이미지 URL 확인 및 기본 모델 이미지 설정
-        model_image_url = user_data["body_image_url"]
-        if not model_image_url:
-            if user_data["gender"] == "FEMALE":
-                model_image_url = "https://amzn-s3-fitu-bucket.s3.ap-northeast-2.amazonaws.com/basic_model/ChatGPT_image_woman.png"
-            else:
-                model_image_url = "https://amzn-s3-fitu-bucket.s3.ap-northeast-2.amazonaws.com/basic_model/ChatGPT_Image_man.png"
-
-        # 모델 이미지 다운로드
-        async with aiohttp.ClientSession() as session:
-            async with session.get(model_image_url) as response:
-                if response.status != 200:
-                    return None, "모델 이미지를 다운로드할 수 없습니다."
-                body_image_content = await response.read()
-
-        # 임시 파일로 저장
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-            tmp_file.write(body_image_content)
-            model_image_path = tmp_file.name
-
-        # 옷 조합 분석
-        combination = outfit_combination["combination"]
-        selected = outfit_combination["selected"]
-
-        # 옷장에 없는 옷을 추천한 경우 (showClosetOnly가 false일 때만)
-        if selected.startswith("추천:") or (" + " in selected and any(part.startswith("추천:") for part in selected.split(" + "))):
-            if not show_closet_only:
-                # 상의 + 하의 조합인 경우
-                if " + " in selected:
-                    top_part, bottom_part = selected.split(" + ")
-                    virtual_clothing = []  # 가상 옷 URL 수집
-                    
-                    # 상의 처리
-                    if top_part.startswith("추천:"):
-                        # 상의는 가상 옷 (이미 생성된 결과 사용)
-                        if virtual_clothing_results and top_part in virtual_clothing_results and virtual_clothing_results[top_part]:
-                            top_url = virtual_clothing_results[top_part]["url"]
-                            virtual_clothing.append(virtual_clothing_results[top_part])
-                            top_is_virtual = True
-                        else:
-                            os.unlink(model_image_path)
-                            return None, f"상의 가상 옷 생성에 실패했습니다: {top_part}"
-                    else:
-                        # 상의는 옷장 옷
-                        top_id = top_part.split(" ")[0]
-                        session = get_session()
-                        query = text("SELECT image_url FROM clothes WHERE id = :id AND user_id = :user_id")
-                        result = session.execute(query, {"id": int(top_id), "user_id": user_data["id"]}).fetchone()
-                        session.close()
-                        
-                        if not result or not result[0]:
-                            os.unlink(model_image_path)
-                            return None, f"상의 이미지를 찾을 수 없습니다. (ID: {top_id})"
-                        
-                        top_url = result[0]
-                        top_is_virtual = False
-                    
-                    # 하의 처리
-                    if bottom_part.startswith("추천:"):
-                        # 하의는 가상 옷 (이미 생성된 결과 사용)
-                        if virtual_clothing_results and bottom_part in virtual_clothing_results and virtual_clothing_results[bottom_part]:
-                            bottom_url = virtual_clothing_results[bottom_part]["url"]
-                            virtual_clothing.append(virtual_clothing_results[bottom_part])
-                            bottom_is_virtual = True
-                        else:
-                            os.unlink(model_image_path)
-                            return None, f"하의 가상 옷 생성에 실패했습니다: {bottom_part}"
-                    else:
-                        # 하의는 옷장 옷
-                        bottom_id = bottom_part.split(" ")[0]
-                        session = get_session()
-                        query = text("SELECT image_url FROM clothes WHERE id = :id AND user_id = :user_id")
-                        result = session.execute(query, {"id": int(bottom_id), "user_id": user_data["id"]}).fetchone()
-                        session.close()
-                        
-                        if not result or not result[0]:
-                            os.unlink(model_image_path)
-                            return None, f"하의 이미지를 찾을 수 없습니다. (ID: {bottom_id})"
-                        
-                        bottom_url = result[0]
-                        bottom_is_virtual = False
-                    
-                    # 하의 먼저 적용
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(bottom_url) as response:
-                            if response.status != 200:
-                                return None, "하의 이미지를 다운로드할 수 없습니다."
-                            bottom_content = await response.read()
-
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                        tmp_file.write(bottom_content)
-                        bottom_image_path = tmp_file.name
-
-                    intermediate_url, error = await process_virtual_tryon_async(model_image_path, bottom_image_path, "bottoms", user_data["id"])
-                    if error:
-                        os.unlink(bottom_image_path)
-                        os.unlink(model_image_path)
-                        return None, error
-
-                    # 중간 결과 이미지 다운로드
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(intermediate_url) as response:
-                            if response.status != 200:
-                                return None, "중간 결과 이미지를 다운로드할 수 없습니다."
-                            intermediate_content = await response.read()
-
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                        tmp_file.write(intermediate_content)
-                        intermediate_image_path = tmp_file.name
-
-                    # 상의 이미지 다운로드
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(top_url) as response:
-                            if response.status != 200:
-                                return None, "상의 이미지를 다운로드할 수 없습니다."
-                            top_content = await response.read()
-
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                        tmp_file.write(top_content)
-                        top_image_path = tmp_file.name
-
-                    final_url, error = await process_virtual_tryon_async(intermediate_image_path, top_image_path, "tops", user_data["id"])
-
-                    # 임시 파일 삭제
-                    os.unlink(bottom_image_path)
-                    os.unlink(intermediate_image_path)
-                    os.unlink(top_image_path)
-                    os.unlink(model_image_path)
-
-                    print(f"[INFO] 가상 옷 생성 및 피팅 완료 - 혼합 조합")
-                    # 가상 옷 URL과 가상 피팅 결과 URL을 함께 반환
-                    return {
-                        "tryon_url": final_url,
-                        "error": error,
-                        "virtual_clothing": virtual_clothing
-                    }
-                    
-                else:
-                    # 단일 가상 옷인 경우 (원피스)
-                    if virtual_clothing_results and selected in virtual_clothing_results and virtual_clothing_results[selected]:
-                        virtual_clothing_url = virtual_clothing_results[selected]["url"]
-                        clothing_type = virtual_clothing_results[selected]["type"]
-                    else:
-                        os.unlink(model_image_path)
-                        return None, f"가상 옷 생성에 실패했습니다: {selected}"
-                    
-                    # 가상 옷 이미지 다운로드
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(virtual_clothing_url) as response:
-                            if response.status != 200:
-                                return None, "가상 옷 이미지를 다운로드할 수 없습니다."
-                            clothing_content = await response.read()
-
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                        tmp_file.write(clothing_content)
-                        clothing_image_path = tmp_file.name
-
-                    # 가상 피팅 실행
-                    if "DRESS" in clothing_type or "JUMPSUIT" in clothing_type:
-                        result_url, error = await process_virtual_tryon_async(model_image_path, clothing_image_path, "one-pieces", user_data["id"])
-                    else:
-                        result_url, error = await process_virtual_tryon_async(model_image_path, clothing_image_path, "tops", user_data["id"])
-
-                    # 임시 파일 삭제
-                    os.unlink(clothing_image_path)
-                    os.unlink(model_image_path)
-
-                    print(f"[INFO] 가상 옷 생성 및 피팅 완료 - {clothing_type}")
-                    # 가상 옷 URL과 가상 피팅 결과 URL을 함께 반환
-                    return {
-                        "tryon_url": result_url,
-                        "error": error,
-                        "virtual_clothing": [
-                            {"type": clothing_type, "url": virtual_clothing_url}
-                        ]
-                    }
-            else:
-                return None, "옷장에 없는 옷은 가상 피팅을 할 수 없습니다."
-
-        # [N/A] 값인 경우
-        if selected == "[N/A]":
-            return None, "해당 조합에 맞는 옷이 없습니다."
-
-        # 원피스 판별
-        is_onepiece = False
-        if "DRESS" in combination or "JUMPSUIT" in combination:
-            is_onepiece = True
-        elif "ONEPIECE" in combination:
-            is_onepiece = True
-        elif " + " not in selected and ("DRESS" in selected or "JUMPSUIT" in selected):
-            is_onepiece = True
-
-        if is_onepiece:
-            # 원피스인 경우
-            clothing_id = selected.split(" ")[0]
-            
-            # DB에서 해당 옷의 image_url 가져오기
-            session = get_session()
-            query = text("""
-                SELECT image_url 
-                FROM clothes 
-                WHERE id = :id AND user_id = :user_id
-            """)
-            result = session.execute(query, {
-                "id": int(clothing_id),
-                "user_id": user_data["id"]
-            }).fetchone()
-            session.close()
-            
-            if not result or not result[0]:
-                return None, f"의류 이미지를 찾을 수 없습니다. (ID: {clothing_id})"
-                
-            garment_url = result[0]
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(garment_url) as response:
-                    if response.status != 200:
-                        return None, f"의류 이미지를 다운로드할 수 없습니다."
+# 가상 피팅 카테고리별 의류 이름 (에러 메시지용)
+TRYON_GARMENT_LABELS = {"tops": "상의", "bottoms": "하의", "one-pieces": "의류"}
 
-                    garment_content = await response.read()
+def get_model_image_url(user_data):
+    """사용자 이미지 URL 확인 및 기본 모델 이미지 설정"""
+    model_image_url = user_data["body_image_url"]
+    if not model_image_url:
+        if user_data["gender"] == "FEMALE":
+            model_image_url = "https://amzn-s3-fitu-bucket.s3.ap-northeast-2.amazonaws.com/basic_model/ChatGPT_image_woman.png"
+        else:
+            model_image_url = "https://amzn-s3-fitu-bucket.s3.ap-northeast-2.amazonaws.com/basic_model/ChatGPT_Image_man.png"
+    return model_image_url
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                tmp_file.write(garment_content)
-                garment_image_path = tmp_file.name
+# 프로세스 단위 이미지 캐시 바이트 예산 (0이면 요청 단위 캐시만 사용)
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", "0"))
+image_cache = ImageByteCache(IMAGE_CACHE_MAX_BYTES) if IMAGE_CACHE_MAX_BYTES > 0 else None
 
-            result_url, error = await process_virtual_tryon_async(model_image_path, garment_image_path, "one-pieces", user_data["id"])
-            
-            # 임시 파일 삭제
-            os.unlink(garment_image_path)
-            os.unlink(model_image_path)
-            
-            print(f"[INFO] 가상 피팅 조합 처리 완료 - 원피스")
-            return result_url, error
+# FASHN 입력용 의류 렌디션 (옷 등록 시 또는 첫 사용 시 1회 생성 후 재사용)
+rendition_store = RenditionStore()
 
-        else:
-            # 상의 + 하의 조합인 경우
-            if " + " not in selected:
-                return None, "상의+하의 조합 형식이 올바르지 않습니다."
-                
-            top_part, bottom_part = selected.split(" + ")
-            top_id = top_part.split(" ")[0]
-            bottom_id = bottom_part.split(" ")[0]
-
-            # DB에서 해당 옷들의 image_url 가져오기
-            session = get_session()
-            query = text("SELECT id, image_url FROM clothes WHERE id IN (:top_id, :bottom_id) AND user_id = :user_id")
-            result = session.execute(query, {
-                "top_id": int(top_id),
-                "bottom_id": int(bottom_id),
-                "user_id": user_data["id"]
-            }).fetchall()
-            session.close()
-            
-            if len(result) != 2:
-                return None, f"의류 이미지를 찾을 수 없습니다."
+async def run_tryon_step(model_image_url, garment_image_url, category, user_id, image_fetcher: ImageFetcher):
+    """가상 피팅 1단계: 모델(또는 이전 단계 결과) 이미지에 의류 1벌 적용 -> (S3 URL, 에러)"""
+    model_content, garment_rendition = await asyncio.gather(
+        image_fetcher.fetch(model_image_url),
+        rendition_store.get_or_create(garment_image_url, image_fetcher.fetch)
+    )
+    if model_content is None:
+        return None, "모델 이미지를 다운로드할 수 없습니다."
+    if garment_rendition is None:
+        return None, f"{TRYON_GARMENT_LABELS.get(category, '의류')} 이미지를 다운로드하거나 변환할 수 없습니다."
+
+    with span("tryon_step") as step:
+        tryon_url, error = await process_virtual_tryon_async(
+            model_content, garment_rendition, category, user_id, image_fetcher, garment_prepared=True
+        )
+        if error:
+            step.fail(error)
+    return tryon_url, error
 
-            result_dict = {row[0]: row[1] for row in result}
-            top_url = result_dict.get(int(top_id))
-            bottom_url = result_dict.get(int(bottom_id))
+def create_tryon_graph(user_id, image_fetcher: ImageFetcher = None):
+    """요청 단위 가상 피팅 단계 그래프 생성 (조합 간 같은 단계와 같은 이미지 다운로드 공유)"""
+    if image_fetcher is None:
+        image_fetcher = ImageFetcher(get_http_session, image_cache)
 
-            if not top_url or not bottom_url:
-                return None, f"의류 이미지를 찾을 수 없습니다."
+    async def run_step(model_image_url, garment_image_url, category):
+        return await run_tryon_step(model_image_url, garment_image_url, category, user_id, image_fetcher)
+
+    return TryonStepGraph(run_step)
+
+def resolve_virtual_part(part, closet: ClosetIndex, label):
+    """가상 옷 항목의 생성된 이미지 -> (가상 옷 정보, 에러)"""
+    virtual_item = closet.virtual.get(part)
+    if virtual_item:
+        return virtual_item, None
+    return None, f"{label} 가상 옷 생성에 실패했습니다: {part}"
+
+def resolve_tryon_steps(outfit_combination, show_closet_only, closet: ClosetIndex):
+    """조합을 가상 피팅 단계 목록으로 변환 -> (단계 [(의류 이미지 URL, 카테고리)], 가상 옷 목록 또는 None, 에러)"""
+    combination = outfit_combination["combination"]
+    selected = outfit_combination["selected"]
+
+    # 옷장에 없는 옷을 추천한 경우 (showClosetOnly가 false일 때만)
+    if selected.startswith("추천:") or (" + " in selected and any(part.startswith("추천:") for part in selected.split(" + "))):
+        if show_closet_only:
+            return None, None, "옷장에 없는 옷은 가상 피팅을 할 수 없습니다."
+
+        virtual_clothing = []  # 가상 옷 URL 수집
+
+        # 상의 + 하의 조합인 경우
+        if " + " in selected:
+            top_part, bottom_part = selected.split(" + ")
+            urls = {}
+            for part, label in ((top_part, "상의"), (bottom_part, "하의")):
+                if part.startswith("추천:"):
+                    # 가상 옷 (이미 생성된 결과 사용)
+                    virtual_item, error = resolve_virtual_part(part, closet, label)
+                    if error:
+                        return None, None, error
+                    urls[label] = virtual_item["url"]
+                    virtual_clothing.append(virtual_item)
+                else:
+                    # 옷장 옷
+                    clothing_id = part.split(" ")[0]
+                    urls[label] = closet.image_url(clothing_id)
+                    if not urls[label]:
+                        return None, None, f"{label} 이미지를 찾을 수 없습니다. (ID: {clothing_id})"
 
             # 하의 먼저 적용
-            async with aiohttp.ClientSession() as session:
-                async with session.get(bottom_url) as response:
-                    if response.status != 200:
-                        return None, f"하의 이미지를 다운로드할 수 없습니다."
-                    bottom_content = await response.read()
+            return [(urls["하의"], "bottoms"), (urls["상의"], "tops")], virtual_clothing, None
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                tmp_file.write(bottom_content)
-                bottom_image_path = tmp_file.name
+        # 단일 가상 옷인 경우 (원피스)
+        virtual_item, error = resolve_virtual_part(selected, closet, "")
+        if error:
+            return None, None, f"가상 옷 생성에 실패했습니다: {selected}"
+        clothing_type = virtual_item["type"]
+        category = "one-pieces" if "DRESS" in clothing_type or "JUMPSUIT" in clothing_type else "tops"
+        return [(virtual_item["url"], category)], [{"type": clothing_type, "url": virtual_item["url"]}], None
+
+    # [N/A] 값인 경우
+    if selected == "[N/A]":
+        return None, None, "해당 조합에 맞는 옷이 없습니다."
+
+    # 원피스 판별
+    is_onepiece = False
+    if "DRESS" in combination or "JUMPSUIT" in combination:
+        is_onepiece = True
+    elif "ONEPIECE" in combination:
+        is_onepiece = True
+    elif " + " not in selected and ("DRESS" in selected or "JUMPSUIT" in selected):
+        is_onepiece = True
+
+    if is_onepiece:
+        # 원피스인 경우 옷장 인덱스에서 해당 옷의 image_url 가져오기
+        clothing_id = selected.split(" ")[0]
+        garment_url = closet.image_url(clothing_id)
+        if not garment_url:
+            return None, None, f"의류 이미지를 찾을 수 없습니다. (ID: {clothing_id})"
+        return [(garment_url, "one-pieces")], None, None
+
+    # 상의 + 하의 조합인 경우
+    if " + " not in selected:
+        return None, None, "상의+하의 조합 형식이 올바르지 않습니다."
+
+    top_part, bottom_part = selected.split(" + ")
+    top_url = closet.image_url(top_part.split(" ")[0])
+    bottom_url = closet.image_url(bottom_part.split(" ")[0])
+    if not top_url or not bottom_url:
+        return None, None, "의류 이미지를 찾을 수 없습니다."
+
+    # 하의 먼저 적용
+    return [(bottom_url, "bottoms"), (top_url, "tops")], None, None
+
+async def apply_virtual_tryon_with_generated_clothing(user_data, outfit_combination, show_closet_only, closet: ClosetIndex,
+                                                      tryon_graph=None):
+    """가상 옷 생성 결과와 옷장 옷으로 가상 피팅 적용 (tryon_graph를 공유하면 조합 간 같은 단계는 1회만 실행)"""
+    try:
+        log(f"가상 옷 생성 및 피팅 시작 - 조합: {outfit_combination['combination']}")
 
-            intermediate_url, error = await process_virtual_tryon_async(model_image_path, bottom_image_path, "bottoms", user_data["id"])
-            if error:
-                os.unlink(bottom_image_path)
-                os.unlink(model_image_path)
-                return None, error
-
-            # 중간 결과 이미지 다운로드
-            async with aiohttp.ClientSession() as session:
-                async with session.get(intermediate_url) as response:
-                    if response.status != 200:
-                        return None, f"중간 결과 이미지를 다운로드할 수 없습니다."
-                    intermediate_content = await response.read()
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                tmp_file.write(intermediate_content)
-                intermediate_image_path = tmp_file.name
-
-            # 상의 이미지 다운로드
-            async with aiohttp.ClientSession() as session:
-                async with session.get(top_url) as response:
-                    if response.status != 200:
-                        return None, f"상의 이미지를 다운로드할 수 없습니다."
-                    top_content = await response.read()
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                tmp_file.write(top_content)
-                top_image_path = tmp_file.name
-
-            final_url, error = await process_virtual_tryon_async(intermediate_image_path, top_image_path, "tops", user_data["id"])
-
-            # 임시 파일 삭제
-            os.unlink(bottom_image_path)
-            os.unlink(intermediate_image_path)
-            os.unlink(top_image_path)
-            os.unlink(model_image_path)
-
-            print(f"[INFO] 가상 피팅 조합 처리 완료 - 상의+하의")
-            return final_url, error
+        steps, virtual_clothing, error = resolve_tryon_steps(outfit_combination, show_closet_only, closet)
+        if error:
+            return None, error
+
+        if tryon_graph is None:
+            tryon_graph = create_tryon_graph(user_data["id"])
+        result_url, error = await tryon_graph.run_chain(get_model_image_url(user_data), steps)
+
+        log(f"가상 피팅 조합 처리 완료 - {outfit_combination['combination']}")
+        if virtual_clothing is not None:
+            # 가상 옷 URL과 가상 피팅 결과 URL을 함께 반환
+            return {
+                "tryon_url": result_url,
+                "error": error,
+                "virtual_clothing": virtual_clothing
+            }
+        return result_url, error
 
     except Exception as e:
         return None, f"가상 피팅 처리 중 오류 발생: {e}"
 
-def match_outfit_combinations(data, recommended_combinations, user_data, available_types):
-    """옷장에서 조합 매칭"""
-    outfit_sets = []
-    for line in recommended_combinations.splitlines():
-        if 'onepiece' in line.lower() and user_data["gender"] == "FEMALE":
-            for op in available_types['ONEPIECE']:
-                if op in line.upper():
-                    matches = [item for item in data if item['attributes']['type'] == 'ONEPIECE' and item['attributes']['category'] == op]
-                    for match in matches:
-                        outfit_sets.append(f"{match['clothing_id']} ({match['attributes']['category']})")
-                        
-        elif 'top' in line.lower() and 'bottom' in line.lower():
-            top_type = None
-            bottom_type = None
-            
-            for top in available_types['TOP']:
-                if top in line.upper():
-                    top_type = top
-                    break
-                    
-            for bottom in available_types['BOTTOM']:
-                if bottom in line.upper():
-                    bottom_type = bottom
-                    break
-            
-            if top_type and bottom_type:
-                top_matches = [item for item in data if item['attributes']['type'] == 'TOP' and item['attributes']['category'] == top_type]
-                bottom_matches = [item for item in data if item['attributes']['type'] == 'BOTTOM' and item['attributes']['category'] == bottom_type]
-                
-                if top_matches and bottom_matches:
-                    for t in top_matches:
-                        for b in bottom_matches:
-                            combination = f"{t['clothing_id']} ({t['attributes']['category']}) + {b['clothing_id']} ({b['attributes']['category']})"
-                            outfit_sets.append(combination)
-    
-    return outfit_sets
-
 def organize_clothing_by_category(data):
     """옷장의 옷들을 카테고리별로 분류"""
     organized_clothes = {
@@ -1324,166 +1194,475 @@ def filter_clothing_by_recommendations(organized_clothes, recommended_combinatio
     
     return filtered_clothes
 
-# 메인 API 엔드포인트
-@app.post("/vision/recommendation")
-async def recommend(request: RecommendationRequest):
-    print(f"[INFO] 추천 API 호출 시작 - user_id: {request.user_id}")
-    
-    user_data = load_user_data(request.user_id)
+async def warm_closet_renditions(user_id: str):
+    """옷장 의류 중 렌디션이 없는 항목을 미리 생성 (옷 등록 직후 백그라운드 실행)"""
+    try:
+        snapshot = await load_closet_snapshot(user_id)
+        image_fetcher = ImageFetcher(get_http_session, image_cache)
+        results = await asyncio.gather(*[
+            rendition_store.get_or_create(item["attributes"]["image_url"], image_fetcher.fetch)
+            for item in snapshot["items"]
+        ])
+        log(f"의류 렌디션 준비 완료 - user_id: {user_id}, {sum(r is not None for r in results)}/{len(results)}개")
+    except Exception as e:
+        log(f"의류 렌디션 생성 실패 - user_id: {user_id}: {e}", "ERROR")
+
+# 실행 중인 백그라운드 작업 참조 유지 (GC로 취소되지 않도록)
+background_tasks = set()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+# 옷장 캐시 무효화 엔드포인트 (백엔드에서 옷 추가/수정/삭제 시 호출)
+@app.delete("/vision/closet-cache/{user_id}")
+async def invalidate_closet_cache(user_id: str):
+    invalidated = closet_cache.pop(user_id)
+    # 이전 옷장으로 만든(또는 만드는 중인) 추천 결과를 재사용하지 않도록 키 세대 변경
+    closet_epochs[user_id] = closet_epochs.get(user_id, 0) + 1
+    log(f"옷장 캐시 무효화 - user_id: {user_id}, 존재 여부: {invalidated}")
+    # 새로 등록된 옷의 렌디션을 미리 만들어 첫 가상 피팅에서 리사이즈를 생략
+    run_in_background(warm_closet_renditions(user_id))
+    return {
+        "header": {"resultCode": "00", "resultMsg": "SUCCESS"},
+        "body": {"invalidated": invalidated}
+    }
+
+# 캐시 상태 조회 엔드포인트
+@app.get("/vision/cache-stats")
+async def get_cache_stats():
+    return {
+        "header": {"resultCode": "00", "resultMsg": "SUCCESS"},
+        "body": {
+            "closet": closet_cache.stats(),
+            "combination": combination_cache.stats(),
+            "situation": situation_index.stats(),
+            "tryon": tryon_cache.stats(),
+            "image": image_cache.stats() if image_cache is not None else None,
+            "rendition": rendition_store.stats(),
+            "s3": s3_store.stats(),
+            "virtual_library": virtual_library.stats(),
+            "fashn_poller": fashn_poller.stats(),
+            "recommendation": recommendation_coalescer.stats()
+        }
+    }
+
+# 공유 자원의 현재 사용량 (조회 시점 값)
+Gauge("fitu_llm_in_flight", "진행 중인 LLM 호출 수").set_function(lambda: llm_client.in_flight)
+Gauge("fitu_fashn_predictions_in_flight", "상태 확인 대기 중인 FASHN 예측 수").set_function(lambda: fashn_poller.in_flight)
+Gauge("fitu_virtual_generations_in_flight", "생성 중인 가상 옷 수").set_function(lambda: len(virtual_generations))
+Gauge("fitu_background_tasks", "백그라운드 작업 수 (렌디션 미리 생성 등)").set_function(lambda: len(background_tasks))
+Gauge("fitu_recommendations_in_flight", "실행 중인 추천 계산 수 (중복 요청 합친 뒤)").set_function(
+    lambda: recommendation_coalescer.stats()["in_flight"]
+)
+Gauge("fitu_job_queue_depth", "대기 중인 추천 작업 수").set_function(lambda: job_queue.qsize())
+
+# Prometheus 수집 엔드포인트 (단계별 소요 시간 히스토그램, 처리 중 요청/단계 수, 외부 호출 수)
+@app.get("/metrics")
+async def metrics():
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)
+
+class RecommendationError(Exception):
+    """추천 파이프라인 조기 종료 (resultMsg 전달용)"""
+
+    def __init__(self, result_msg: str):
+        super().__init__(result_msg)
+        self.result_msg = result_msg
+
+def error_response(result_msg: str):
+    return {
+        "header": {"resultCode": "01", "resultMsg": result_msg},
+        "body": {"result": []}
+    }
+
+def get_weather_text(request: RecommendationRequest) -> str:
+    return f"{request.status}, {int((request.highTemperature + request.lowTemperature) / 2)}°C, 강수확률: {request.rainPercent}%"
+
+def is_matched_outfit(outfit) -> bool:
+    return outfit["selected"] != "해당 조합에 맞는 옷이 없습니다" and outfit["selected"] != "[N/A]"
+
+async def prepare_recommendation(request: RecommendationRequest):
+    """사용자/옷장 조회와 GPT 추천까지 수행 (가상 피팅 전 텍스트 결과)"""
+    user_data = await load_user_data(request.user_id)
     
     if not user_data:
-        return {
-            "header": {"resultCode": "01", "resultMsg": "USER_NOT_FOUND"},
-            "body": {"result": []}
-        }
+        raise RecommendationError("USER_NOT_FOUND")
     
-    # 옷장에 있는 옷 종류만 추출
-    data = load_clothing_types_from_db(request.user_id)
+    # 옷장 스냅샷 1회 조회 (옷 종류 목록 + 상세 정보)
+    closet_snapshot = await load_closet_snapshot(request.user_id)
     
     available_types = {'TOP': set(), 'BOTTOM': set(), 'ONEPIECE': set()}
     
-    for item in data:
+    for item in closet_snapshot["types"]:
         type_name = item['type']
         category = item['category']
         available_types[type_name].add(category)
     
-    if request.showClosetOnly:
-        # 프롬프트용 문자열 생성
-        available_types_str = ""
-        for category, types in available_types.items():
-            if types:
-                available_types_str += f"- {category}: {', '.join(sorted(types))}\n"
-        
-        if not available_types_str:
-            return {
-                "header": {"resultCode": "01", "resultMsg": "NO_CLOTHES"},
-                "body": {"result": []}
-            }
-            
-        print("[INFO] GPT 옷장 기반 추천 시작")
-        recommended_combinations = ask_gpt_for_recommendation(
-            request.situation, user_data, available_types_str, request.targetTime,
-            request.targetPlace, request.highTemperature, request.lowTemperature,
-            request.rainPercent, request.status, True
-        )
-        print("[INFO] GPT 옷장 기반 추천 완료")
+    # 프롬프트용 문자열 생성
+    available_types_str = ""
+    for category, types in available_types.items():
+        if types:
+            available_types_str += f"- {category}: {', '.join(sorted(types))}\n"
+
+    if request.showClosetOnly and not available_types_str:
+        raise RecommendationError("NO_CLOTHES")
+
+    # 요청 단위 옷장 인덱스 (이후 모든 단계에서 옷 ID/카테고리 조회에 사용)
+    closet = ClosetIndex(closet_snapshot["items"])
+
+    if RECOMMENDATION_MODE == "single":
+        log("GPT 구조화 단일 추천 시작")
+        structured_result = await ask_gpt_for_structured_recommendation(request, user_data, closet)
+        log("GPT 구조화 단일 추천 완료")
+
+        # 옷장 전용이 아니어도 조합이 하나도 없으면 빈 성공 응답 대신 실패로 알림
+        if not structured_result["outfits"]:
+            raise RecommendationError("NO_MATCH")
     else:
-        print("[INFO] GPT 일반 추천 시작")
-        recommended_combinations = ask_gpt_for_recommendation(
-            request.situation, user_data, "", request.targetTime,
-            request.targetPlace, request.highTemperature, request.lowTemperature,
-            request.rainPercent, request.status, False
+        if request.showClosetOnly:
+            log(f"옷장 기반 조합 추천 시작 ({COMBINATION_ENGINE})")
+            recommended_combinations = await get_recommended_combinations(request, user_data, available_types, available_types_str)
+            log("옷장 기반 조합 추천 완료")
+        else:
+            log(f"일반 조합 추천 시작 ({COMBINATION_ENGINE})")
+            recommended_combinations = await get_recommended_combinations(request, user_data, available_types, "")
+            log("일반 조합 추천 완료")
+
+        # 옷장에서 조합 매칭
+        organized_clothes = organize_clothing_by_category(closet.items)
+
+        # 추천받은 조합에 맞는 카테고리만 필터링
+        filtered_clothes = filter_clothing_by_recommendations(organized_clothes, recommended_combinations)
+
+        if not any(filtered_clothes.values()) and request.showClosetOnly:
+            raise RecommendationError("NO_MATCH")
+
+        log("GPT 최종 옷장 매칭 시작")
+        final_response = await ask_gpt_for_best_clothing_sets(
+            request.situation, filtered_clothes, recommended_combinations, request.showClosetOnly,
+            user_data, request.targetTime, request.targetPlace, request.highTemperature,
+            request.lowTemperature, request.rainPercent, request.status
         )
-        print("[INFO] GPT 일반 추천 완료")
+        log("GPT 최종 옷장 매칭 완료")
 
-    # 옷장에서 조합 매칭
-    data = load_clothing_details_from_db(request.user_id)
-    organized_clothes = organize_clothing_by_category(data)
-    
-    # 추천받은 조합에 맞는 카테고리만 필터링
-    filtered_clothes = filter_clothing_by_recommendations(organized_clothes, recommended_combinations)
-    
-    if not any(filtered_clothes.values()) and request.showClosetOnly:
-        return {
-            "header": {"resultCode": "01", "resultMsg": "NO_MATCH"},
-            "body": {"result": []}
-        }
+        structured_result = parse_gpt_result(final_response)
 
-    print("[INFO] GPT 최종 옷장 매칭 시작")
-    final_response = ask_gpt_for_best_clothing_sets(
-        request.situation, filtered_clothes, recommended_combinations, request.showClosetOnly,
-        user_data, request.targetTime, request.targetPlace, request.highTemperature,
-        request.lowTemperature, request.rainPercent, request.status
-    )
-    print("[INFO] GPT 최종 옷장 매칭 완료")
-    
-    structured_result = parse_gpt_result(final_response)
-    
-    # 가상 옷이 필요한 조합들 수집
+    return user_data, closet, structured_result
+
+def collect_virtual_clothing_items(outfits, show_closet_only):
+    """가상 옷이 필요한 항목 수집 (중복 제거)"""
     virtual_clothing_items = []
-    for outfit in structured_result["outfits"]:
-        if outfit["selected"] != "해당 조합에 맞는 옷이 없습니다" and outfit["selected"] != "[N/A]":
-            if not request.showClosetOnly:
-                # 상의 + 하의 조합인 경우
-                if " + " in outfit["selected"]:
-                    top_part, bottom_part = outfit["selected"].split(" + ")
-                    if top_part.startswith("추천:"):
-                        virtual_clothing_items.append(top_part)
-                    if bottom_part.startswith("추천:"):
-                        virtual_clothing_items.append(bottom_part)
-                else:
-                    # 단일 가상 옷인 경우
-                    if outfit["selected"].startswith("추천:"):
-                        virtual_clothing_items.append(outfit["selected"])
-    
-    # 중복 제거
-    virtual_clothing_items = list(set(virtual_clothing_items))
+    if show_closet_only:
+        return virtual_clothing_items
+
+    for outfit in outfits:
+        if not is_matched_outfit(outfit):
+            continue
+        # 상의 + 하의 조합인 경우
+        if " + " in outfit["selected"]:
+            top_part, bottom_part = outfit["selected"].split(" + ")
+            if top_part.startswith("추천:"):
+                virtual_clothing_items.append(top_part)
+            if bottom_part.startswith("추천:"):
+                virtual_clothing_items.append(bottom_part)
+        else:
+            # 단일 가상 옷인 경우
+            if outfit["selected"].startswith("추천:"):
+                virtual_clothing_items.append(outfit["selected"])
+
+    return list(set(virtual_clothing_items))
+
+def apply_tryon_result(outfit, tryon_result, closet: ClosetIndex):
+    """가상 피팅 결과와 옷 링크를 outfit에 기록"""
+    # 가상 옷인 경우와 일반 옷인 경우를 구분하여 처리
+    if isinstance(tryon_result, dict) and "virtual_clothing" in tryon_result:
+        # 가상 옷 생성된 경우
+        tryon_url, error = tryon_result["tryon_url"], tryon_result["error"]
+    else:
+        # 일반 옷장 옷인 경우 (기존 방식)
+        tryon_url, error = tryon_result
+
+    if error:
+        outfit["virtualTryonImage"] = None
+        outfit["virtualTryonError"] = error
+    else:
+        outfit["virtualTryonImage"] = tryon_url
+        outfit["virtualTryonError"] = None
+
+    # 옷의 링크 정보 추가
+    outfit["clothing_links"] = get_clothing_links(outfit["selected"], closet)
+    return outfit
+
+async def run_outfit_tryons(request: RecommendationRequest, user_data, closet: ClosetIndex, outfits):
+    """가상 옷 생성 후 조합별 가상 피팅을 동시에 실행하고, 끝나는 순서대로 (index, outfit) 반환"""
+    virtual_clothing_items = collect_virtual_clothing_items(outfits, request.showClosetOnly)
+    # 조합 간 같은 가상 피팅 단계(같은 모델 이미지 + 같은 하의 등)와 같은 이미지 다운로드는 한 번만 실행
+    # (새로 생성한 가상 옷 이미지도 등록해 S3에서 다시 받지 않음)
+    image_fetcher = ImageFetcher(get_http_session, image_cache)
     
     # 1단계: 가상 옷 생성 (비동기)
-    virtual_clothing_results = {}
-    if virtual_clothing_items and not request.showClosetOnly:
-        print(f"[INFO] 가상 옷 생성 시작 - {len(virtual_clothing_items)}개")
-        virtual_clothing_results = await generate_virtual_clothing_batch(virtual_clothing_items, user_data, request.situation)
-        print("[INFO] 가상 옷 생성 완료")
-    
-    # 2단계: 가상 피팅 (비동기)
+    if virtual_clothing_items:
+        log(f"가상 옷 생성 시작 - {len(virtual_clothing_items)}개")
+        with span("virtual_clothing"):
+            virtual_clothing_results = await generate_virtual_clothing_batch(
+                virtual_clothing_items, user_data, request.situation, image_fetcher
+            )
+        closet.add_virtual_results(virtual_clothing_results)
+        log("가상 옷 생성 완료")
+
+    tryon_graph = create_tryon_graph(user_data["id"], image_fetcher)
+
+    async def tryon(index, outfit):
+        result = await apply_virtual_tryon_with_generated_clothing(
+            user_data, outfit, request.showClosetOnly, closet, tryon_graph
+        )
+        return index, apply_tryon_result(outfit, result, closet)
+
+    # 2단계: 가상 피팅 (모든 조합을 동시에 실행)
     tasks = []
-    for i, outfit in enumerate(structured_result["outfits"]):
-        if outfit["selected"] != "해당 조합에 맞는 옷이 없습니다" and outfit["selected"] != "[N/A]":
-            tasks.append(apply_virtual_tryon_with_generated_clothing(user_data, outfit, request.showClosetOnly, virtual_clothing_results))
+    for i, outfit in enumerate(outfits):
+        if is_matched_outfit(outfit):
+            tasks.append(tryon(i, outfit))
         else:
             outfit["virtualTryonImage"] = None
             outfit["virtualTryonError"] = "해당 조합에 맞는 옷이 없습니다."
+            outfit["clothing_links"] = get_clothing_links(outfit["selected"], closet)
+            yield i, outfit
 
-    # 모든 가상 피팅 작업을 동시에 실행
     if tasks:
-        print(f"[INFO] 가상 피팅 시작 - {len(tasks)}개 조합")
-        results = await asyncio.gather(*tasks)
-        print("[INFO] 가상 피팅 완료")
-    else:
-        results = []
+        log(f"가상 피팅 시작 - {len(tasks)}개 조합")
+        for task in asyncio.as_completed(tasks):
+            yield await task
+        log(f"가상 피팅 완료 - 단계 {tryon_graph.stats()}, 이미지 {image_fetcher.stats()}")
+
+# 같은 요청 중복 실행 방지 (클라이언트 재시도/이중 제출 시 진행 중인 추천을 공유하고, 직후 반복 요청은 결과 캐시로 응답)
+RECOMMENDATION_RESULT_TTL = float(os.getenv("RECOMMENDATION_RESULT_TTL", "30"))
+RECOMMENDATION_RESULT_MAXSIZE = int(os.getenv("RECOMMENDATION_RESULT_MAXSIZE", "1000"))
+recommendation_coalescer = RequestCoalescer(result_ttl=RECOMMENDATION_RESULT_TTL, maxsize=RECOMMENDATION_RESULT_MAXSIZE)
+
+def build_recommendation_request_key(request: RecommendationRequest):
+    """추천 요청을 정규화한 키 (공백/대소문자 차이 무시, 옷장이 바뀌면 다른 키)"""
+    context = {
+        "user_id": request.user_id,
+        "closet_epoch": closet_epochs.get(request.user_id, 0),
+        "situation": normalize_text(request.situation),
+        "time": normalize_text(request.targetTime),
+        "place": normalize_text(request.targetPlace),
+        "status": normalize_text(request.status),
+        "high": request.highTemperature,
+        "low": request.lowTemperature,
+        "rain": request.rainPercent,
+        "closet_only": request.showClosetOnly
+    }
+    raw_key = json.dumps(context, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
 
-    # 결과를 각 outfit에 할당
-    task_index = 0
-    virtual_clothing_urls = []  # 가상 옷 URL 수집
-    
-    for i, outfit in enumerate(structured_result["outfits"]):
-        if outfit.get("virtualTryonImage") is None and outfit.get("virtualTryonError") is None:
-            if task_index < len(results):
-                tryon_result = results[task_index]
-                
-                # 가상 옷인 경우와 일반 옷인 경우를 구분하여 처리
-                if isinstance(tryon_result, dict) and "virtual_clothing" in tryon_result:
-                    # 가상 옷 생성된 경우
-                    if tryon_result["error"]:
-                        outfit["virtualTryonImage"] = None
-                        outfit["virtualTryonError"] = tryon_result["error"]
-                    else:
-                        outfit["virtualTryonImage"] = tryon_result["tryon_url"]
-                        outfit["virtualTryonError"] = None
-                        # 가상 옷 URL 수집
-                        virtual_clothing_urls.extend(tryon_result["virtual_clothing"])
-                else:
-                    # 일반 옷장 옷인 경우 (기존 방식)
-                    tryon_url, error = tryon_result
-                    if error:
-                        outfit["virtualTryonImage"] = None
-                        outfit["virtualTryonError"] = error
-                    else:
-                        outfit["virtualTryonImage"] = tryon_url
-                        outfit["virtualTryonError"] = None
-                
-                task_index += 1
-        
-        # 옷의 링크 정보 추가
-        outfit["clothing_links"] = get_clothing_links(outfit["selected"], data, virtual_clothing_urls)
+async def compute_recommendation(request: RecommendationRequest):
+    try:
+        user_data, closet, structured_result = await prepare_recommendation(request)
+    except RecommendationError as e:
+        return error_response(e.result_msg)
 
-    print(f"[INFO] 추천 API 호출 완료 - {len(structured_result['outfits'])}개 조합 생성")
+    async for _ in run_outfit_tryons(request, user_data, closet, structured_result["outfits"]):
+        pass
+
+    log(f"추천 API 호출 완료 - {len(structured_result['outfits'])}개 조합 생성")
     return {
         "header": {"resultCode": "00", "resultMsg": "SUCCESS"},
         "body": {
             "summary": structured_result["summary"],
-            "weather": f"{request.status}, {int((request.highTemperature + request.lowTemperature) / 2)}°C, 강수확률: {request.rainPercent}%",
+            "weather": get_weather_text(request),
             "result": structured_result["outfits"]
         }
-    }
\ No newline at end of file
+    }
+
+# 메인 API 엔드포인트
+@app.post("/vision/recommendation")
+async def recommend(request: RecommendationRequest):
+    log(f"추천 API 호출 시작 - user_id: {request.user_id}")
+    # 사용자 없음/옷 없음 같은 실패 응답은 캐시하지 않음 (옷 등록 직후 다시 요청하는 경우)
+    return await recommendation_coalescer.run(
+        build_recommendation_request_key(request),
+        lambda: compute_recommendation(request),
+        cacheable=lambda response: response["header"]["resultCode"] == "00"
+    )
+
+# 스트리밍 중 예상하지 못한 오류(외부 API/S3 등)의 error 이벤트 resultMsg
+STREAM_ERROR_RESULT_MSG = "INTERNAL_ERROR"
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# 스트리밍 API 엔드포인트 (SSE: 텍스트 결과를 먼저 보내고 조합별 가상 피팅이 끝나는 대로 전송)
+@app.post("/vision/recommendation/stream")
+async def recommend_stream(request: RecommendationRequest):
+    log(f"스트리밍 추천 API 호출 시작 - user_id: {request.user_id}")
+
+    async def event_stream():
+        try:
+            user_data, closet, structured_result = await prepare_recommendation(request)
+
+            outfits = structured_result["outfits"]
+            yield format_sse("summary", {
+                "header": {"resultCode": "00", "resultMsg": "SUCCESS"},
+                "body": {
+                    "summary": structured_result["summary"],
+                    "weather": get_weather_text(request),
+                    "result": [
+                        {"combination": o["combination"], "selected": o["selected"], "reason": o["reason"]}
+                        for o in outfits
+                    ]
+                }
+            })
+
+            async for index, outfit in run_outfit_tryons(request, user_data, closet, outfits):
+                yield format_sse("outfit", {
+                    "index": index,
+                    "virtualTryonImage": outfit["virtualTryonImage"],
+                    "virtualTryonError": outfit["virtualTryonError"],
+                    "clothing_links": outfit["clothing_links"]
+                })
+        except RecommendationError as e:
+            yield format_sse("error", error_response(e.result_msg))
+            return
+        except Exception as e:
+            # 이미 200 응답을 보낸 뒤이므로 연결 끊김과 구분되도록 종료 이벤트로 실패를 알림
+            log(f"스트리밍 추천 처리 중 오류 발생 - user_id: {request.user_id}: {e!r}", "ERROR")
+            yield format_sse("error", error_response(STREAM_ERROR_RESULT_MSG))
+            return
+
+        log(f"스트리밍 추천 API 호출 완료 - {len(outfits)}개 조합 생성")
+        yield format_sse("done", {"count": len(outfits)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # 프록시(nginx 등)가 이벤트를 버퍼링하지 않도록 설정
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 비동기 추천 작업 (POST로 작업 생성 -> 백그라운드 워커 실행 -> GET으로 단계/부분 결과 조회)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH")
+# 실행 중 작업이 이 시간 이상 갱신되지 않으면 죽은 워커의 작업으로 보고 다시 실행
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "600"))
+if JOB_STORE_PATH:
+    job_store = SQLiteJobStore(JOB_STORE_PATH)
+else:
+    job_store = InMemoryJobStore()
+job_queue = asyncio.Queue()
+
+async def run_recommendation_job(job_id: str, request: RecommendationRequest):
+    """추천 단계를 실행하며 단계와 부분 결과를 작업 저장소에 기록"""
+    job_store.update(job_id, stage="RECOMMENDING")
+    try:
+        user_data, closet, structured_result = await prepare_recommendation(request)
+    except RecommendationError as e:
+        job_store.update(job_id, status=JOB_DONE, stage=JOB_DONE, result=error_response(e.result_msg))
+        return
+
+    outfits = structured_result["outfits"]
+    result = {
+        "header": {"resultCode": "00", "resultMsg": "SUCCESS"},
+        "body": {
+            "summary": structured_result["summary"],
+            "weather": get_weather_text(request),
+            "result": outfits
+        }
+    }
+    job_store.update(job_id, stage="TRYON", result=result)
+
+    async for _ in run_outfit_tryons(request, user_data, closet, outfits):
+        # 가상 피팅이 끝난 조합부터 부분 결과 갱신
+        job_store.update(job_id, result=result)
+
+    job_store.update(job_id, status=JOB_DONE, stage=JOB_DONE, result=result)
+
+async def job_worker():
+    while True:
+        job_id = await job_queue.get()
+        try:
+            if not job_store.claim(job_id, JOB_STALE_SECONDS):
+                continue
+            job = job_store.get(job_id)
+            # 작업 ID를 추적 ID로 사용 (작업 생성 요청과 별개로 워커에서 실행되므로 단계 요약을 따로 기록)
+            with start_trace(job_id) as trace:
+                log(f"추천 작업 실행 - job_id: {job_id}")
+                try:
+                    await run_recommendation_job(job_id, RecommendationRequest(**job["request"]))
+                    log(f"추천 작업 완료 - job_id: {job_id}")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log(f"추천 작업 실패 - job_id: {job_id}: {e}", "ERROR")
+                    job_store.update(job_id, status=JOB_FAILED, error=str(e))
+                finally:
+                    log_event("job", ms=round((time.perf_counter() - trace.started) * 1000, 1), stages=trace.summary())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log(f"추천 작업 실패 - job_id: {job_id}: {e}", "ERROR")
+            job_store.update(job_id, status=JOB_FAILED, error=str(e))
+        finally:
+            job_queue.task_done()
+
+async def requeue_stale_jobs():
+    """다른 프로세스가 실행하다 멈춘 작업을 주기적으로 다시 가져옴 (같은 저장소를 여러 프로세스가 쓰는 경우)"""
+    while True:
+        await asyncio.sleep(JOB_STALE_SECONDS / 2)
+        try:
+            requeued = job_store.requeue_running(JOB_STALE_SECONDS)
+        except Exception as e:
+            log(f"멈춘 추천 작업 확인 실패: {e}", "ERROR")
+            continue
+        if requeued:
+            log(f"멈춘 추천 작업 재등록 - {len(requeued)}개")
+        for job_id in requeued:
+            job_queue.put_nowait(job_id)
+
+def start_job_workers():
+    # 이전 실행에서 중단된 작업은 갱신 시각과 관계없이 바로 다시 실행 (다른 프로세스가 실행 중인 작업은 제외)
+    requeued = job_store.requeue_running(JOB_STALE_SECONDS)
+    if requeued:
+        log(f"중단된 추천 작업 재등록 - {len(requeued)}개")
+    for job in job_store.list_unfinished():
+        job_queue.put_nowait(job["job_id"])
+    workers = [asyncio.create_task(job_worker()) for _ in range(JOB_WORKERS)]
+    workers.append(asyncio.create_task(requeue_stale_jobs()))
+    return workers
+
+def get_job_progress(job):
+    """단계와 가상 피팅 완료 조합 수"""
+    outfits = (job["result"] or {}).get("body", {}).get("result", [])
+    completed = sum(1 for outfit in outfits if "virtualTryonImage" in outfit)
+    return {"stage": job["stage"], "tryonCompleted": completed, "tryonTotal": len(outfits)}
+
+@app.post("/vision/recommendation/jobs")
+async def create_recommendation_job(request: RecommendationRequest):
+    job = job_store.create(request.model_dump())
+    job_queue.put_nowait(job["job_id"])
+    log(f"추천 작업 생성 - job_id: {job['job_id']}, user_id: {request.user_id}")
+    return {
+        "header": {"resultCode": "00", "resultMsg": "SUCCESS"},
+        "body": {"jobId": job["job_id"], "status": job["status"]}
+    }
+
+@app.get("/vision/recommendation/jobs/{job_id}")
+async def get_recommendation_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        return error_response("JOB_NOT_FOUND")
+
+    return {
+        "header": {"resultCode": "00", "resultMsg": "SUCCESS"},
+        "body": {
+            "jobId": job_id,
+            "status": job["status"],
+            "progress": get_job_progress(job),
+            "error": job["error"],
+            "result": job["result"]
+        }
+    }
@@ -0,0 +1,96 @@
+"""두 번째 GPT 프롬프트 옷장 목록 벤치마크
+
+기존 방식(카테고리별 모든 옷을 "- 옷ID (카테고리, 패턴, 톤)" 한 줄씩 += 로 연결)과
+closet_prompt.compile_closet(짧은 ID + 같은 패턴/톤 묶음 + 토큰 예산에 맞춘 카테고리별 상한)의
+옷장 목록 토큰 수, 포함된 옷 수, 생성 시간을 합성 옷장(10~500벌)에서 비교합니다.
+
+    python benchmarks/closet_prompt_benchmark.py --budget 600
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from closet_prompt import compile_closet, count_tokens
+from outfit_rules import TOPS, BOTTOMS, ONEPIECES
+from outfit_matcher import PATTERNS, TONES
+
+CLOSET_SIZES = [10, 25, 50, 100, 250, 500]
+# 추천받은 조합에 해당하는 카테고리 (filter_clothing_by_recommendations 이후 남는 카테고리와 같은 구성)
+RECOMMENDED_COMBINATIONS = "조합 1: TOP: SHIRT, BOTTOM: JEANS\n조합 2: TOP: CARDIGAN, BOTTOM: SLACKS\n조합 3: ONEPIECE: DRESS"
+NEEDED_CATEGORIES = {"SHIRT", "JEANS", "CARDIGAN", "SLACKS", "DRESS"}
+
+
+def make_closet(size, seed=0):
+    """DB ID가 5~6자리인 합성 옷장 -> organize_clothing_by_category + 추천 카테고리 필터링 결과 형태"""
+    rng = random.Random(seed)
+    organized = {'TOP': {}, 'BOTTOM': {}, 'ONEPIECE': {}}
+    for i in range(size):
+        clothing_type, categories = rng.choice([('TOP', TOPS), ('BOTTOM', BOTTOMS), ('ONEPIECE', ONEPIECES)])
+        category = rng.choice(categories)
+        if category not in NEEDED_CATEGORIES:
+            continue
+        organized[clothing_type].setdefault(category, []).append({
+            'id': str(rng.randrange(10000, 999999)),
+            'category': category,
+            'pattern': rng.choice(PATTERNS[:4]),
+            'tone': rng.choice(TONES)
+        })
+    return organized
+
+
+def legacy_closet_text(organized_clothes):
+    """기존 aws_api.ask_gpt_for_best_clothing_sets의 clothing_list_str"""
+    clothing_list_str = ""
+    for clothing_type, categories in organized_clothes.items():
+        if categories:
+            clothing_list_str += f"\n{clothing_type}:\n"
+            for category, items in categories.items():
+                clothing_list_str += f"  {category}:\n"
+                for item in items:
+                    clothing_list_str += f"    - {item['id']} ({item['category']}, {item['pattern']}, {item['tone']})\n"
+    return clothing_list_str
+
+
+def time_ms(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=int, default=600)
+    parser.add_argument("--max-per-category", type=int, default=15)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'closet':>6} {'listed':>6} | {'legacy tok':>10} {'ms':>6} | {'compiled tok':>12} {'items':>5} {'cap':>4} {'ms':>6} | {'saved':>6}")
+    for size in CLOSET_SIZES:
+        organized = make_closet(size)
+        listed = sum(len(items) for categories in organized.values() for items in categories.values())
+
+        legacy_text = legacy_closet_text(organized)
+        legacy_tokens = count_tokens(legacy_text)
+        legacy_ms = time_ms(lambda: legacy_closet_text(organized), args.iterations)
+
+        compiled = compile_closet(organized, RECOMMENDED_COMBINATIONS, args.budget, args.max_per_category)
+        compiled_ms = time_ms(
+            lambda: compile_closet(organized, RECOMMENDED_COMBINATIONS, args.budget, args.max_per_category),
+            args.iterations
+        )
+        stats = compiled.stats
+        saved = 1 - stats["tokens"] / legacy_tokens if legacy_tokens else 0.0
+        print(f"{size:>6} {listed:>6} | {legacy_tokens:>10} {legacy_ms:>6.2f} | {stats['tokens']:>12} "
+              f"{stats['items_included']:>5} {stats['per_category_cap']:>4} {compiled_ms:>6.2f} | {saved:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""사용자/옷장 조회 동시 부하 벤치마크 (동기 세션 vs 비동기 커넥션 풀)
+
+로컬 SQLite 파일을 MySQL 대역으로 사용하고, 쿼리마다 RDS 왕복 지연을 주입합니다.
+같은 이벤트 루프에서 동시에 들어온 요청의 지연 시간 p50/p99를 비교합니다.
+
+    python benchmarks/db_benchmark.py --requests 200 --latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DB_FILE = os.path.join(tempfile.gettempdir(), "fitu_db_benchmark.sqlite")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_FILE}")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+import database
+
+# 지연 함수는 행마다가 아니라 쿼리당 한 번만 실행되도록 서브쿼리로 조인
+USER_QUERY = """
+    SELECT id, gender, age, height, weight, skin_tone, body_image_url
+    FROM users CROSS JOIN (SELECT rds_latency(:ms) AS lag)
+    WHERE id = :user_id
+"""
+CLOSET_QUERY = """
+    SELECT id, type, category, pattern, color, image_url
+    FROM clothes CROSS JOIN (SELECT rds_latency(:ms) AS lag)
+    WHERE user_id = :user_id
+"""
+
+
+def rds_latency(ms):
+    """네트워크 왕복 지연 흉내"""
+    time.sleep(ms / 1000)
+    return 0
+
+
+def register_latency_function(db_engine):
+    @event.listens_for(db_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("rds_latency", 1, rds_latency)
+
+
+def seed(num_users, items_per_user):
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    seed_engine = create_engine(f"sqlite:///{DB_FILE}")
+    with seed_engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE users (id TEXT PRIMARY KEY, gender TEXT, age INT, height INT,
+                                weight INT, skin_tone TEXT, body_image_url TEXT)
+        """))
+        conn.execute(text("""
+            CREATE TABLE clothes (id INTEGER PRIMARY KEY, user_id TEXT, type TEXT, category TEXT,
+                                  pattern TEXT, color TEXT, image_url TEXT)
+        """))
+        conn.execute(text("CREATE INDEX idx_clothes_user ON clothes (user_id)"))
+        for u in range(num_users):
+            conn.execute(text("INSERT INTO users VALUES (:id, 'FEMALE', 27, 165, 52, 'COOL', NULL)"), {"id": f"user-{u}"})
+            conn.execute(text("""
+                INSERT INTO clothes (user_id, type, category, pattern, color, image_url)
+                VALUES (:user_id, 'TOP', 'SHIRT', 'STRIPE', 'LIGHT', 'https://example.com/c.jpg')
+            """), [{"user_id": f"user-{u}"}] * items_per_user)
+    seed_engine.dispose()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, latencies, elapsed):
+    print(f"{label:<22} p50 {percentile(latencies, 50) * 1000:8.1f}ms  "
+          f"p99 {percentile(latencies, 99) * 1000:8.1f}ms  "
+          f"mean {statistics.mean(latencies) * 1000:8.1f}ms  "
+          f"처리량 {len(latencies) / elapsed:7.1f} req/s")
+
+
+async def run_sync(num_requests, num_users, latency_ms):
+    """기존 방식: async 핸들러 안에서 동기 세션으로 조회"""
+    sync_engine = create_engine(f"sqlite:///{DB_FILE}", pool_size=database.DB_POOL_SIZE)
+    register_latency_function(sync_engine)
+    SessionLocal = sessionmaker(bind=sync_engine)
+
+    async def handle(i):
+        user_id = f"user-{i % num_users}"
+        session = SessionLocal()
+        try:
+            session.execute(text(USER_QUERY), {"user_id": user_id, "ms": latency_ms}).fetchone()
+            session.execute(text(CLOSET_QUERY), {"user_id": user_id, "ms": latency_ms}).fetchall()
+        finally:
+            session.close()
+        # 모든 요청이 동시에 도착했다고 보고 도착 시각부터 응답까지 측정
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[handle(i) for i in range(num_requests)])
+    report("before (sync session)", latencies, time.perf_counter() - start)
+    sync_engine.dispose()
+
+
+async def run_async(num_requests, num_users, latency_ms):
+    """개선 방식: database 모듈의 비동기 커넥션 풀"""
+    register_latency_function(database.engine.sync_engine)
+
+    async def handle(i):
+        user_id = f"user-{i % num_users}"
+        await database.fetch_one(USER_QUERY, {"user_id": user_id, "ms": latency_ms})
+        await database.fetch_all(CLOSET_QUERY, {"user_id": user_id, "ms": latency_ms})
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[handle(i) for i in range(num_requests)])
+    report("after (async pool)", latencies, time.perf_counter() - start)
+    await database.dispose_engine()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--items", type=int, default=40, help="사용자당 옷 개수")
+    parser.add_argument("--latency-ms", type=float, default=20, help="쿼리당 주입할 DB 왕복 지연")
+    args = parser.parse_args()
+
+    seed(args.users, args.items)
+    print(f"요청 {args.requests}건, 풀 크기 {database.DB_POOL_SIZE}+{database.DB_MAX_OVERFLOW}, 쿼리 지연 {args.latency_ms}ms")
+    await run_sync(args.requests, args.users, args.latency_ms)
+    await run_async(args.requests, args.users, args.latency_ms)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+"""FASHN 입력 이미지 준비 파이프라인 벤치마크
+
+기존 방식(다운로드 바이트 -> 임시 파일 -> 리사이즈 후 임시 JPEG -> 다시 읽어 Base64)과
+메모리 파이프라인(image_prep: 1회 디코딩 + JPEG draft 축소 디코딩 + BytesIO + data URI)의
+이미지당 CPU 시간, 경과 시간, Python 할당 최대치(tracemalloc), 최대 RSS 증가량을 비교합니다.
+PIL 픽셀 버퍼는 tracemalloc에 잡히지 않으므로, 디코딩 메모리는 파이프라인을 1회만 실행하는
+별도 프로세스의 최대 RSS 증가량으로 측정합니다.
+
+    python benchmarks/image_prep_benchmark.py --iterations 20
+"""
+import argparse
+import base64
+import io
+import os
+import resource
+import subprocess
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from image_prep import prepare_image_bytes, to_data_uri
+
+# (이름, 크기, 포맷): 휴대폰 전신 사진, 일반 옷 사진, DALL-E PNG
+SAMPLES = [
+    ("phone_jpeg_3024x4032", (3024, 4032), "JPEG"),
+    ("closet_jpeg_1080x1440", (1080, 1440), "JPEG"),
+    ("dalle_png_1024x1024", (1024, 1024), "PNG"),
+]
+
+
+def make_sample(size, fmt, seed=0):
+    """그라디언트 + 노이즈로 실제 사진과 비슷한 압축률의 이미지 생성"""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1)
+    noise = rng.integers(0, 40, size=(height, width, 3))
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, fmt, **({"quality": 92} if fmt == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+def legacy_resize_image_for_fashn(image_path, max_size=640):
+    """기존 aws_api.resize_image_for_fashn"""
+    with Image.open(image_path) as img:
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        width, height = img.size
+        if width > height:
+            new_width = max_size
+            new_height = int(height * (max_size / width))
+        else:
+            new_height = max_size
+            new_width = int(width * (max_size / height))
+        resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
+            resized_img.save(tmp_file.name, 'JPEG', quality=85, optimize=True)
+            return tmp_file.name
+
+
+def legacy_pipeline(content):
+    """기존 방식: 다운로드 바이트 임시 파일 저장 -> 리사이즈 임시 파일 -> Base64"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
+        tmp_file.write(content)
+        original_path = tmp_file.name
+    resized_path = legacy_resize_image_for_fashn(original_path)
+    with open(resized_path, "rb") as image_file:
+        encoded = base64.b64encode(image_file.read()).decode('utf-8')
+    data_uri = f"data:image/jpeg;base64,{encoded}"
+    os.unlink(resized_path)
+    os.unlink(original_path)
+    return data_uri
+
+
+def memory_pipeline(content):
+    return to_data_uri(prepare_image_bytes(content))
+
+
+def measure(pipeline, content, iterations):
+    cpu_times, wall_times = [], []
+    for _ in range(iterations):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        pipeline(content)
+        cpu_times.append(time.process_time() - cpu_start)
+        wall_times.append(time.perf_counter() - wall_start)
+
+    tracemalloc.start()
+    pipeline(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(cpu_times), statistics.median(wall_times), peak
+
+
+PIPELINES = {"legacy": legacy_pipeline, "memory": memory_pipeline}
+
+
+def measure_rss_delta(sample_path, label):
+    """새 프로세스에서 파이프라인 1회 실행 시 최대 RSS 증가량 (KB)"""
+    output = subprocess.check_output([sys.executable, __file__, "--rss-child", sample_path, label])
+    return int(output)
+
+
+def peak_rss_kb():
+    """현재 프로세스 최대 RSS (KB). ru_maxrss는 exec 후에도 부모 값이 남으므로 /proc의 VmHWM 우선 사용"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def rss_child(sample_path, label):
+    with open(sample_path, "rb") as f:
+        content = f.read()
+    PIPELINES[label](make_sample((64, 64), "JPEG"))  # 라이브러리 초기화 비용 제외
+    before = peak_rss_kb()
+    PIPELINES[label](content)
+    print(peak_rss_kb() - before)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--rss-child", nargs=2, metavar=("SAMPLE_PATH", "PIPELINE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_child:
+        rss_child(*args.rss_child)
+        return
+
+    print(f"{'sample':<24} {'pipeline':<8} {'cpu ms':>8} {'wall ms':>8} {'py peak KB':>11} {'rss +KB':>9} {'payload KB':>11}")
+    for name, size, fmt in SAMPLES:
+        content = make_sample(size, fmt)
+        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
+            tmp_file.write(content)
+            sample_path = tmp_file.name
+
+        results = {}
+        for label, pipeline in PIPELINES.items():
+            cpu, wall, peak = measure(pipeline, content, args.iterations)
+            rss = measure_rss_delta(sample_path, label)
+            payload = len(pipeline(content))
+            results[label] = cpu
+            print(f"{name:<24} {label:<8} {cpu * 1000:8.1f} {wall * 1000:8.1f} {peak / 1024:11.0f} {rss:9d} {payload / 1024:11.0f}")
+        print(f"{'':<24} speedup  {results['legacy'] / results['memory']:7.2f}x")
+        os.unlink(sample_path)
+
+
+if __name__ == "__main__":
+    main()
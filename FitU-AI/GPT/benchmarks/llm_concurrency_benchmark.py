@@ -0,0 +1,75 @@
+"""LLM 호출 동시 처리량 벤치마크 (동기 invoke vs AsyncLLMClient)
+
+지연을 주입한 스텁 LLM으로 /vision/recommendation의 GPT 2회 호출을 흉내내어
+한 워커(이벤트 루프)에서 동시에 처리되는 추천 수를 비교합니다.
+
+    python benchmarks/llm_concurrency_benchmark.py --requests 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llm_client import AsyncLLMClient
+
+
+class StubResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubLLM:
+    """지연 시간을 주입한 가짜 LLM"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return StubResponse("조합 1: TOP: SHIRT, BOTTOM: JEANS")
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.latency)
+        return StubResponse("조합 1: TOP: SHIRT, BOTTOM: JEANS")
+
+
+async def blocking_recommend(llm):
+    """기존 방식: async 핸들러 안에서 동기 invoke 2회"""
+    llm.invoke(["1단계"])
+    llm.invoke(["2단계"])
+
+
+async def async_recommend(client):
+    """개선 방식: AsyncLLMClient로 2회 호출"""
+    await client.ainvoke(["1단계"])
+    await client.ainvoke(["2단계"])
+
+
+async def run(label, make_task, num_requests):
+    start = time.perf_counter()
+    await asyncio.gather(*[make_task() for _ in range(num_requests)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {num_requests}건 {elapsed:7.2f}s  처리량 {num_requests / elapsed:7.2f} req/s")
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="LLM 호출 1회 지연(초)")
+    parser.add_argument("--concurrency", type=int, default=32, help="AsyncLLMClient 동시성 제한")
+    args = parser.parse_args()
+
+    llm = StubLLM(args.latency)
+    client = AsyncLLMClient(llm, max_concurrency=args.concurrency)
+
+    before = await run("before (sync invoke)", lambda: blocking_recommend(llm), args.requests)
+    after = await run(f"after (ainvoke, limit={args.concurrency})", lambda: async_recommend(client), args.requests)
+    print(f"속도 향상: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,330 @@
+"""부하 테스트용 외부 서비스 대역 (OpenAI, FASHN, 이미지 호스팅, S3, 옷장 DB)
+
+- OpenAI: /openai/v1/chat/completions (1단계 조합 추천, 2단계 옷장 매칭 형식으로 응답), /openai/v1/images/generations
+- FASHN: /fashn/v1/run, /fashn/v1/status/{id} (지연 시간 동안 in_queue -> processing -> completed)
+- 이미지: /images/{name} (옷장 옷, 모델 사진, DALL-E/FASHN 결과 이미지)
+- S3: moto 서버 (버킷 생성 후 경로 방식 URL로 공개 조회)
+- DB: 사용자/옷장을 채운 SQLite 파일
+
+지연 시간은 서비스별 로그정규 분포(중앙값, sigma)로, 실패는 서비스별 확률로 주입한다.
+스텁 서버는 별도 스레드의 이벤트 루프에서 실행되므로 측정 대상 서비스의 이벤트 루프 지연에 섞이지 않는다.
+"""
+import io
+import json
+import math
+import random
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+import asyncio
+import zlib
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from outfit_rules import TOPS, BOTTOMS, ONEPIECES
+from outfit_matcher import PATTERNS
+
+BUCKET_NAME = "amzn-s3-fitu-bucket"
+TONE_VALUES = ["LIGHT", "DARK", "NOT_CONSIDERED"]
+
+COMBINATION_LINE = re.compile(r"조합 \d+: TOP: (\w+), BOTTOM: (\w+)")
+AVAILABLE_LINE = re.compile(r"^\s*- (TOP|BOTTOM|ONEPIECE): (.+)$", re.M)
+# 압축된 옷장 목록 줄 (예: "SHIRT: PLAIN/L 1,2; STRIPE/D 3")
+CLOSET_LINE = re.compile(r"^\s*([A-Z]+): ((?:[A-Z]+/[LDN] [\d,]+(?:; )?)+)$", re.M)
+
+
+class LatencyModel:
+    """로그정규 지연 (중앙값 median초, 퍼짐 sigma) + 실패 확률"""
+
+    def __init__(self, median: float, sigma: float = 0.5, failure_rate: float = 0.0, seed: int = 0):
+        self.median = median
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+    def sample(self):
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(self._rng.gauss(0, self.sigma))
+
+    def fails(self):
+        return self._rng.random() < self.failure_rate
+
+    async def wait(self):
+        await asyncio.sleep(self.sample())
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _last_user_message(body):
+    messages = body.get("messages") or []
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            content = message.get("content")
+            return content if isinstance(content, str) else " ".join(part.get("text", "") for part in content)
+    return ""
+
+
+def build_combination_response(prompt: str, rng: random.Random):
+    """1단계: 옷장에 있는 종류(없으면 전체 종류)로 TOP/BOTTOM 조합 3개"""
+    available = {clothing_type: [c.strip() for c in categories.split(",")] for clothing_type, categories in AVAILABLE_LINE.findall(prompt)}
+    tops = available.get("TOP") or TOPS
+    bottoms = available.get("BOTTOM") or BOTTOMS
+    lines = [f"조합 {i}: TOP: {rng.choice(tops)}, BOTTOM: {rng.choice(bottoms)}" for i in range(1, 4)]
+    return "\n".join(lines)
+
+
+def build_matching_response(prompt: str, rng: random.Random):
+    """2단계: 추천 조합마다 압축 옷장 목록의 짧은 ID 선택 (없으면 가상 옷 또는 매칭 없음)"""
+    closet_only = "추천: [옷종류]" not in prompt
+    closet = {}
+    for category, groups in CLOSET_LINE.findall(prompt):
+        ids = [short_id for group in groups.split("; ") for short_id in group.split(" ", 1)[1].split(",") if short_id]
+        closet[category] = ids
+
+    def pick(category):
+        if closet.get(category):
+            return f"{rng.choice(closet[category])} ({category})"
+        if closet_only:
+            return None
+        return f"추천: {category} ({rng.choice(PATTERNS)}, {rng.choice(TONE_VALUES)})"
+
+    blocks = ["요약: 부하 테스트용 스타일링"]
+    for i, (top, bottom) in enumerate(COMBINATION_LINE.findall(prompt)[:3], start=1):
+        top_part, bottom_part = pick(top), pick(bottom)
+        selected = f"{top_part} + {bottom_part}" if top_part and bottom_part else "해당 조합에 맞는 옷이 없습니다"
+        blocks.append(f"조합 {i}: TOP: {top}, BOTTOM: {bottom}\n선택한 옷: {selected}\n이유: 부하 테스트 응답")
+    return "\n\n".join(blocks)
+
+
+class StubServices:
+    """OpenAI/FASHN/이미지 스텁 HTTP 서버 (별도 스레드, 서비스별 포트) + moto S3 서버"""
+
+    def __init__(self, chat: LatencyModel, image_generation: LatencyModel, fashn_run: LatencyModel,
+                 fashn_processing: LatencyModel, image_download: LatencyModel, image_size=(768, 1024)):
+        self.chat = chat
+        self.image_generation = image_generation
+        self.fashn_run = fashn_run
+        self.fashn_processing = fashn_processing
+        self.image_download = image_download
+        self.image_size = image_size
+        self._predictions = {}  # 예측 ID -> (제출 시각, 처리 시간, 실패 여부)
+        self._images = {}  # 색 번호 -> JPEG 바이트
+        self.requests = {}
+        # 서비스별로 다른 포트 (HTTP 커넥션 풀의 호스트별 제한이 실제 환경처럼 서비스마다 따로 적용되도록)
+        self.openai_url = None
+        self.fashn_url = None
+        self.image_url = None
+        self.s3_endpoint = None
+        self._loop = None
+        self._thread = None
+        self._moto = None
+
+    def _count(self, name):
+        self.requests[name] = self.requests.get(name, 0) + 1
+
+    def _image_bytes(self, name: str):
+        color_index = zlib.crc32(name.encode()) % 16
+        content = self._images.get(color_index)
+        if content is None:
+            from PIL import Image
+            color = ((color_index * 53) % 256, (color_index * 97) % 256, (color_index * 151) % 256)
+            buffer = io.BytesIO()
+            Image.new("RGB", self.image_size, color).save(buffer, "JPEG", quality=90)
+            content = buffer.getvalue()
+            self._images[color_index] = content
+        return content
+
+    def _error(self, status, message):
+        return web.json_response({"error": {"message": message, "type": "stub_error"}}, status=status)
+
+    async def chat_completions(self, request):
+        self._count("openai_chat")
+        body = await request.json()
+        await self.chat.wait()
+        if self.chat.fails():
+            return self._error(503, "stub chat failure")
+
+        prompt = _last_user_message(body)
+        rng = random.Random(prompt)
+        if "옷장에 있는 옷들입니다" in prompt:
+            content = build_matching_response(prompt, rng)
+        else:
+            content = build_combination_response(prompt, rng)
+        return web.json_response({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 2, "completion_tokens": len(content) // 2,
+                      "total_tokens": (len(prompt) + len(content)) // 2}
+        })
+
+    async def image_generations(self, request):
+        self._count("openai_image")
+        await request.json()
+        await self.image_generation.wait()
+        if self.image_generation.fails():
+            return self._error(503, "stub image failure")
+        return web.json_response({
+            "created": int(time.time()),
+            "data": [{"url": f"{self.image_url}/images/dalle-{uuid.uuid4().hex}.png"}]
+        })
+
+    async def fashn_run_handler(self, request):
+        self._count("fashn_run")
+        await request.json()
+        await self.fashn_run.wait()
+        if self.fashn_run.fails():
+            return web.Response(status=500, text="stub fashn run failure")
+        prediction_id = uuid.uuid4().hex
+        self._predictions[prediction_id] = (time.monotonic(), self.fashn_processing.sample(), self.fashn_processing.fails())
+        return web.json_response({"id": prediction_id, "error": None})
+
+    async def fashn_status(self, request):
+        self._count("fashn_status")
+        prediction_id = request.match_info["prediction_id"]
+        entry = self._predictions.get(prediction_id)
+        if entry is None:
+            return web.Response(status=404, text="unknown prediction")
+
+        submitted_at, duration, failed = entry
+        elapsed = time.monotonic() - submitted_at
+        if elapsed < duration * 0.3:
+            return web.json_response({"id": prediction_id, "status": "in_queue"})
+        if elapsed < duration:
+            return web.json_response({"id": prediction_id, "status": "processing"})
+        del self._predictions[prediction_id]
+        if failed:
+            return web.json_response({"id": prediction_id, "status": "failed", "error": {"name": "StubError"}})
+        return web.json_response({
+            "id": prediction_id, "status": "completed",
+            "output": [f"{self.image_url}/images/tryon-{prediction_id}.jpg"]
+        })
+
+    async def image(self, request):
+        self._count("image")
+        name = request.match_info["name"]
+        await self.image_download.wait()
+        if self.image_download.fails():
+            return web.Response(status=503, text="stub image failure")
+        etag = f'"{zlib.crc32(name.encode()) % 16}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(body=self._image_bytes(name), content_type="image/jpeg", headers={"ETag": etag})
+
+    def _build_app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/openai/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/openai/v1/images/generations", self.image_generations)
+        app.router.add_post("/fashn/v1/run", self.fashn_run_handler)
+        app.router.add_get("/fashn/v1/status/{prediction_id}", self.fashn_status)
+        app.router.add_get("/images/{name}", self.image)
+        return app
+
+    def start(self):
+        ports = [free_port() for _ in range(3)]
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            runner = web.AppRunner(self._build_app(), access_log=None)
+            self._loop.run_until_complete(runner.setup())
+            for port in ports:
+                self._loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="load-stubs", daemon=True)
+        self._thread.start()
+        started.wait()
+        self.openai_url, self.fashn_url, self.image_url = (f"http://127.0.0.1:{port}" for port in ports)
+
+        from moto.server import ThreadedMotoServer
+        s3_port = free_port()
+        self._moto = ThreadedMotoServer(ip_address="127.0.0.1", port=s3_port, verbose=False)
+        self._moto.start()
+        self.s3_endpoint = f"http://127.0.0.1:{s3_port}"
+        return self
+
+    def create_bucket(self, bucket: str = BUCKET_NAME, region: str = "ap-northeast-2"):
+        import boto3
+        client = boto3.client(
+            "s3", endpoint_url=self.s3_endpoint, region_name=region,
+            aws_access_key_id="load-test", aws_secret_access_key="load-test"
+        )
+        client.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": region})
+        # 운영 버킷처럼 객체 공개 조회 허용 (다음 피팅 단계가 결과 이미지를 URL로 다시 받음)
+        client.put_bucket_policy(Bucket=bucket, Policy=json.dumps({
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow", "Principal": "*", "Action": "s3:GetObject", "Resource": f"arn:aws:s3:::{bucket}/*"
+            }]
+        }))
+        return f"{self.s3_endpoint}/{bucket}"
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+        if self._moto is not None:
+            self._moto.stop()
+
+
+def seed_database(path: str, image_base_url: str, num_users: int = 50, closet_size: int = 40, seed: int = 0):
+    """users/clothes 테이블을 만들고 사용자마다 closet_size벌을 채움 -> 사용자 ID 목록"""
+    from sqlalchemy import create_engine, text
+
+    rng = random.Random(seed)
+    if Path(path).exists():
+        Path(path).unlink()
+    engine = create_engine(f"sqlite:///{path}")
+    user_ids = []
+    categories = [("TOP", c) for c in TOPS] + [("BOTTOM", c) for c in BOTTOMS] + [("ONEPIECE", c) for c in ONEPIECES]
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE users (id TEXT PRIMARY KEY, gender TEXT, age INT, height INT,
+                                weight INT, skin_tone TEXT, body_image_url TEXT)
+        """))
+        conn.execute(text("""
+            CREATE TABLE clothes (id INTEGER PRIMARY KEY, user_id TEXT, type TEXT, category TEXT,
+                                  pattern TEXT, color TEXT, image_url TEXT)
+        """))
+        conn.execute(text("CREATE INDEX idx_clothes_user ON clothes (user_id)"))
+        for u in range(num_users):
+            user_id = f"load-user-{u}"
+            user_ids.append(user_id)
+            conn.execute(text("INSERT INTO users VALUES (:id, :gender, :age, :height, :weight, :skin_tone, :image)"), {
+                "id": user_id, "gender": rng.choice(["FEMALE", "MALE"]), "age": rng.randint(18, 60),
+                "height": rng.randint(150, 190), "weight": rng.randint(45, 90),
+                "skin_tone": rng.choice(["COOL", "WARM", "NEUTRAL"]), "image": f"{image_base_url}/images/model-{u}.jpg"
+            })
+            rows = []
+            for i in range(closet_size):
+                clothing_type, category = rng.choice(categories)
+                rows.append({
+                    "user_id": user_id, "type": clothing_type, "category": category,
+                    "pattern": rng.choice(PATTERNS), "color": rng.choice(TONE_VALUES),
+                    "image_url": f"{image_base_url}/images/closet-{u}-{i}.jpg"
+                })
+            if rows:
+                conn.execute(text("""
+                    INSERT INTO clothes (user_id, type, category, pattern, color, image_url)
+                    VALUES (:user_id, :type, :category, :pattern, :color, :image_url)
+                """), rows)
+    engine.dispose()
+    return user_ids
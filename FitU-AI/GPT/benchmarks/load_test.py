@@ -0,0 +1,371 @@
+"""추천 API 종단 부하 테스트 (외부 서비스는 모두 로컬 대역 사용, API 비용 없음)
+
+load_stubs의 OpenAI/FASHN/이미지 스텁, moto S3, 채워 둔 SQLite 옷장 DB를 띄우고
+aws_api 앱을 같은 프로세스의 uvicorn으로 실행한 뒤 지정한 동시성으로 추천 엔드포인트를 호출합니다.
+처리량, 응답 시간 분위수, 서비스 이벤트 루프 지연, 메모리(RSS), 단계별 소요 시간(/metrics 히스토그램)을 출력합니다.
+
+부하 발생기와 스텁은 각각 별도 스레드의 이벤트 루프에서 실행되므로 이벤트 루프 지연은 서비스 자체의 값입니다.
+(메모리는 프로세스 전체 RSS이므로 스텁/부하 발생기 몫이 포함됩니다.)
+
+    # 실제 지연의 1/10로 빠르게 확인
+    python benchmarks/load_test.py --requests 100 --concurrency 10 --latency-scale 0.1
+
+    # 실패 주입 + 스트리밍 엔드포인트 + 결과 JSON 저장
+    python benchmarks/load_test.py --endpoint stream --fashn-failure-rate 0.05 --chat-failure-rate 0.02 \\
+        --json load_test_result.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from load_stubs import LatencyModel, StubServices, free_port, seed_database
+
+SITUATIONS = ["데이트", "출근", "친구 모임", "면접", "결혼식 하객", "운동", "여행", "캠핑", "소개팅", "졸업식"]
+PLACES = ["카페", "사무실", "레스토랑", "공원", "호텔", "야외"]
+TIMES = ["오전", "오후", "저녁", "밤"]
+STATUSES = ["맑음", "흐림", "비", "눈"]
+ENDPOINTS = {"recommendation": "/vision/recommendation", "stream": "/vision/recommendation/stream"}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def current_rss_bytes():
+    """현재 RSS (리눅스 /proc, 없으면 최대 RSS로 대신)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def configure_service_environment(stubs: StubServices, db_path: str, bucket_url: str, work_dir: str):
+    """aws_api import 전에 외부 서비스 주소를 스텁으로 지정 (실제 키/주소가 설정되어 있어도 덮어써서 외부 호출 방지)"""
+    environment = {
+        "OPENAI_API_KEY": "sk-load-test",
+        "OPENAI_BASE_URL": f"{stubs.openai_url}/openai/v1",
+        "OPENAI_API_BASE": f"{stubs.openai_url}/openai/v1",
+        "FASHN_API_KEY": "fashn-load-test",
+        "FASHN_BASE_URL": f"{stubs.fashn_url}/fashn/v1",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+        "AWS_ACCESS_KEY_ID": "load-test",
+        "AWS_SECRET_ACCESS_KEY": "load-test",
+        "AWS_DEFAULT_REGION": "ap-northeast-2",
+        "AWS_ENDPOINT_URL_S3": stubs.s3_endpoint,
+        "S3_PUBLIC_BASE_URL": bucket_url,
+        "RENDITION_DIR": os.path.join(work_dir, "renditions"),
+    }
+    for key, value in environment.items():
+        os.environ[key] = value
+
+
+class ServiceMonitor:
+    """서비스 이벤트 루프 지연 (interval마다 sleep 초과 시간)과 RSS 샘플링"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags = []
+        self.rss_start = current_rss_bytes()
+        self.rss_peak = self.rss_start
+        self._task = None
+
+    async def _run(self):
+        iteration = 0
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+            iteration += 1
+            if iteration % 10 == 0:
+                self.rss_peak = max(self.rss_peak, current_rss_bytes())
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self.rss_peak = max(self.rss_peak, current_rss_bytes())
+
+
+def build_requests(user_ids, count, closet_only_ratio, seed):
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(count):
+        low = rng.randint(-5, 25)
+        bodies.append({
+            "user_id": rng.choice(user_ids),
+            "situation": rng.choice(SITUATIONS),
+            "targetTime": rng.choice(TIMES),
+            "targetPlace": rng.choice(PLACES),
+            "highTemperature": low + rng.randint(3, 10),
+            "lowTemperature": low,
+            "rainPercent": rng.choice([0, 10, 30, 60, 90]),
+            "status": rng.choice(STATUSES),
+            "showClosetOnly": rng.random() < closet_only_ratio
+        })
+    return bodies
+
+
+async def drive(base_url, path, bodies, concurrency, timeout):
+    """동시 concurrency개 연결로 요청 전송 -> 요청별 결과 목록"""
+    import aiohttp
+
+    queue = asyncio.Queue()
+    for body in bodies:
+        queue.put_nowait(body)
+    results = []
+
+    async def worker(session):
+        while True:
+            try:
+                body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            outcome = "ok"
+            outfits = []  # 조합별 가상 피팅 결과 (virtualTryonError 포함)
+            try:
+                async with session.post(f"{base_url}{path}", json=body) as response:
+                    text = await response.text()
+                    if response.status != 200:
+                        outcome = f"http_{response.status}"
+                    elif path.endswith("/stream"):
+                        outcome = "error_event" if "event: error" in text else "ok"
+                        outfits = [json.loads(line[len("data: "):]) for line in text.splitlines()
+                                   if line.startswith("data: ") and '"virtualTryonError"' in line]
+                    else:
+                        payload = json.loads(text)
+                        outcome = "ok" if payload["header"]["resultCode"] == "00" else f"result_{payload['header']['resultCode']}"
+                        outfits = payload["body"]["result"]
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+            except Exception as e:
+                outcome = type(e).__name__
+            results.append({
+                "latency": time.perf_counter() - started, "outcome": outcome, "outfits": len(outfits),
+                "tryon_errors": sum(1 for outfit in outfits if outfit.get("virtualTryonError"))
+            })
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        await asyncio.gather(*[worker(session) for _ in range(concurrency)])
+    return results
+
+
+def stage_totals():
+    """단계별 (호출 수, 합계 초) - fitu_stage_duration_seconds 히스토그램"""
+    from prometheus_client import REGISTRY
+
+    totals = {}
+    for metric in REGISTRY.collect():
+        if metric.name != "fitu_stage_duration_seconds":
+            continue
+        for sample in metric.samples:
+            stage = sample.labels.get("stage")
+            entry = totals.setdefault(stage, {"count": 0.0, "seconds": 0.0, "errors": 0.0})
+            if sample.name.endswith("_count"):
+                entry["count"] += sample.value
+                if sample.labels.get("outcome") == "error":
+                    entry["errors"] += sample.value
+            elif sample.name.endswith("_sum"):
+                entry["seconds"] += sample.value
+    return totals
+
+
+def stage_delta(before, after):
+    stages = {}
+    for stage, entry in after.items():
+        base = before.get(stage, {"count": 0.0, "seconds": 0.0, "errors": 0.0})
+        count = entry["count"] - base["count"]
+        if count <= 0:
+            continue
+        seconds = entry["seconds"] - base["seconds"]
+        stages[stage] = {
+            "count": int(count),
+            "errors": int(entry["errors"] - base["errors"]),
+            "mean_ms": round(seconds / count * 1000, 1),
+            "total_s": round(seconds, 2)
+        }
+    return dict(sorted(stages.items(), key=lambda item: -item[1]["total_s"]))
+
+
+def summarize(results, elapsed, monitor: ServiceMonitor, stages, stub_requests, cache_stats):
+    latencies = [r["latency"] * 1000 for r in results]
+    ok_latencies = [r["latency"] * 1000 for r in results if r["outcome"] == "ok"]
+    outcomes = {}
+    for r in results:
+        outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+    lags = [lag * 1000 for lag in monitor.lags]
+
+    def distribution(values):
+        if not values:
+            return None
+        return {
+            "p50": round(percentile(values, 50), 1), "p90": round(percentile(values, 90), 1),
+            "p95": round(percentile(values, 95), 1), "p99": round(percentile(values, 99), 1),
+            "max": round(max(values), 1), "mean": round(statistics.fmean(values), 1)
+        }
+
+    return {
+        "requests": len(results),
+        "outcomes": outcomes,
+        "outfits": sum(r["outfits"] for r in results),
+        "tryon_errors": sum(r["tryon_errors"] for r in results),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": distribution(latencies),
+        "ok_latency_ms": distribution(ok_latencies),
+        "event_loop_lag_ms": distribution(lags),
+        "memory_mb": {
+            "rss_start": round(monitor.rss_start / 2 ** 20, 1),
+            "rss_peak": round(monitor.rss_peak / 2 ** 20, 1),
+            "rss_end": round(current_rss_bytes() / 2 ** 20, 1)
+        },
+        "stages": stages,
+        "stub_requests": stub_requests,
+        "cache_stats": cache_stats
+    }
+
+
+def print_report(report):
+    print(f"\n요청 {report['requests']}건, {report['elapsed_s']}초, 처리량 {report['throughput_rps']} req/s")
+    print(f"결과: {report['outcomes']}, 조합 {report['outfits']}개 중 가상 피팅 실패 {report['tryon_errors']}개")
+    for key, label in [("latency_ms", "응답 시간 (전체)"), ("ok_latency_ms", "응답 시간 (성공)"),
+                       ("event_loop_lag_ms", "이벤트 루프 지연")]:
+        values = report[key]
+        if values:
+            print(f"{label:<16} p50 {values['p50']:>9} | p90 {values['p90']:>9} | p95 {values['p95']:>9} | "
+                  f"p99 {values['p99']:>9} | max {values['max']:>9} ms")
+    memory = report["memory_mb"]
+    print(f"메모리 RSS: 시작 {memory['rss_start']}MB, 최대 {memory['rss_peak']}MB, 종료 {memory['rss_end']}MB")
+
+    print(f"\n{'stage':<18} {'count':>7} {'errors':>7} {'mean ms':>10} {'total s':>9}")
+    for stage, entry in report["stages"].items():
+        print(f"{stage:<18} {entry['count']:>7} {entry['errors']:>7} {entry['mean_ms']:>10} {entry['total_s']:>9}")
+    print(f"\n스텁 호출 수: {report['stub_requests']}")
+
+
+async def run_load_test(args, stubs: StubServices, user_ids):
+    import uvicorn
+    import aws_api
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        aws_api.app, host="127.0.0.1", port=port, log_level="warning", access_log=False, lifespan="on"
+    ))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if serve_task.done():
+            await serve_task
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    path = ENDPOINTS[args.endpoint]
+    try:
+        if args.warmup:
+            warmup = build_requests(user_ids, args.warmup, args.closet_only_ratio, args.seed + 1)
+            await asyncio.to_thread(asyncio.run, drive(base_url, path, warmup, args.concurrency, args.timeout))
+
+        bodies = build_requests(user_ids, args.requests, args.closet_only_ratio, args.seed)
+        stages_before = stage_totals()
+        monitor = ServiceMonitor()
+        monitor.start()
+        started = time.perf_counter()
+        # 부하 발생기는 별도 스레드의 이벤트 루프에서 실행 (서비스 루프 지연 측정에 섞이지 않도록)
+        results = await asyncio.to_thread(asyncio.run, drive(base_url, path, bodies, args.concurrency, args.timeout))
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+
+        cache_stats = (await aws_api.get_cache_stats())["body"]
+        return summarize(results, elapsed, monitor, stage_delta(stages_before, stage_totals()),
+                         dict(stubs.requests), cache_stats)
+    finally:
+        server.should_exit = True
+        await serve_task
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추천 API 종단 부하 테스트")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=0, help="측정 전에 보낼 요청 수 (캐시 예열)")
+    parser.add_argument("--endpoint", choices=list(ENDPOINTS), default="recommendation")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--closet-size", type=int, default=40)
+    parser.add_argument("--closet-only-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    # 스텁 지연 (로그정규 분포 중앙값, 초) 및 실패율
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="모든 스텁 지연 배율")
+    parser.add_argument("--latency-sigma", type=float, default=0.4)
+    parser.add_argument("--chat-latency", type=float, default=2.0)
+    parser.add_argument("--image-generation-latency", type=float, default=10.0)
+    parser.add_argument("--fashn-run-latency", type=float, default=0.3)
+    parser.add_argument("--fashn-latency", type=float, default=12.0, help="FASHN 대기열 + 처리 시간")
+    parser.add_argument("--download-latency", type=float, default=0.05)
+    parser.add_argument("--chat-failure-rate", type=float, default=0.0)
+    parser.add_argument("--image-generation-failure-rate", type=float, default=0.0)
+    parser.add_argument("--fashn-failure-rate", type=float, default=0.0)
+    parser.add_argument("--download-failure-rate", type=float, default=0.0)
+    parser.add_argument("--verbose", action="store_true", help="서비스 로그 출력")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # moto S3 서버 접근 로그
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    def latency(median, failure_rate, seed):
+        return LatencyModel(median * args.latency_scale, args.latency_sigma, failure_rate, seed=args.seed + seed)
+
+    stubs = StubServices(
+        chat=latency(args.chat_latency, args.chat_failure_rate, 1),
+        image_generation=latency(args.image_generation_latency, args.image_generation_failure_rate, 2),
+        fashn_run=latency(args.fashn_run_latency, args.fashn_failure_rate, 3),
+        fashn_processing=latency(args.fashn_latency, args.fashn_failure_rate, 4),
+        image_download=latency(args.download_latency, args.download_failure_rate, 5)
+    ).start()
+
+    with tempfile.TemporaryDirectory(prefix="fitu_load_test_") as work_dir:
+        try:
+            bucket_url = stubs.create_bucket()
+            db_path = os.path.join(work_dir, "closet.sqlite")
+            user_ids = seed_database(db_path, stubs.image_url, args.users, args.closet_size, args.seed)
+            configure_service_environment(stubs, db_path, bucket_url, work_dir)
+            print(f"[INFO] 부하 테스트 시작 - {args.requests}건, 동시성 {args.concurrency}, 엔드포인트 {ENDPOINTS[args.endpoint]}")
+
+            with contextlib.ExitStack() as stack:
+                if not args.verbose:
+                    stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+                report = asyncio.run(run_load_test(args, stubs, user_ids))
+        finally:
+            stubs.stop()
+
+    report["config"] = vars(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[INFO] 결과 저장 - {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""상황 유사도 인덱스 재현율/지연 벤치마크
+
+합성 패러프레이즈 그룹에서 그룹의 첫 문장을 대표 상황으로 등록한 뒤,
+나머지 문장이 같은 그룹 대표로 매핑되는 비율(재현율)과 다른 그룹으로
+잘못 매핑되는 비율(오매칭률), 조회 지연을 측정합니다.
+문자열은 비슷하지만 옷차림이 다른 상황 쌍(음성 쌍)은 앞 상황만 등록한 인덱스에서
+뒤 상황이 합쳐지는 비율(오병합률)을 따로 측정합니다.
+
+    python benchmarks/situation_index_benchmark.py --size 5000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from situation_index import SituationIndex, SITUATION_SIMILARITY_THRESHOLD, SITUATION_INDEX_MAXSIZE
+
+PARAPHRASE_GROUPS = [
+    ["친구 결혼식", "결혼식 하객", "wedding guest", "친구 결혼식 하객", "지인 결혼식", "Friend's wedding"],
+    ["회사 면접", "면접", "job interview", "취업 면접", "interview", "회사 면접 보러 감"],
+    ["여자친구와 데이트", "데이트", "date", "주말 데이트", "데이트 약속", "남자친구랑 데이트"],
+    ["회사 출근", "출근", "office", "출근룩", "평일 출근", "work"],
+    ["가족 저녁 식사", "가족 외식", "family dinner", "가족과 저녁 식사", "부모님과 저녁 식사"],
+    ["헬스장 운동", "운동", "gym workout", "운동하러 감", "헬스 운동", "exercise"],
+    ["주말 등산", "등산", "hiking", "산에 등산", "친구들과 등산"],
+    ["친구 생일 파티", "생일 파티", "birthday party", "친구 생일", "생일파티"],
+    ["해외 여행", "여행", "travel", "제주도 여행", "여행 가는 날", "trip"],
+    ["장례식 조문", "장례식", "funeral", "장례식장 방문"],
+    ["대학 수업", "학교 수업", "school class", "학교", "수업 듣기"],
+    ["콘서트 관람", "콘서트", "concert", "공연 콘서트 관람"],
+]
+
+# (등록된 상황, 조회 상황): 합쳐지면 안 되는 쌍
+NEGATIVE_PAIRS = [
+    ("가족 여행", "친구 여행"),
+    ("친구 여행", "회사 출장 여행"),
+    ("친구 결혼식", "친구 생일"),
+    ("친구 결혼식", "친구 장례식"),
+    ("결혼식 하객", "장례식 조문"),
+    ("회사 면접", "회사 출근"),
+    ("회사 면접", "회사 회의"),
+    ("가족 저녁 식사", "친구 저녁 식사"),
+    ("부모님과 저녁 식사", "여자친구와 저녁 식사"),
+    ("여자친구와 데이트", "친구와 쇼핑"),
+    ("친구 생일 파티", "가족 생일 파티"),
+    ("대학 수업", "대학 졸업식"),
+    ("주말 등산", "주말 캠핑"),
+    ("친구들과 등산", "친구들과 소풍"),
+    ("콘서트 관람", "전시회 관람"),
+    ("헬스장 운동", "헬스장 출근"),
+]
+
+# 실제 입력처럼 자주 쓰는 단어를 섞어 흔한 n-gram(" 친", "친구" 등)의 후보 목록을 길게 만듦
+PREFIX_WORDS = ["친구", "친구들과", "가족", "회사", "주말", "평일", "저녁", "동료들과", "혼자", "여자친구와"]
+FILLER_WORDS = ["동네", "카페", "모임", "세미나", "전시회", "영화", "쇼핑", "마트", "소개팅", "동창회",
+                "봉사", "축제", "워크숍", "학회", "소풍", "캠핑", "졸업식", "입학식", "발표", "스터디"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=SITUATION_SIMILARITY_THRESHOLD)
+    parser.add_argument("--size", type=int, default=SITUATION_INDEX_MAXSIZE, help="측정할 인덱스 크기 (기본: 최대 크기)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    index = SituationIndex(threshold=args.threshold, maxsize=args.size)
+
+    # 대표 상황을 빼고 남은 자리를 무관한 상황으로 채움 (IDF 재계산이 포함된 등록 지연도 측정)
+    add_latencies = []
+    while len(index) < args.size - len(PARAPHRASE_GROUPS):
+        start = time.perf_counter()
+        index.add(f"{random.choice(PREFIX_WORDS)} {random.choice(FILLER_WORDS)} {random.randint(1, 999)}")
+        add_latencies.append(time.perf_counter() - start)
+
+    canonicals = [index.add(group[0]) for group in PARAPHRASE_GROUPS]
+
+    correct = wrong = missed = 0
+    latencies = []
+    for canonical, group in zip(canonicals, PARAPHRASE_GROUPS):
+        for paraphrase in group[1:]:
+            start = time.perf_counter()
+            match, score = index.lookup(paraphrase, args.threshold)
+            latencies.append(time.perf_counter() - start)
+
+            if match is None or score < args.threshold:
+                missed += 1
+            elif match == canonical:
+                correct += 1
+            else:
+                wrong += 1
+                print(f"  오매칭: {paraphrase!r} -> {match!r} ({score:.2f})")
+
+    total = correct + wrong + missed
+    print(f"임계값 {args.threshold}, 인덱스 크기 {len(index)}")
+    print(f"재현율 {correct / total:.1%}  오매칭률 {wrong / total:.1%}  미스 {missed / total:.1%}  ({total}건)")
+
+    merged = 0
+    for registered, query in NEGATIVE_PAIRS:
+        pair_index = SituationIndex(threshold=args.threshold)
+        pair_index.add(registered)
+        match, score = pair_index.lookup(query, args.threshold)
+        if match is not None and score >= args.threshold:
+            merged += 1
+            print(f"  오병합: {query!r} -> {registered!r} ({score:.2f})")
+    print(f"음성 쌍 오병합률 {merged / len(NEGATIVE_PAIRS):.1%}  ({merged}/{len(NEGATIVE_PAIRS)}건)")
+    latencies.sort()
+    print(f"조회 지연 p50 {statistics.median(latencies) * 1e6:.0f}us  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f}us  max {latencies[-1] * 1e6:.0f}us")
+    print(f"등록 지연 p50 {statistics.median(add_latencies) * 1e6:.0f}us  max {max(add_latencies) * 1e3:.1f}ms (IDF 재계산)")
+
+
+if __name__ == "__main__":
+    main()
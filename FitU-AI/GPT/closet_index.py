@@ -0,0 +1,53 @@
+import re
+
+
+def virtual_clothing_type(part: str):
+    """가상 옷 항목에서 옷 종류 추출 (예: "추천: TSHIRT (STRIPE, DARK)" -> TSHIRT)"""
+    return re.sub(r'\s*\([^)]+\)', '', part).replace("추천: ", "").strip()
+
+
+class ClosetIndex:
+    """요청 단위 옷장 인덱스 (옷 ID -> 항목, 카테고리 -> 항목 목록, 가상 옷 항목 -> 생성된 이미지)
+
+    추천 요청마다 한 번 만들어 조합 추천, 가상 피팅, 링크 생성 단계에 그대로 넘긴다.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.by_id = {}
+        self.by_category = {}  # 카테고리 -> 항목 목록 (카테고리 이름은 종류 간에 겹치지 않음)
+        for item in items:
+            self.by_id[item['clothing_id']] = item
+            self.by_category.setdefault(item['attributes']['category'], []).append(item)
+        self.virtual = {}  # "추천: TYPE (PATTERN, TONE)" -> {"type", "url"}
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, clothing_id):
+        return self.by_id.get(clothing_id)
+
+    def image_url(self, clothing_id):
+        item = self.by_id.get(clothing_id)
+        return item['attributes']['image_url'] if item else None
+
+    def add_virtual_results(self, virtual_clothing_results):
+        """generate_virtual_clothing_batch 결과 등록 (생성 실패 항목은 제외)"""
+        for part, result in (virtual_clothing_results or {}).items():
+            if result:
+                self.virtual[part] = result
+
+    def link(self, part: str):
+        """조합의 한 부분("123 (SHIRT)" 또는 "추천: ...") -> 링크 정보 (없으면 None)"""
+        if part.startswith("추천:"):
+            virtual_item = self.virtual.get(part)
+            if virtual_item is None:
+                return None
+            # 가상 옷이므로 ID 없음
+            return {"id": None, "category": virtual_clothing_type(part), "image_url": virtual_item["url"]}
+
+        clothing_id = part.split(" ")[0]
+        item = self.by_id.get(clothing_id)
+        if item is None:
+            return None
+        return {"id": clothing_id, "category": item['attributes']['category'], "image_url": item['attributes']['image_url']}
@@ -0,0 +1,145 @@
+import re
+
+import numpy as np
+
+from outfit_matcher import TONE_INDEX, UNKNOWN_TONE, PATTERN_INDEX, UNKNOWN_PATTERN, TONE_COMPATIBILITY, PATTERN_COMPATIBILITY
+
+# 두 번째 GPT 프롬프트의 옷장 목록 토큰 예산
+CLOSET_PROMPT_TOKEN_BUDGET = 600
+# 예산과 관계없이 카테고리별로 넣을 최대 옷 수
+CLOSET_PROMPT_MAX_PER_CATEGORY = 15
+
+TONE_CODES = {"밝은 계열": "L", "어두운 계열": "D", "고려하지 않음": "N"}
+CLOSET_LEGEND = "(형식: 카테고리: 패턴/톤 옷ID,옷ID; 톤 L=밝은 계열, D=어두운 계열, N=고려하지 않음)"
+
+try:
+    import tiktoken
+    # gpt-4o-mini 토크나이저
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """프롬프트 토큰 수 (tiktoken이 없으면 문자 수 기반 추정)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    # 한글은 대략 1~2자당 1토큰, 영문/숫자는 4자당 1토큰
+    korean = len(re.findall(r"[가-힣]", text))
+    return korean + (len(text) - korean) // 4 + 1
+
+
+def recommended_pairs(recommended_combinations):
+    """추천 조합 텍스트에서 카테고리별 짝 카테고리 (예: SHIRT -> {JEANS})"""
+    partners = {}
+    for line in recommended_combinations.splitlines():
+        top_match = re.search(r'TOP:\s*(\w+)', line)
+        bottom_match = re.search(r'BOTTOM:\s*(\w+)', line)
+        if top_match and bottom_match:
+            top, bottom = top_match.group(1), bottom_match.group(1)
+            partners.setdefault(top, set()).add(bottom)
+            partners.setdefault(bottom, set()).add(top)
+    return partners
+
+
+def _attribute_indices(items):
+    tones = np.array([TONE_INDEX.get(item['tone'], UNKNOWN_TONE) for item in items], dtype=np.int8)
+    patterns = np.array([PATTERN_INDEX.get(item['pattern'], UNKNOWN_PATTERN) for item in items], dtype=np.int8)
+    return tones, patterns
+
+
+def rank_items(items, partner_items):
+    """짝 카테고리 옷들과의 평균 톤/패턴 궁합 순으로 정렬 (짝이 없으면 무지 우선, 동점이면 옷장 순서)"""
+    tones, patterns = _attribute_indices(items)
+    if partner_items:
+        partner_tones, partner_patterns = _attribute_indices(partner_items)
+        scores = (TONE_COMPATIBILITY[tones][:, partner_tones].mean(axis=1)
+                  + PATTERN_COMPATIBILITY[patterns][:, partner_patterns].mean(axis=1))
+    else:
+        scores = (patterns == PATTERN_INDEX['PLAIN']).astype(float)
+    return [items[i] for i in np.argsort(-scores, kind="stable")]
+
+
+class CompiledCloset:
+    """프롬프트용 옷장 목록 (짧은 ID <-> 실제 옷 ID 매핑과 토큰 통계 포함)"""
+
+    def __init__(self, text, id_map, stats):
+        self.text = text
+        self.id_map = id_map  # 짧은 ID -> 실제 옷 ID
+        self.stats = stats
+
+    def expand_ids(self, response: str):
+        """GPT 응답의 "선택한 옷:" 줄에 있는 짧은 ID를 실제 옷 ID로 변환"""
+        lines = []
+        for line in response.split("\n"):
+            prefix, sep, selected = line.partition("선택한 옷:")
+            if sep:
+                parts = []
+                for part in selected.split(" + "):
+                    stripped = part.strip()
+                    short_id, space, rest = stripped.partition(" ")
+                    if short_id in self.id_map:
+                        stripped = self.id_map[short_id] + space + rest
+                    parts.append(stripped)
+                line = f"{prefix}{sep} " + " + ".join(parts)
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def _render(ranked, cap):
+    """카테고리별 상위 cap벌을 (패턴, 톤) 묶음으로 출력 -> (텍스트, 짧은 ID 매핑)"""
+    lines = []
+    id_map = {}
+    for clothing_type, categories in ranked.items():
+        if not categories:
+            continue
+        lines.append(f"[{clothing_type}]")
+        for category, items in categories.items():
+            groups = {}  # (패턴, 톤) -> 짧은 ID 목록 (첫 등장 순서 유지)
+            for item in items[:cap]:
+                short_id = str(len(id_map) + 1)
+                id_map[short_id] = item['id']
+                groups.setdefault((item['pattern'], TONE_CODES.get(item['tone'], "N")), []).append(short_id)
+            attributes = "; ".join(f"{pattern}/{tone} {','.join(ids)}" for (pattern, tone), ids in groups.items())
+            lines.append(f"{category}: {attributes}")
+    return "\n".join(lines), id_map
+
+
+def compile_closet(organized_clothes, recommended_combinations="", token_budget=CLOSET_PROMPT_TOKEN_BUDGET,
+                   max_per_category=CLOSET_PROMPT_MAX_PER_CATEGORY):
+    """옷장 목록을 토큰 예산에 맞게 압축 (짧은 ID, 같은 속성 묶음, 카테고리별 상위 N벌)"""
+    partners = recommended_pairs(recommended_combinations)
+    items_by_category = {
+        category: items for categories in organized_clothes.values() for category, items in categories.items()
+    }
+
+    ranked = {}
+    for clothing_type, categories in organized_clothes.items():
+        ranked[clothing_type] = {}
+        for category, items in categories.items():
+            partner_items = [item for partner in partners.get(category, ()) for item in items_by_category.get(partner, [])]
+            ranked[clothing_type][category] = rank_items(items, partner_items)
+
+    total_items = sum(len(items) for items in items_by_category.values())
+    largest = max((len(items) for items in items_by_category.values()), default=0)
+
+    # 예산에 들어갈 때까지 카테고리별 상한을 줄임 (최소 1벌)
+    cap = max(1, min(max_per_category, largest))
+    while True:
+        text, id_map = _render(ranked, cap)
+        if cap < largest:
+            text += f"\n(카테고리별 상위 {cap}벌만 표시)"
+        text = f"{CLOSET_LEGEND}\n{text}" if id_map else "(없음)"
+        tokens = count_tokens(text)
+        if tokens <= token_budget or cap == 1:
+            break
+        cap -= 1
+
+    stats = {
+        "items_total": total_items,
+        "items_included": len(id_map),
+        "per_category_cap": cap,
+        "tokens": tokens,
+        "token_budget": token_budget
+    }
+    return CompiledCloset(text, id_map, stats)
@@ -0,0 +1,85 @@
+import os
+import asyncio
+from pathlib import Path
+from dotenv import load_dotenv
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from observability import external_call
+
+# .env 로드
+env_path = Path(__file__).resolve().parent.parent / '.env'
+load_dotenv(dotenv_path=env_path)
+
+# DB 접속 정보
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_NAME = os.getenv("DB_NAME")
+
+# DATABASE_URL로 전체 접속 문자열 지정 가능 (예: 로컬 테스트용 sqlite+aiosqlite:///closet.db)
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# 커넥션 풀 및 타임아웃 설정
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+DB_STATEMENT_TIMEOUT = float(os.getenv("DB_STATEMENT_TIMEOUT", "5"))
+
+
+def create_db_engine(url: str = DATABASE_URL):
+    """풀 크기, pre-ping, 구문 타임아웃이 설정된 비동기 엔진 생성"""
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    if url.startswith("mysql"):
+        options["connect_args"] = {"connect_timeout": DB_CONNECT_TIMEOUT}
+
+    db_engine = create_async_engine(url, **options)
+
+    if url.startswith("mysql"):
+        @event.listens_for(db_engine.sync_engine, "connect")
+        def set_statement_timeout(dbapi_connection, connection_record):
+            # MySQL 서버 측 SELECT 실행 시간 제한 (ms)
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET SESSION MAX_EXECUTION_TIME = {int(DB_STATEMENT_TIMEOUT * 1000)}")
+            cursor.close()
+
+    return db_engine
+
+
+engine = create_db_engine()
+
+
+async def fetch_all(query: str, params: dict = None, timeout: float = DB_STATEMENT_TIMEOUT):
+    """SELECT 결과 전체 조회 (커넥션 획득부터 결과 수신까지 timeout 적용)"""
+    async def run():
+        async with engine.connect() as connection:
+            result = await connection.execute(text(query), params or {})
+            return result.fetchall()
+
+    with external_call("db", "fetch_all", stage="db"):
+        return await asyncio.wait_for(run(), timeout)
+
+
+async def fetch_one(query: str, params: dict = None, timeout: float = DB_STATEMENT_TIMEOUT):
+    """SELECT 결과 첫 행 조회"""
+    async def run():
+        async with engine.connect() as connection:
+            result = await connection.execute(text(query), params or {})
+            return result.fetchone()
+
+    with external_call("db", "fetch_one", stage="db"):
+        return await asyncio.wait_for(run(), timeout)
+
+
+async def dispose_engine():
+    """커넥션 풀 정리 (앱 종료 시 호출)"""
+    await engine.dispose()
@@ -0,0 +1,204 @@
+import os
+import time
+import asyncio
+import contextvars
+from collections import deque
+
+from observability import count_external_call, current_trace_id, log
+
+# 상태 조회 간격 범위 (초)
+FASHN_POLL_MIN_INTERVAL = float(os.getenv("FASHN_POLL_MIN_INTERVAL", "0.5"))
+FASHN_POLL_MAX_INTERVAL = float(os.getenv("FASHN_POLL_MAX_INTERVAL", "5"))
+# 완료 시간 기록이 없을 때의 기본 간격 (기존 고정 간격과 동일)
+FASHN_POLL_DEFAULT_INTERVAL = float(os.getenv("FASHN_POLL_DEFAULT_INTERVAL", "3"))
+FASHN_POLL_TIMEOUT = float(os.getenv("FASHN_POLL_TIMEOUT", "300"))
+
+PENDING_STATUSES = ("starting", "in_queue", "processing")
+# 다음 조회 시점 후보로 쓰는 완료 시간 분위수
+POLL_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.95)
+
+
+class FashnStatusPoller:
+    """진행 중인 모든 FASHN 예측 ID의 상태를 백그라운드 루프 하나에서 조회하는 폴러
+
+    관측된 완료 시간 분포의 분위수 시점에 맞춰 조회하므로, 대부분 아직 끝나지 않았을 초반에는
+    조회를 건너뛰고 완료가 몰리는 구간에서는 촘촘하게 조회한다.
+    """
+
+    def __init__(self, base_url: str, api_key: str, session_getter,
+                 min_interval: float = FASHN_POLL_MIN_INTERVAL, max_interval: float = FASHN_POLL_MAX_INTERVAL,
+                 default_interval: float = FASHN_POLL_DEFAULT_INTERVAL, timeout: float = FASHN_POLL_TIMEOUT,
+                 history_size: int = 200):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.session_getter = session_getter
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.timeout = timeout
+        self._pending = {}  # 예측 ID -> {"future", "submitted_at", "next_poll_at"}
+        self._durations = deque(maxlen=history_size)  # 최근 완료까지 걸린 시간
+        self._wakeup = None
+        self._task = None
+        self.polls = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    def start(self):
+        """조회 루프 시작 (루프가 종료된 상태면 다시 시작)"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            # 루프는 여러 요청이 공유하므로 처음 시작한 요청의 추적 컨텍스트를 물려받지 않음
+            self._task = contextvars.Context().run(asyncio.create_task, self._run())
+            self._task.add_done_callback(self._on_loop_done)
+
+    def _on_loop_done(self, task):
+        # 루프가 어떤 이유로든 끝나면 기다리는 요청이 영원히 멈추지 않도록 모두 실패 처리
+        if not task.cancelled() and task.exception() is not None:
+            log(f"FASHN 상태 조회 루프 종료: {task.exception()!r}", "ERROR")
+        for prediction_id in list(self._pending):
+            self.failed += 1
+            self._resolve(prediction_id, None, "상태 확인이 중단되었습니다")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for entry in self._pending.values():
+            if not entry["future"].done():
+                entry["future"].set_result((None, "상태 확인이 중단되었습니다"))
+        self._pending.clear()
+
+    def _quantiles(self):
+        if len(self._durations) < 5:
+            return []
+        ordered = sorted(self._durations)
+        return [ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in POLL_QUANTILES]
+
+    def _next_delay(self, elapsed: float):
+        """경과 시간 기준 다음 조회까지 대기 시간"""
+        quantiles = self._quantiles()
+        if not quantiles:
+            return self.default_interval
+
+        # 아직 도달하지 않은 가장 가까운 분위수 시점까지 대기
+        for point in quantiles:
+            if point > elapsed + self.min_interval:
+                return min(point - elapsed, self.max_interval)
+
+        # 대부분의 예측보다 오래 걸리는 중 -> 분포 꼬리 구간에서는 간격을 점점 늘림
+        overdue = elapsed - quantiles[-1]
+        return min(max(self.min_interval, overdue / 2), self.max_interval)
+
+    async def wait(self, prediction_id: str):
+        """예측이 끝날 때까지 대기 -> (status 응답, 에러 메시지)"""
+        self.start()
+        entry = self._pending.get(prediction_id)
+        if entry is None:
+            now = time.monotonic()
+            entry = {
+                "future": asyncio.get_running_loop().create_future(),
+                "submitted_at": now,
+                "next_poll_at": now + self._next_delay(0.0),
+                # 공유 루프에서 남기는 로그를 기다리는 요청의 추적 ID로 기록
+                "trace_id": current_trace_id()
+            }
+            self._pending[prediction_id] = entry
+            self._wakeup.set()
+        return await entry["future"]
+
+    def _resolve(self, prediction_id, result, error=None):
+        entry = self._pending.pop(prediction_id, None)
+        if entry is not None and not entry["future"].done():
+            entry["future"].set_result((result, error))
+
+    async def _poll_safely(self, prediction_id):
+        """예측 하나의 조회 중 예상하지 못한 오류(잘못된 응답 형식 등)는 그 예측만 실패 처리"""
+        trace_id = self._pending.get(prediction_id, {}).get("trace_id")
+        try:
+            await self._poll(prediction_id)
+        except Exception as e:
+            self.failed += 1
+            log(f"FASHN 상태 처리 오류 - {prediction_id}: {e!r}", "ERROR", trace_id)
+            self._resolve(prediction_id, None, f"상태 확인 중 오류 발생: {e}")
+
+    async def _poll(self, prediction_id):
+        entry = self._pending.get(prediction_id)
+        if entry is None:
+            return
+
+        now = time.monotonic()
+        elapsed = now - entry["submitted_at"]
+        if elapsed > self.timeout:
+            self.failed += 1
+            self._resolve(prediction_id, None, f"상태 확인 시간 초과 ({self.timeout:.0f}초)")
+            return
+
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        self.polls += 1
+        try:
+            async with self.session_getter().get(f"{self.base_url}/status/{prediction_id}", headers=headers) as response:
+                count_external_call("fashn", "status", ok=response.status == 200)
+                if response.status != 200:
+                    error_text = await response.text()
+                    self.failed += 1
+                    self._resolve(prediction_id, None, f"상태 확인 실패: {error_text}")
+                    return
+                status_data = await response.json()
+        except Exception as e:
+            count_external_call("fashn", "status", ok=False)
+            # 일시적인 네트워크 오류는 다음 주기에 재시도
+            log(f"FASHN 상태 조회 오류 - {prediction_id}: {e}", "WARN", entry["trace_id"])
+            entry["next_poll_at"] = time.monotonic() + self.max_interval
+            return
+
+        status = status_data.get("status")
+        if status == "completed":
+            self.completed += 1
+            self._durations.append(time.monotonic() - entry["submitted_at"])
+            self._resolve(prediction_id, status_data)
+        elif status in PENDING_STATUSES:
+            elapsed = time.monotonic() - entry["submitted_at"]
+            entry["next_poll_at"] = time.monotonic() + self._next_delay(elapsed)
+        else:
+            self.failed += 1
+            self._resolve(prediction_id, None, f"예측 실패: {status_data.get('error')}")
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            due = [pid for pid, entry in self._pending.items() if entry["next_poll_at"] <= now]
+            if due:
+                await asyncio.gather(*(self._poll_safely(pid) for pid in due))
+                continue
+
+            # 가장 빠른 조회 시점까지 대기 (그 사이 새 예측이 등록되면 다시 계산)
+            next_at = min(entry["next_poll_at"] for entry in self._pending.values())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(next_at - now, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        quantiles = self._quantiles()
+        resolved = self.completed + self.failed
+        return {
+            "in_flight": self.in_flight,
+            "polls": self.polls,
+            "completed": self.completed,
+            "failed": self.failed,
+            "polls_per_prediction": round(self.polls / resolved, 2) if resolved else 0.0,
+            "duration_p50": round(quantiles[2], 2) if quantiles else None,
+            "duration_p90": round(quantiles[4], 2) if quantiles else None
+        }
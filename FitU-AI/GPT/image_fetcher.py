@@ -0,0 +1,120 @@
+import asyncio
+from collections import OrderedDict
+
+from observability import external_call, log
+
+
+class ImageByteCache:
+    """프로세스 단위 이미지 바이트 LRU 캐시 (전체 바이트 크기 제한, URL별 ETag 보관)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # URL -> (ETag, 바이트)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def get(self, url):
+        entry = self._data.get(url)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(url)
+        self.hits += 1
+        return entry
+
+    def set(self, url, content: bytes, etag=None):
+        # 한 장이 예산보다 크면 캐시하지 않음
+        if len(content) > self.max_bytes:
+            return
+        old = self._data.pop(url, None)
+        if old is not None:
+            self.total_bytes -= len(old[1])
+        self._data[url] = (etag, content)
+        self.total_bytes += len(content)
+
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted) = self._data.popitem(last=False)
+            self.total_bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class ImageFetcher:
+    """요청 단위 이미지 다운로드 캐시
+
+    같은 URL은 요청 안에서 한 번만 다운로드하고, 동시에 같은 이미지가 필요한 작업은 진행 중인
+    다운로드 하나를 공유한다. shared_cache가 있으면 ETag(If-None-Match)로 재검증해 본문 전송을 생략한다.
+    """
+
+    def __init__(self, session_getter, shared_cache: ImageByteCache = None):
+        self.session_getter = session_getter
+        self.shared_cache = shared_cache
+        self._downloads = {}  # URL -> asyncio.Task (결과: 바이트 또는 None)
+        self.requested = 0
+        self.downloaded = 0
+
+    def seed(self, url, content: bytes, etag=None):
+        """이미 가지고 있는 이미지 바이트 등록 (예: 방금 S3에 올린 결과 이미지)"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(content)
+        self._downloads[url] = future
+        if self.shared_cache is not None:
+            self.shared_cache.set(url, content, etag)
+
+    def fetch(self, url):
+        """이미지 바이트 반환 (실패 시 None)"""
+        self.requested += 1
+        task = self._downloads.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._download(url))
+            self._downloads[url] = task
+        return task
+
+    async def _download(self, url):
+        cached = self.shared_cache.get(url) if self.shared_cache is not None else None
+        headers = {}
+        if cached is not None:
+            etag, content = cached
+            # ETag가 없던 응답은 재검증할 방법이 없으므로 캐시된 내용을 그대로 사용
+            if not etag:
+                return content
+            headers["If-None-Match"] = etag
+
+        with external_call("image", "download", stage="image_download") as call:
+            try:
+                async with self.session_getter().get(url, headers=headers) as response:
+                    if response.status == 304 and cached is not None:
+                        self.shared_cache.revalidated += 1
+                        return cached[1]
+                    if response.status != 200:
+                        call.fail(f"HTTP {response.status}")
+                        return None
+                    content = await response.read()
+                    etag = response.headers.get("ETag")
+            except Exception as e:
+                call.fail(e)
+                log(f"이미지 다운로드 실패 - {url}: {e}", "ERROR")
+                return None
+
+        self.downloaded += 1
+        if self.shared_cache is not None:
+            self.shared_cache.set(url, content, etag)
+        return content
+
+    def stats(self):
+        return {"requested": self.requested, "unique": len(self._downloads), "downloaded": self.downloaded}
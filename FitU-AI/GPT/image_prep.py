@@ -0,0 +1,48 @@
+import io
+import base64
+
+from PIL import Image
+
+from observability import log
+
+# FASHN API 입력 이미지 크기/품질
+FASHN_MAX_SIZE = 640
+FASHN_JPEG_QUALITY = 85
+
+
+def fit_size(width, height, max_size=FASHN_MAX_SIZE):
+    """비율을 유지하면서 긴 변을 max_size에 맞춘 크기"""
+    if width > height:
+        return max_size, int(height * (max_size / width))
+    return int(width * (max_size / height)), max_size
+
+
+def encode_fashn_jpeg(content: bytes, max_size=FASHN_MAX_SIZE) -> bytes:
+    """이미지 바이트를 한 번만 디코딩해 FASHN용 JPEG 바이트로 변환 (임시 파일 없음, 디코딩 실패 시 예외)"""
+    with Image.open(io.BytesIO(content)) as img:
+        # 큰 JPEG는 디코딩 단계에서 1/2, 1/4, 1/8로 축소해 읽음 (목표 크기 이상은 유지)
+        if img.format == "JPEG":
+            img.draft("RGB", fit_size(*img.size, max_size))
+
+        # 이미지가 RGB 모드가 아니면 변환
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        resized_img = img.resize(fit_size(*img.size, max_size), Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        resized_img.save(buffer, "JPEG", quality=FASHN_JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+
+
+def prepare_image_bytes(content: bytes, max_size=FASHN_MAX_SIZE) -> bytes:
+    """FASHN용 JPEG 바이트로 변환 (실패 시 원본 반환)"""
+    try:
+        return encode_fashn_jpeg(content, max_size)
+    except Exception as e:
+        log(f"이미지 리사이즈 실패: {e}", "ERROR")
+        return content
+
+
+def to_data_uri(jpeg_bytes: bytes) -> str:
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg_bytes).decode("ascii")
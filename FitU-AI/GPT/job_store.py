@@ -0,0 +1,224 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+# 작업 상태
+JOB_QUEUED = "QUEUED"
+JOB_RUNNING = "RUNNING"
+JOB_DONE = "DONE"
+JOB_FAILED = "FAILED"
+UNFINISHED_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+
+def new_job(request: dict):
+    now = time.time()
+    return {
+        "job_id": uuid.uuid4().hex,
+        "status": JOB_QUEUED,
+        "stage": JOB_QUEUED,
+        "request": request,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+class InMemoryJobStore:
+    """프로세스 메모리 작업 저장소 (재시작 시 사라짐)"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._jobs = {}
+
+    def create(self, request: dict):
+        job = new_job(request)
+        self._jobs[job["job_id"]] = job
+
+        # 오래된 완료 작업부터 정리
+        if len(self._jobs) > self.maxsize:
+            finished = sorted(
+                (j for j in self._jobs.values() if j["status"] not in UNFINISHED_STATUSES),
+                key=lambda j: j["updated_at"]
+            )
+            for j in finished[:len(self._jobs) - self.maxsize]:
+                del self._jobs[j["job_id"]]
+        return job
+
+    def get(self, job_id: str):
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def update(self, job_id: str, **fields):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.update(fields, updated_at=time.time())
+
+    def claim(self, job_id: str, stale_after: float):
+        """대기 중이거나 stale_after초 이상 갱신이 없는 실행 중 작업을 실행 상태로 전환 (성공 시 True)"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        if job["status"] == JOB_QUEUED or (job["status"] == JOB_RUNNING and job["updated_at"] < time.time() - stale_after):
+            job.update(status=JOB_RUNNING, updated_at=time.time())
+            return True
+        return False
+
+    def requeue_running(self, stale_after: float = None):
+        """실행 중 상태로 남은 작업을 대기 상태로 되돌림 (되돌린 작업 ID 목록 반환)
+
+        모든 작업이 이 프로세스 소유이므로 stale_after와 관계없이 전부 되돌린다.
+        """
+        running = [j for j in self._jobs.values() if j["status"] == JOB_RUNNING]
+        for job in running:
+            job.update(status=JOB_QUEUED, updated_at=time.time())
+        return [job["job_id"] for job in running]
+
+    def list_unfinished(self):
+        return [dict(j) for j in self._jobs.values() if j["status"] in UNFINISHED_STATUSES]
+
+    def stats(self):
+        counts = {}
+        for job in self._jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"size": len(self._jobs), "statuses": counts}
+
+
+def _process_alive(pid: int):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SQLiteJobStore:
+    """SQLite 파일 작업 저장소 (워커 재시작 후에도 미완료 작업 재개 가능)
+
+    여러 프로세스가 같은 파일을 쓸 수 있도록 실행 중 작업에 소유자("호스트:PID:부팅 ID")를 기록한다.
+    """
+
+    COLUMNS = ("job_id", "status", "stage", "request", "result", "error", "created_at", "updated_at")
+    JSON_COLUMNS = ("request", "result")
+
+    def __init__(self, path: str, retention: float = 86400):
+        self.path = path
+        self.retention = retention
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                request TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+        # 소유자 컬럼이 없던 기존 파일 마이그레이션
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def _owner_gone(self, owner):
+        """작업 소유 프로세스가 끝났는지 (같은 호스트만 확인 가능, 다른 호스트/알 수 없으면 False)"""
+        if owner == self.owner:
+            return True
+        try:
+            host, pid, _ = owner.rsplit(":", 2)
+            pid = int(pid)
+        except (AttributeError, ValueError):
+            return False
+        if host != socket.gethostname():
+            return False
+        # 같은 PID인데 부팅 ID가 다르면 이 PID를 쓰던 이전 프로세스 (컨테이너 재시작 등)
+        return pid == os.getpid() or not _process_alive(pid)
+
+    def _row_to_job(self, row):
+        job = dict(zip(self.COLUMNS, row))
+        for column in self.JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def create(self, request: dict):
+        job = new_job(request)
+        values = [
+            json.dumps(job[c], ensure_ascii=False) if c in self.JSON_COLUMNS and job[c] is not None else job[c]
+            for c in self.COLUMNS
+        ]
+        self._conn.execute(f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})", values)
+
+        # 보관 기간이 지난 완료 작업 정리
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (JOB_DONE, JOB_FAILED, time.time() - self.retention)
+        )
+        return job
+
+    def get(self, job_id: str):
+        row = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        values = [
+            json.dumps(value, ensure_ascii=False) if column in self.JSON_COLUMNS and value is not None else value
+            for column, value in fields.items()
+        ]
+        self._conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", values + [job_id])
+
+    def claim(self, job_id: str, stale_after: float):
+        """대기 중이거나 stale_after초 이상 갱신이 없는 실행 중 작업을 실행 상태로 전환 (여러 프로세스 간 중복 실행 방지)"""
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE job_id = ? AND (status = ? OR (status = ? AND updated_at < ?))",
+            (JOB_RUNNING, self.owner, now, job_id, JOB_QUEUED, JOB_RUNNING, now - stale_after)
+        )
+        return cursor.rowcount > 0
+
+    def requeue_running(self, stale_after: float = None):
+        """소유 프로세스가 끝났거나 stale_after초 이상 갱신이 없는 실행 중 작업을 대기 상태로 되돌림 (되돌린 작업 ID 목록 반환)
+
+        다른 프로세스가 실행 중인 작업은 갱신이 멈추기 전까지 건드리지 않는다.
+        """
+        now = time.time()
+        rows = self._conn.execute(
+            "SELECT job_id, owner, updated_at FROM jobs WHERE status = ?", (JOB_RUNNING,)
+        ).fetchall()
+        requeued = []
+        for job_id, owner, updated_at in rows:
+            stale = stale_after is not None and updated_at < now - stale_after
+            if not (stale or self._owner_gone(owner)):
+                continue
+            # 확인 후 다른 프로세스가 가져가거나 갱신했으면 되돌리지 않음
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? WHERE job_id = ? AND status = ? AND updated_at = ?",
+                (JOB_QUEUED, now, job_id, JOB_RUNNING, updated_at)
+            )
+            if cursor.rowcount:
+                requeued.append(job_id)
+        return requeued
+
+    def list_unfinished(self):
+        rows = self._conn.execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+            UNFINISHED_STATUSES
+        ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def stats(self):
+        counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {"size": sum(counts.values()), "statuses": counts, "path": self.path}
@@ -0,0 +1,48 @@
+import os
+import asyncio
+
+from observability import external_call
+
+# 워커 프로세스당 동시에 진행할 수 있는 LLM 호출 수
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+
+
+class AsyncLLMClient:
+    """이벤트 루프를 막지 않는 LLM 호출 래퍼 (프로세스 단위 동시성 제한)"""
+
+    def __init__(self, llm, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self._structured = {}  # 스키마 이름 -> structured output 러너블
+
+    async def ainvoke(self, messages) -> str:
+        """메시지를 비동기로 전송하고 응답 텍스트 반환"""
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                with external_call("openai", "chat"):
+                    if hasattr(self.llm, "ainvoke"):
+                        response = await self.llm.ainvoke(messages)
+                    else:
+                        # ainvoke가 없는 LLM은 스레드에서 실행해 이벤트 루프를 막지 않음
+                        response = await asyncio.to_thread(self.llm.invoke, messages)
+            finally:
+                self.in_flight -= 1
+        return response.content
+
+    async def ainvoke_structured(self, messages, schema: dict):
+        """JSON 스키마를 강제하는 structured output으로 호출하고 dict 반환"""
+        structured_llm = self._structured.get(schema["title"])
+        if structured_llm is None:
+            structured_llm = self.llm.with_structured_output(schema, method="json_schema", strict=True)
+            self._structured[schema["title"]] = structured_llm
+
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                with external_call("openai", "chat_structured"):
+                    return await structured_llm.ainvoke(messages)
+            finally:
+                self.in_flight -= 1
@@ -5,8 +5,6 @@ from langchain_openai import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
 from dotenv import load_dotenv
 from pathlib import Path
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
 import os
 import re
 import base64
@@ -18,6 +16,9 @@ import uuid
 import asyncio
 import aiohttp
 from typing import List, Dict, Any
+from llm_client import AsyncLLMClient
+from database import fetch_all, fetch_one
+from outfit_matcher import OutfitMatcher, iter_outfit_matches
 
 # .env 로드
 env_path = Path(__file__).resolve().parent.parent / '.env'
@@ -26,6 +27,7 @@ api_key = os.getenv("OPENAI_API_KEY")
 
 # GPT 초기화
 llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=0.5, api_key=api_key)
+llm_client = AsyncLLMClient(llm)
 
 # FastAPI 앱 초기화
 app = FastAPI()
@@ -37,17 +39,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# DB 접속 정보
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_NAME = os.getenv("DB_NAME")
-
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine)
-
 # 옷 종류 및 카테고리 정의
 CLOTHING_TYPES = {
     'TOP': [
@@ -116,19 +107,18 @@ class RecommendationRequest(BaseModel):
     showClosetOnly: bool
 
 # 옷장의 옷 종류만 가져오는 함수 (첫 번째 프롬프트용)
-def load_clothing_types_from_db(user_id: str):
+async def load_clothing_types_from_db(user_id: str):
     try:
-        session = SessionLocal()
-        query = text("""
+        query = """
             SELECT DISTINCT
                 type,
                 category
             FROM clothes
             WHERE user_id = :user_id
-        """)
+        """
         
         print(f"SQL 쿼리 실행: user_id = {user_id}")  # 디버깅용 로그
-        result = session.execute(query, {"user_id": user_id}).fetchall()
+        result = await fetch_all(query, {"user_id": user_id})
         print(f"SQL 쿼리 결과: {result}")  # 디버깅용 로그
         
         items = []
@@ -148,14 +138,11 @@ def load_clothing_types_from_db(user_id: str):
     except Exception as e:
         print(f"데이터베이스 조회 중 오류 발생: {e}")
         return []
-    finally:
-        session.close()
 
 # 옷의 상세 정보를 가져오는 함수 (두 번째 프롬프트용)
-def load_clothing_details_from_db(user_id: str):
+async def load_clothing_details_from_db(user_id: str):
     try:
-        session = SessionLocal()
-        query = text("""
+        query = """
             SELECT 
                 id,
                 type,
@@ -165,9 +152,9 @@ def load_clothing_details_from_db(user_id: str):
                 image_url
             FROM clothes
             WHERE user_id = :user_id
-        """)
+        """
         
-        result = session.execute(query, {"user_id": user_id}).fetchall()
+        result = await fetch_all(query, {"user_id": user_id})
         
         items = []
         for row in result:
@@ -195,14 +182,11 @@ def load_clothing_details_from_db(user_id: str):
     except Exception as e:
         print(f"데이터베이스 조회 중 오류 발생: {e}")
         return []
-    finally:
-        session.close()
 
 # 사용자 정보 로드 함수 추가
-def load_user_data(user_id: str):
+async def load_user_data(user_id: str):
     try:
-        session = SessionLocal()
-        query = text("""
+        query = """
             SELECT 
                 id,
                 gender,
@@ -213,9 +197,9 @@ def load_user_data(user_id: str):
                 body_image_url
             FROM users
             WHERE id = :user_id
-        """)
+        """
         
-        result = session.execute(query, {"user_id": user_id}).fetchone()
+        result = await fetch_one(query, {"user_id": user_id})
         
         if result:
             return {
@@ -231,11 +215,9 @@ def load_user_data(user_id: str):
     except Exception as e:
         print(f"사용자 데이터 조회 중 오류 발생: {e}")
         return None
-    finally:
-        session.close()
 
 # GPT에 추천 조합 요청 (사용자 정보 반영)
-def ask_gpt_for_filtering_criteria(situation, user_data, available_types, target_time, target_place, high_temp, low_temp, rain_percent, status):
+async def ask_gpt_for_filtering_criteria(situation, user_data, available_types, target_time, target_place, high_temp, low_temp, rain_percent, status):
     gender = "여성" if user_data["gender"] == "FEMALE" else "남성"
     skin_tone = {
         "COOL": "쿨톤",
@@ -294,10 +276,10 @@ def ask_gpt_for_filtering_criteria(situation, user_data, available_types, target
         SystemMessage(content="당신은 패션 스타일리스트입니다. 반드시 영문으로만 응답하고, 주어진 형식에 정확히 맞춰서만 응답해주세요."),
         HumanMessage(content=prompt)
     ]
-    return llm.invoke(messages).content
+    return await llm_client.ainvoke(messages)
 
 # GPT에 일반적인 옷 추천 요청 (사용자 정보 반영)
-def ask_gpt_for_general_recommendation(situation, user_data, target_time, target_place, high_temp, low_temp, rain_percent, status):
+async def ask_gpt_for_general_recommendation(situation, user_data, target_time, target_place, high_temp, low_temp, rain_percent, status):
     gender = "여성" if user_data["gender"] == "FEMALE" else "남성"
     skin_tone = {
         "COOL": "쿨톤",
@@ -356,10 +338,10 @@ def ask_gpt_for_general_recommendation(situation, user_data, target_time, target
         SystemMessage(content="당신은 패션 스타일리스트입니다. 반드시 영문으로만 응답하고, 주어진 형식에 정확히 맞춰서만 응답해주세요."),
         HumanMessage(content=prompt)
     ]
-    return llm.invoke(messages).content
+    return await llm_client.ainvoke(messages)
 
 # GPT에 옷장 기반 최종 추천 요청 (사용자 정보 반영)
-def ask_gpt_for_best_clothing_sets(situation, outfit_sets, recommended_combinations, is_closet_only, user_data, target_time, target_place, high_temp, low_temp, rain_percent, status):
+async def ask_gpt_for_best_clothing_sets(situation, outfit_sets, recommended_combinations, is_closet_only, user_data, target_time, target_place, high_temp, low_temp, rain_percent, status):
     gender = "여성" if user_data["gender"] == "FEMALE" else "남성"
     skin_tone = {
         "COOL": "쿨톤",
@@ -464,7 +446,7 @@ def ask_gpt_for_best_clothing_sets(situation, outfit_sets, recommended_combinati
         SystemMessage(content="당신은 패션 코디 전문가입니다."),
         HumanMessage(content=prompt)
     ]
-    return llm.invoke(messages).content
+    return await llm_client.ainvoke(messages)
 
 # GPT 응답 파싱 함수
 def parse_gpt_result(text: str):
@@ -704,17 +686,14 @@ async def apply_virtual_tryon_async(user_data, outfit_combination):
             print(f"[DEBUG] 원피스 ID: {clothing_id}")
             
             # DB에서 해당 옷의 image_url 가져오기
-            session = SessionLocal()
-            query = text("""
+            result = await fetch_one("""
                 SELECT image_url 
                 FROM clothes 
                 WHERE id = :id AND user_id = :user_id
-            """)
-            result = session.execute(query, {
+            """, {
                 "id": int(clothing_id.split("_")[1]),
                 "user_id": user_data["id"]
-            }).fetchone()
-            session.close()
+            })
             
             if not result or not result[0]:
                 print(f"[ERROR] 의류 이미지를 찾을 수 없음: {clothing_id}")
@@ -754,19 +733,16 @@ async def apply_virtual_tryon_async(user_data, outfit_combination):
             print(f"[DEBUG] 상의 ID: {top_id}, 하의 ID: {bottom_id}")
 
             # DB에서 해당 옷들의 image_url 가져오기
-            session = SessionLocal()
-            query = text("""
+            result = await fetch_all("""
                 SELECT id, image_url 
                 FROM clothes 
                 WHERE id IN (:top_id, :bottom_id) 
                 AND user_id = :user_id
-            """)
-            result = session.execute(query, {
+            """, {
                 "top_id": int(top_id),
                 "bottom_id": int(bottom_id),
                 "user_id": user_data["id"]
-            }).fetchall()
-            session.close()
+            })
             
             if len(result) != 2:
                 print(f"[ERROR] 의류 이미지를 찾을 수 없음: 상의={top_id}, 하의={bottom_id}")
@@ -850,54 +826,22 @@ async def apply_virtual_tryon_async(user_data, outfit_combination):
         print(f"[ERROR] 가상 피팅 처리 중 예상치 못한 에러: {e}")
         return None, f"가상 피팅 처리 중 오류 발생: {e}"
 
+# 요청 조합별로 두 번째 GPT 프롬프트에 넣을 최대 옷 조합 수
+MATCH_TOP_K = int(os.getenv("MATCH_TOP_K", "5"))
+
 # 옷장에서 조합 매칭 (상세 정보 필요)
 def match_outfit_combinations(data, recommended_combinations, user_data, available_types):
-    outfit_sets = []
-    for line in recommended_combinations.splitlines():
-        if 'onepiece' in line.lower() and user_data["gender"] == "FEMALE":
-            # ONEPIECE 매칭
-            for op in available_types['ONEPIECE']:
-                if op in line.upper():
-                    # ONEPIECE 카테고리의 해당 상세 타입(DRESS/JUMPSUIT) 매칭
-                    matches = [item for item in data if item['attributes']['type'] == 'ONEPIECE' and item['attributes']['category'] == op]
-                    for match in matches:
-                        outfit_sets.append(f"{match['clothing_id']} ({match['attributes']['category']})")
-                        
-        elif 'top' in line.lower() and 'bottom' in line.lower():
-            # TOP과 BOTTOM 타입 추출
-            top_type = None
-            bottom_type = None
-            
-            # TOP 상세 카테고리 매칭
-            for top in available_types['TOP']:
-                if top in line.upper():
-                    top_type = top
-                    break
-                    
-            # BOTTOM 상세 카테고리 매칭
-            for bottom in available_types['BOTTOM']:
-                if bottom in line.upper():
-                    bottom_type = bottom
-                    break
-            
-            if top_type and bottom_type:
-                # TOP 매칭
-                top_matches = [item for item in data if item['attributes']['type'] == 'TOP' and item['attributes']['category'] == top_type]
-                # BOTTOM 매칭
-                bottom_matches = [item for item in data if item['attributes']['type'] == 'BOTTOM' and item['attributes']['category'] == bottom_type]
-                
-                if top_matches and bottom_matches:
-                    for t in top_matches:
-                        for b in bottom_matches:
-                            outfit_sets.append(f"{t['clothing_id']} ({t['attributes']['category']}) + {b['clothing_id']} ({b['attributes']['category']})")
-    
+    # 요청 조합별 톤/패턴 궁합 상위 MATCH_TOP_K개만 (전체 상의 x 하의 조합을 프롬프트에 넣지 않음)
+    matcher = OutfitMatcher(data)
+    outfit_sets = list(iter_outfit_matches(matcher, recommended_combinations, user_data["gender"], available_types, MATCH_TOP_K))
+
     print(f"매칭된 옷 조합: {outfit_sets}")  # 디버깅용 로그
     return outfit_sets
 
 # 메인 API 엔드포인트
 @app.post("/vision/recommendation")
 async def recommend(request: RecommendationRequest):
-    user_data = load_user_data(request.user_id)
+    user_data = await load_user_data(request.user_id)
     
     if not user_data:
         return {
@@ -911,7 +855,7 @@ async def recommend(request: RecommendationRequest):
         }
     
     # 옷장에 있는 옷 종류만 추출 (중복 제거)
-    data = load_clothing_types_from_db(request.user_id)
+    data = await load_clothing_types_from_db(request.user_id)
     print(f"옷장 데이터: {data}")
     
     available_types = {
@@ -948,7 +892,7 @@ async def recommend(request: RecommendationRequest):
                 }
             }
             
-        recommended_combinations = ask_gpt_for_filtering_criteria(
+        recommended_combinations = await ask_gpt_for_filtering_criteria(
             request.situation,
             user_data,
             available_types_str,
@@ -961,7 +905,7 @@ async def recommend(request: RecommendationRequest):
         )
     else:
         # 일반적인 추천을 포함하는 경우
-        recommended_combinations = ask_gpt_for_general_recommendation(
+        recommended_combinations = await ask_gpt_for_general_recommendation(
             request.situation,
             user_data,
             request.targetTime,
@@ -973,7 +917,7 @@ async def recommend(request: RecommendationRequest):
         )
 
     # 옷장에서 조합 매칭
-    data = load_clothing_details_from_db(request.user_id)
+    data = await load_clothing_details_from_db(request.user_id)
     outfit_sets = match_outfit_combinations(data, recommended_combinations, user_data, available_types)
     
     if not outfit_sets and request.showClosetOnly:
@@ -987,7 +931,7 @@ async def recommend(request: RecommendationRequest):
             }
         }
 
-    final_response = ask_gpt_for_best_clothing_sets(
+    final_response = await ask_gpt_for_best_clothing_sets(
         request.situation,
         outfit_sets,
         recommended_combinations,
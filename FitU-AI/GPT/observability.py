@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import uuid
+import contextvars
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from starlette.routing import Match
+
+# 단계별 span 종료 시마다 구조화 로그 출력 (기본은 요청 종료 시 요약 한 줄만 출력)
+TRACE_LOG_SPANS = os.getenv("TRACE_LOG_SPANS", "false").lower() == "true"
+# 요청 추적 ID로 그대로 사용하는 요청 헤더 (백엔드가 보낸 ID가 있으면 로그를 이어서 검색 가능)
+TRACE_HEADER = "x-request-id"
+
+# DB 조회(ms)부터 FASHN 피팅(수십 초)까지 포함하는 구간
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "fitu_stage_duration_seconds", "추천 파이프라인 단계별 소요 시간", ["stage", "outcome"], buckets=LATENCY_BUCKETS
+)
+STAGES_IN_FLIGHT = Gauge("fitu_stage_in_flight", "실행 중인 단계 수", ["stage"])
+REQUEST_SECONDS = Histogram(
+    "fitu_request_duration_seconds", "HTTP 요청 소요 시간 (스트리밍은 마지막 이벤트까지)", ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("fitu_requests_in_flight", "처리 중인 HTTP 요청 수", ["route"])
+EXTERNAL_CALLS = Counter("fitu_external_calls_total", "외부 서비스 호출 수", ["service", "operation", "outcome"])
+
+_current_trace = contextvars.ContextVar("fitu_trace", default=None)
+
+
+class Trace:
+    """요청 하나의 추적 정보 (추적 ID + 단계별 소요 시간 합계)"""
+
+    def __init__(self, trace_id: str = None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.stages = {}  # 단계 -> {"count", "seconds", "errors"}
+
+    def record(self, stage: str, seconds: float, error: bool):
+        entry = self.stages.setdefault(stage, {"count": 0, "seconds": 0.0, "errors": 0})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        entry["errors"] += int(error)
+
+    def summary(self):
+        return {
+            stage: {"count": entry["count"], "ms": round(entry["seconds"] * 1000, 1), "errors": entry["errors"]}
+            for stage, entry in self.stages.items()
+        }
+
+
+class Span:
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.error = None
+
+    def fail(self, error):
+        """예외 없이 (결과, 에러) 형태로 실패를 반환하는 호출의 실패 기록"""
+        self.error = str(error)
+
+
+def current_trace_id():
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+def log_event(event: str, level: str = "INFO", **fields):
+    """추적 ID가 포함된 JSON 한 줄 로그"""
+    record = {"level": level, "event": event, "trace_id": current_trace_id(), **fields}
+    print(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def log(message: str, level: str = "INFO", trace_id: str = None):
+    """기존 "[INFO] ..." 형식 로그에 추적 ID(기본: 현재 추적)를 붙여 출력 (추적 밖에서는 그대로 출력)"""
+    trace_id = trace_id or current_trace_id()
+    if trace_id is None:
+        print(f"[{level}] {message}")
+    else:
+        print(f"[{level}] [trace_id={trace_id}] {message}")
+
+
+@contextmanager
+def start_trace(trace_id: str = None):
+    """현재 컨텍스트(와 그 안에서 만든 태스크)에 추적 시작"""
+    trace = Trace(trace_id)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(stage: str):
+    """단계 소요 시간을 히스토그램과 현재 추적에 기록 (async 코드에서도 with 블록 안에서 await 가능)"""
+    current = Span(stage)
+    STAGES_IN_FLIGHT.labels(stage).inc()
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = current.error or type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        STAGES_IN_FLIGHT.labels(stage).dec()
+        STAGE_SECONDS.labels(stage, "error" if current.error else "ok").observe(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.record(stage, seconds, current.error is not None)
+        if TRACE_LOG_SPANS:
+            log_event("span", stage=stage, ms=round(seconds * 1000, 1), error=current.error)
+
+
+@contextmanager
+def external_call(service: str, operation: str, stage: str = None):
+    """외부 서비스 호출 1회 (호출 수 카운터 + 단계 span)"""
+    with span(stage or f"{service}_{operation}") as current:
+        try:
+            yield current
+        except BaseException as e:
+            current.error = current.error or type(e).__name__
+            raise
+        finally:
+            EXTERNAL_CALLS.labels(service, operation, "error" if current.error else "ok").inc()
+
+
+def count_external_call(service: str, operation: str, ok: bool = True):
+    """소요 시간은 따로 재지 않는 외부 호출 수 기록 (백그라운드 폴링 등)"""
+    EXTERNAL_CALLS.labels(service, operation, "ok" if ok else "error").inc()
+
+
+def metrics_payload():
+    """/metrics 응답 (본문, Content-Type)"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def _route_path(scope):
+    """라벨용 경로 템플릿 (예: /vision/recommendation/jobs/{job_id})"""
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class TraceMiddleware:
+    """요청마다 추적 ID 발급, 경로별 소요 시간/처리 중 요청 수 기록, 종료 시 단계별 요약 로그
+
+    순수 ASGI 미들웨어라서 스트리밍 응답도 마지막 본문을 보낼 때까지 같은 추적 컨텍스트에서 측정된다.
+    """
+
+    def __init__(self, app, excluded_paths=("/metrics",)):
+        self.app = app
+        self.excluded_paths = set(excluded_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        requested_id = headers.get(TRACE_HEADER.encode(), b"").decode("latin-1").strip()[:64]
+        route = _route_path(scope)
+        status = {"code": 500}
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-trace-id", trace.trace_id.encode())]
+            await send(message)
+
+        with start_trace(requested_id or None) as trace:
+            REQUESTS_IN_FLIGHT.labels(route).inc()
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                seconds = time.perf_counter() - trace.started
+                REQUESTS_IN_FLIGHT.labels(route).dec()
+                REQUEST_SECONDS.labels(route, scope["method"], str(status["code"])).observe(seconds)
+                log_event(
+                    "request", route=route, method=scope["method"], status=status["code"],
+                    ms=round(seconds * 1000, 1), stages=trace.summary()
+                )
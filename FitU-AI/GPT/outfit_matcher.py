@@ -0,0 +1,123 @@
+import heapq
+
+import numpy as np
+
+# 요청 조합별로 프롬프트에 넣을 최대 옷 조합 수
+MATCH_TOP_K = 5
+# 점수 계산 시 한 번에 처리하는 상의 수 (메모리 사용량 = 블록 크기 x 하의 수)
+MATCH_BLOCK_SIZE = 256
+
+# 옷장 스냅샷의 톤 값 (TONE_MAP 변환 결과)
+TONES = ["밝은 계열", "어두운 계열", "고려하지 않음"]
+TONE_INDEX = {tone: i for i, tone in enumerate(TONES)}
+UNKNOWN_TONE = TONE_INDEX["고려하지 않음"]
+
+PATTERNS = ['PLAIN', 'ANIMAL', 'ARTIFACT', 'CHECK', 'DOT', 'ETC', 'NATURE', 'GEOMETRIC', 'PLANT', 'STRIPE', 'SYMBOL']
+PATTERN_INDEX = {pattern: i for i, pattern in enumerate(PATTERNS)}
+UNKNOWN_PATTERN = PATTERN_INDEX['ETC']
+
+# 상의 x 하의 톤 궁합 (밝은/어두운 대비가 가장 안정적, 같은 톤끼리는 무난)
+TONE_COMPATIBILITY = np.array([
+    [0.6, 1.0, 0.7],
+    [1.0, 0.5, 0.7],
+    [0.7, 0.7, 0.7],
+])
+
+# 상의 x 하의 패턴 궁합 (무지는 어떤 패턴과도 잘 어울리고, 패턴끼리 겹치면 감점)
+PATTERN_COMPATIBILITY = np.full((len(PATTERNS), len(PATTERNS)), -0.3)
+PATTERN_COMPATIBILITY[0, :] = 0.8
+PATTERN_COMPATIBILITY[:, 0] = 0.8
+PATTERN_COMPATIBILITY[0, 0] = 0.6
+np.fill_diagonal(PATTERN_COMPATIBILITY[1:, 1:], -0.6)
+
+
+class OutfitMatcher:
+    """옷장 옷을 정수 인덱스 배열로 바꿔 두고 카테고리별 상의 x 하의 조합 중 상위 K개만 계산
+
+    전체 조합 문자열을 만들지 않고 상의 블록 단위로 점수 행렬을 계산해 상위 K개만 유지하므로
+    메모리와 결과 크기가 옷장 크기와 무관하게 제한된다.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.tones = np.array([TONE_INDEX.get(item['attributes']['tone'], UNKNOWN_TONE) for item in items], dtype=np.int8)
+        self.patterns = np.array(
+            [PATTERN_INDEX.get(item['attributes']['pattern'], UNKNOWN_PATTERN) for item in items], dtype=np.int8
+        )
+        self._by_category = {}  # (종류, 카테고리) -> 옷 인덱스 배열
+        groups = {}
+        for i, item in enumerate(items):
+            groups.setdefault((item['attributes']['type'], item['attributes']['category']), []).append(i)
+        for key, indices in groups.items():
+            self._by_category[key] = np.array(indices, dtype=np.int32)
+
+    def indices(self, clothing_type, category):
+        return self._by_category.get((clothing_type, category), np.empty(0, dtype=np.int32))
+
+    def pair_scores(self, tops, bottoms):
+        """상의 인덱스 x 하의 인덱스 점수 행렬"""
+        return (TONE_COMPATIBILITY[self.tones[tops][:, None], self.tones[bottoms][None, :]]
+                + PATTERN_COMPATIBILITY[self.patterns[tops][:, None], self.patterns[bottoms][None, :]])
+
+    def top_pairs(self, top_category, bottom_category, k=MATCH_TOP_K, block_size=MATCH_BLOCK_SIZE):
+        """(상의 인덱스, 하의 인덱스, 점수)를 점수 높은 순으로 최대 k개 반환 (동점이면 옷장 순서)"""
+        tops = self.indices('TOP', top_category)
+        bottoms = self.indices('BOTTOM', bottom_category)
+        if k <= 0 or not len(tops) or not len(bottoms):
+            return []
+
+        best = []  # (점수, -상의 순번, -하의 순번) 최소 힙
+        for start in range(0, len(tops), block_size):
+            block = tops[start:start + block_size]
+            scores = self.pair_scores(block, bottoms).ravel()
+            # 블록 안에서 상위 k개 후보만 꺼낸 뒤 전체 상위 k개와 합침 (경계 점수 동점은 옷장 순서대로)
+            if len(scores) > k:
+                kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+                above = np.flatnonzero(scores > kth)
+                ties = np.flatnonzero(scores == kth)[:k - len(above)]
+                candidates = np.concatenate([above, ties])
+            else:
+                candidates = np.arange(len(scores))
+            for flat in candidates:
+                row, col = divmod(int(flat), len(bottoms))
+                entry = (float(scores[flat]), -(start + row), -col)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+
+        return [(int(tops[-t]), int(bottoms[-b]), score) for score, t, b in sorted(best, reverse=True)]
+
+    def top_onepieces(self, category, k=MATCH_TOP_K):
+        """원피스 인덱스를 최대 k개 반환 (무지 우선, 동점이면 옷장 순서)"""
+        onepieces = self.indices('ONEPIECE', category)
+        order = np.argsort(self.patterns[onepieces] != PATTERN_INDEX['PLAIN'], kind="stable")
+        return [int(i) for i in onepieces[order][:k]]
+
+    def format_item(self, index):
+        item = self.items[index]
+        return f"{item['clothing_id']} ({item['attributes']['category']})"
+
+
+def _by_specificity(categories):
+    """긴 카테고리 이름 먼저 (예: 'TSHIRT' 줄이 'SHIRT'로 잘못 매칭되지 않도록)"""
+    return sorted(categories, key=lambda category: (-len(category), category))
+
+
+def iter_outfit_matches(matcher: OutfitMatcher, recommended_combinations, gender, available_types, k=MATCH_TOP_K):
+    """추천 조합 줄마다 옷장 조합 문자열을 상위 k개씩 순서대로 생성"""
+    for line in recommended_combinations.splitlines():
+        if 'onepiece' in line.lower() and gender == "FEMALE":
+            # ONEPIECE 카테고리의 해당 상세 타입(DRESS/JUMPSUIT) 매칭
+            for op in _by_specificity(available_types['ONEPIECE']):
+                if op in line.upper():
+                    for index in matcher.top_onepieces(op, k):
+                        yield matcher.format_item(index)
+
+        elif 'top' in line.lower() and 'bottom' in line.lower():
+            # TOP/BOTTOM 상세 카테고리 매칭
+            top_type = next((top for top in _by_specificity(available_types['TOP']) if top in line.upper()), None)
+            bottom_type = next((bottom for bottom in _by_specificity(available_types['BOTTOM']) if bottom in line.upper()), None)
+            if top_type and bottom_type:
+                for top, bottom, _ in matcher.top_pairs(top_type, bottom_type, k):
+                    yield f"{matcher.format_item(top)} + {matcher.format_item(bottom)}"
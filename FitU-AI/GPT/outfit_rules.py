@@ -0,0 +1,189 @@
+import numpy as np
+
+from situation_index import normalize_situation
+
+# 카테고리 순서 (aws_api.CLOTHING_TYPES와 동일)
+TOPS = ['BLOUSE', 'CARDIGAN', 'COAT', 'JACKET', 'JUMPER', 'SHIRT', 'SWEATER', 'TSHIRT', 'VEST']
+BOTTOMS = ['ACTIVEWEAR', 'JEANS', 'PANTS', 'SHORTS', 'SKIRT', 'SLACKS']
+ONEPIECES = ['DRESS', 'JUMPSUIT']
+ALL_CATEGORIES = TOPS + BOTTOMS + ONEPIECES
+CATEGORY_INDEX = {category: i for i, category in enumerate(ALL_CATEGORIES)}
+
+N_TOPS = len(TOPS)
+N_BOTTOMS = len(BOTTOMS)
+
+
+def category_vector(scores: dict):
+    """카테고리별 점수 dict를 ALL_CATEGORIES 순서의 벡터로 변환"""
+    vector = np.zeros(len(ALL_CATEGORIES))
+    for category, score in scores.items():
+        vector[CATEGORY_INDEX[category]] = score
+    return vector
+
+
+# 계절 구간별 적합도 (get_season_guide의 25°C / 15°C 기준과 동일한 구간)
+SEASON_SCORES = np.stack([
+    # 여름 (25°C 이상)
+    category_vector({
+        'TSHIRT': 1.0, 'SHIRT': 0.8, 'BLOUSE': 0.8, 'VEST': 0.3, 'CARDIGAN': 0.1,
+        'JACKET': -0.5, 'SWEATER': -0.8, 'JUMPER': -1.0, 'COAT': -1.0,
+        'SHORTS': 1.0, 'SKIRT': 0.7, 'PANTS': 0.6, 'ACTIVEWEAR': 0.5, 'SLACKS': 0.4, 'JEANS': 0.3,
+        'DRESS': 0.9, 'JUMPSUIT': 0.5
+    }),
+    # 봄/가을 (15~24°C)
+    category_vector({
+        'SHIRT': 1.0, 'BLOUSE': 1.0, 'CARDIGAN': 0.9, 'JACKET': 0.8, 'SWEATER': 0.7,
+        'TSHIRT': 0.5, 'VEST': 0.5, 'JUMPER': 0.2, 'COAT': 0.1,
+        'JEANS': 1.0, 'PANTS': 0.9, 'SLACKS': 0.9, 'SKIRT': 0.8, 'ACTIVEWEAR': 0.4, 'SHORTS': -0.2,
+        'DRESS': 0.8, 'JUMPSUIT': 0.7
+    }),
+    # 겨울 (15°C 미만)
+    category_vector({
+        'COAT': 1.0, 'SWEATER': 0.9, 'JUMPER': 0.9, 'JACKET': 0.8, 'CARDIGAN': 0.7,
+        'SHIRT': 0.2, 'BLOUSE': 0.1, 'VEST': 0.1, 'TSHIRT': -0.3,
+        'JEANS': 0.9, 'PANTS': 0.9, 'SLACKS': 0.9, 'ACTIVEWEAR': 0.3, 'SKIRT': 0.0, 'SHORTS': -1.0,
+        'DRESS': 0.3, 'JUMPSUIT': 0.4
+    }),
+])
+
+# 강수확률 100% 기준 가감점 (강수확률 비율만큼 적용)
+RAIN_SCORES = category_vector({
+    'JACKET': 0.3, 'JUMPER': 0.3, 'COAT': 0.2,
+    'SHORTS': -0.3, 'SKIRT': -0.3, 'DRESS': -0.3, 'SLACKS': -0.1
+})
+
+# 남성 추천에서 제외하거나 감점할 카테고리 (원피스는 별도로 제외)
+MALE_SCORES = category_vector({'BLOUSE': -1.5, 'SKIRT': -2.0})
+
+# 상황 키워드별 스타일 가감점
+SITUATION_RULES = [
+    (('결혼식', '하객', '면접', '회의', '발표', '장례식', '격식', '상견례', '졸업식'), category_vector({
+        'SHIRT': 0.8, 'BLOUSE': 0.8, 'JACKET': 0.7, 'COAT': 0.3, 'SLACKS': 0.9, 'SKIRT': 0.3, 'PANTS': 0.2,
+        'DRESS': 0.8, 'JUMPSUIT': 0.2,
+        'TSHIRT': -0.6, 'JUMPER': -0.4, 'ACTIVEWEAR': -1.2, 'SHORTS': -1.0, 'JEANS': -0.3
+    })),
+    (('운동', '등산', '캠핑', '헬스', '산책', '소풍', '러닝', '자전거'), category_vector({
+        'ACTIVEWEAR': 1.2, 'TSHIRT': 0.7, 'JUMPER': 0.5, 'SHORTS': 0.4, 'JEANS': 0.1,
+        'BLOUSE': -0.8, 'SLACKS': -0.8, 'SKIRT': -0.8, 'COAT': -0.5, 'SHIRT': -0.3,
+        'DRESS': -1.0, 'JUMPSUIT': -0.3
+    })),
+    (('데이트', '파티', '소개팅', '콘서트', '생일', '전시회', '여행'), category_vector({
+        'BLOUSE': 0.5, 'SHIRT': 0.4, 'CARDIGAN': 0.4, 'JEANS': 0.4, 'SKIRT': 0.5,
+        'DRESS': 0.6, 'JUMPSUIT': 0.3,
+        'ACTIVEWEAR': -0.6
+    })),
+    (('출근', '학교', '수업', '회사', '오피스'), category_vector({
+        'SHIRT': 0.6, 'CARDIGAN': 0.4, 'BLOUSE': 0.4, 'SLACKS': 0.6, 'PANTS': 0.4,
+        'ACTIVEWEAR': -0.8, 'SHORTS': -0.6
+    })),
+]
+
+# 상의 x 하의 궁합 (행: TOPS, 열: BOTTOMS)
+PAIR_COMPATIBILITY = np.zeros((N_TOPS, N_BOTTOMS))
+for top, bottom, score in [
+    ('COAT', 'SHORTS', -1.0), ('JUMPER', 'SHORTS', -0.8), ('SWEATER', 'SHORTS', -0.6),
+    ('COAT', 'ACTIVEWEAR', -0.4), ('BLOUSE', 'ACTIVEWEAR', -0.5), ('SHIRT', 'ACTIVEWEAR', -0.3),
+    ('SHIRT', 'SLACKS', 0.2), ('BLOUSE', 'SKIRT', 0.2), ('JACKET', 'SLACKS', 0.2),
+    ('TSHIRT', 'JEANS', 0.1), ('TSHIRT', 'ACTIVEWEAR', 0.1), ('CARDIGAN', 'SKIRT', 0.1),
+]:
+    PAIR_COMPATIBILITY[TOPS.index(top), BOTTOMS.index(bottom)] = score
+
+# 이미 고른 상의/하의를 다시 쓸 때의 감점 (추천 다양성)
+REUSE_PENALTY = 0.6
+# 원피스는 카테고리 1개로 상의+하의 2개 점수와 비교하므로 2배로 환산
+ONEPIECE_WEIGHT = 2.0
+MAX_ONEPIECE_COMBINATIONS = 1
+
+
+def get_season_index(avg_temp):
+    """get_season_guide와 같은 기온 구간 인덱스"""
+    if avg_temp >= 25:
+        return 0
+    elif avg_temp >= 15:
+        return 1
+    return 2
+
+
+def score_categories(gender, avg_temp, rain_percent, situation_text, available_types=None, is_closet_only=True):
+    """카테고리별 점수 벡터 계산 (옷장에 없는 카테고리는 -inf)"""
+    scores = SEASON_SCORES[get_season_index(avg_temp)].copy()
+    scores += RAIN_SCORES * (min(max(rain_percent, 0), 100) / 100)
+
+    if gender != "FEMALE":
+        scores += MALE_SCORES
+
+    normalized = normalize_situation(situation_text)
+    for keywords, rule_scores in SITUATION_RULES:
+        if any(keyword in normalized for keyword in keywords):
+            scores += rule_scores
+
+    if available_types is not None:
+        owned = np.zeros(len(ALL_CATEGORIES), dtype=bool)
+        for categories in available_types.values():
+            for category in categories:
+                if category in CATEGORY_INDEX:
+                    owned[CATEGORY_INDEX[category]] = True
+        if is_closet_only:
+            scores[~owned] = -np.inf
+        else:
+            # 옷장에 있는 옷 종류를 약간 우선
+            scores[owned] += 0.2
+
+    if gender != "FEMALE":
+        scores[N_TOPS + N_BOTTOMS:] = -np.inf
+
+    return scores
+
+
+def rank_outfit_combinations(gender, avg_temp, rain_percent, situation_text, available_types=None,
+                             is_closet_only=True, num_combinations=3):
+    """TOP x BOTTOM / ONEPIECE 카테고리 조합을 점수순으로 선택 ([(top, bottom) 또는 (onepiece,)] 리스트)"""
+    scores = score_categories(gender, avg_temp, rain_percent, situation_text, available_types, is_closet_only)
+    top_scores = scores[:N_TOPS]
+    bottom_scores = scores[N_TOPS:N_TOPS + N_BOTTOMS]
+    onepiece_scores = scores[N_TOPS + N_BOTTOMS:] * ONEPIECE_WEIGHT
+
+    pair_scores = top_scores[:, None] + bottom_scores[None, :] + PAIR_COMPATIBILITY
+    top_uses = np.zeros(N_TOPS)
+    bottom_uses = np.zeros(N_BOTTOMS)
+    onepiece_used = np.zeros(len(ONEPIECES), dtype=bool)
+    pair_used = np.zeros((N_TOPS, N_BOTTOMS), dtype=bool)
+
+    selected = []
+    while len(selected) < num_combinations:
+        adjusted = pair_scores - REUSE_PENALTY * (top_uses[:, None] + bottom_uses[None, :])
+        adjusted[pair_used] = -np.inf
+        best_pair = np.unravel_index(np.argmax(adjusted), adjusted.shape)
+        best_pair_score = adjusted[best_pair]
+
+        best_onepiece_score = -np.inf
+        if sum(1 for combo in selected if len(combo) == 1) < MAX_ONEPIECE_COMBINATIONS:
+            candidates = np.where(onepiece_used, -np.inf, onepiece_scores)
+            best_onepiece = int(np.argmax(candidates))
+            best_onepiece_score = candidates[best_onepiece]
+
+        if not np.isfinite(best_pair_score) and not np.isfinite(best_onepiece_score):
+            break
+
+        if best_onepiece_score > best_pair_score:
+            onepiece_used[best_onepiece] = True
+            selected.append((ONEPIECES[best_onepiece],))
+        else:
+            top_index, bottom_index = best_pair
+            pair_used[top_index, bottom_index] = True
+            top_uses[top_index] += 1
+            bottom_uses[bottom_index] += 1
+            selected.append((TOPS[top_index], BOTTOMS[bottom_index]))
+
+    return selected
+
+
+def format_combinations(combinations):
+    """GPT 1단계 응답과 같은 형식의 문자열로 변환"""
+    lines = []
+    for i, combo in enumerate(combinations, 1):
+        if len(combo) == 1:
+            lines.append(f"조합 {i}: ONEPIECE: {combo[0]}")
+        else:
+            lines.append(f"조합 {i}: TOP: {combo[0]}, BOTTOM: {combo[1]}")
+    return "\n".join(lines)
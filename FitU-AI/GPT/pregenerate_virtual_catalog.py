@@ -0,0 +1,313 @@
+"""가상 옷 카탈로그 사전 생성 (오프라인 배치)
+
+옷 종류 17개 x 패턴 11개 x 톤 3개 조합을 미리 생성해 저장하고 가상 옷 라이브러리에 등록합니다.
+온라인 추천에서는 상황별 항목이 없을 때 이 카탈로그 항목을 사용하므로 표준 항목은 이미지 모델을 호출하지 않습니다.
+
+완료된 항목은 매니페스트(JSON Lines)에 한 줄씩 기록되고, 다시 실행하면 완료된 항목을 건너뜁니다.
+
+    # 오프라인 테스트 (스텁 생성기 + 로컬 저장, 운영 라이브러리 경로에는 실행 불가)
+    python pregenerate_virtual_catalog.py --dry-run --output-dir /tmp/catalog \\
+        --manifest /tmp/catalog/manifest.jsonl --library-path /tmp/virtual_library.db
+
+    # 실제 생성 (DALL-E + S3)
+    python pregenerate_virtual_catalog.py --rate-per-minute 5 \\
+        --manifest catalog_manifest.jsonl --library-path $VIRTUAL_LIBRARY_PATH
+"""
+import os
+import io
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+from pathlib import Path
+
+from virtual_prompts import PATTERN_PROMPTS, TONE_PROMPTS, build_virtual_clothing_prompt
+from virtual_library import VirtualGarmentLibrary, make_library_key
+
+# aws_api.CATEGORY_KOREAN_MAP의 옷 종류
+CATALOG_CATEGORIES = [
+    "BLOUSE", "CARDIGAN", "COAT", "JACKET", "JUMPER", "SHIRT", "SWEATER", "TSHIRT", "VEST",
+    "ACTIVEWEAR", "JEANS", "PANTS", "SHORTS", "SKIRT", "SLACKS", "DRESS", "JUMPSUIT"
+]
+CATALOG_PATTERNS = list(PATTERN_PROMPTS)
+CATALOG_TONES = list(TONE_PROMPTS)
+
+CATALOG_FOLDER = "virtual_catalog/"
+BUCKET_NAME = "amzn-s3-fitu-bucket"
+
+
+class RateLimited(Exception):
+    """이미지 생성 API 요청 한도 초과 (retry_after: 서버가 알려준 대기 시간, 없으면 None)"""
+
+    def __init__(self, retry_after=None):
+        super().__init__(f"rate limited (retry_after={retry_after})")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """분당 요청 수 제한 + 한도 초과 응답 시 모든 워커 일시 정지"""
+
+    def __init__(self, rate_per_minute: float):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot, self._paused_until)
+            self._next_slot = start + self.interval
+        await asyncio.sleep(start - now)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class DalleGenerator:
+    """DALL-E 3 이미지 생성 -> PNG 바이트"""
+
+    content_type = "image/png"
+
+    def __init__(self):
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    async def generate(self, prompt: str) -> bytes:
+        import openai
+        try:
+            response = await self.client.images.generate(
+                model="dall-e-3",
+                prompt=prompt,
+                size="1024x1024",
+                quality="standard",
+                response_format="b64_json",
+                n=1
+            )
+        except openai.RateLimitError as e:
+            retry_after = e.response.headers.get("retry-after") if e.response is not None else None
+            raise RateLimited(float(retry_after) if retry_after else None)
+        return base64.b64decode(response.data[0].b64_json)
+
+
+class StubGenerator:
+    """오프라인 테스트용 생성기 (프롬프트 해시로 색을 정한 단색 PNG, 지연/한도 초과 흉내)"""
+
+    content_type = "image/png"
+
+    def __init__(self, latency: float = 0.05, rate_limit_every: int = 0, size: int = 256):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.size = size
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> bytes:
+        from PIL import Image
+
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.rate_limit_every and self.calls % self.rate_limit_every == 0:
+            raise RateLimited(retry_after=self.latency)
+
+        seed = random.Random(prompt)
+        color = tuple(seed.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new("RGB", (self.size, self.size), color).save(buffer, "PNG")
+        return buffer.getvalue()
+
+
+class LocalStorage:
+    """로컬 디렉터리 저장 (public_base_url이 없으면 file:// URL)"""
+
+    def __init__(self, output_dir: str, public_base_url: str = None):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+
+    async def save(self, content: bytes, key: str, content_type: str):
+        path = self.output_dir / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(path.write_bytes, content)
+        if self.public_base_url:
+            return f"{self.public_base_url}/{key}", None
+        return path.resolve().as_uri(), None
+
+
+class S3Storage:
+    def __init__(self, bucket: str = BUCKET_NAME):
+        import boto3
+        from http_client import get_http_session
+        from s3_store import S3ImageStore
+        self.store = S3ImageStore(
+            boto3.client("s3"), bucket, f"https://{bucket}.s3.ap-northeast-2.amazonaws.com", get_http_session
+        )
+
+    async def save(self, content: bytes, key: str, content_type: str):
+        return await self.store.save_bytes(content, key, content_type)
+
+
+def catalog_entries(variants: int):
+    for clothing_type in CATALOG_CATEGORIES:
+        for pattern in CATALOG_PATTERNS:
+            for tone in CATALOG_TONES:
+                for variant in range(variants):
+                    yield clothing_type, pattern, tone, variant
+
+
+def entry_id(clothing_type, pattern, tone, variant):
+    return f"{clothing_type}_{pattern}_{tone}_{variant}"
+
+
+def load_manifest(path: str):
+    """매니페스트에서 완료된 항목 읽기 (마지막 줄이 중간에 끊겨 있어도 무시하고 계속)"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[record["id"]] = record
+    return done
+
+
+async def run_catalog(generator, storage, manifest_path: str, library: VirtualGarmentLibrary = None,
+                      variants: int = 1, concurrency: int = 4, rate_per_minute: float = 0,
+                      max_retries: int = 5, limit: int = None):
+    """카탈로그 생성 실행 -> 요약 통계"""
+    done = load_manifest(manifest_path)
+    pending = [entry for entry in catalog_entries(variants) if entry_id(*entry) not in done]
+    if limit is not None:
+        pending = pending[:limit]
+    print(f"[INFO] 카탈로그 생성 시작 - 완료 {len(done)}개, 남은 항목 {len(pending)}개")
+
+    # 이전 실행에서 생성했지만 라이브러리에 없는 항목 등록 (라이브러리 파일을 새로 만든 경우)
+    if library is not None:
+        for record in done.values():
+            library.add(make_library_key(record["type"], record["pattern"], record["tone"]), record["url"])
+
+    queue = asyncio.Queue()
+    for entry in pending:
+        queue.put_nowait(entry)
+
+    limiter = RateLimiter(rate_per_minute)
+    stats = {"generated": 0, "failed": 0, "rate_limited": 0, "skipped": len(done)}
+    manifest = open(manifest_path, "a", encoding="utf-8")
+
+    async def process(clothing_type, pattern, tone, variant):
+        prompt = build_virtual_clothing_prompt(clothing_type, pattern, tone)
+        for attempt in range(max_retries + 1):
+            await limiter.acquire()
+            try:
+                content = await generator.generate(prompt)
+                break
+            except RateLimited as e:
+                stats["rate_limited"] += 1
+                # 서버가 알려준 대기 시간, 없으면 지수 백오프
+                limiter.pause(e.retry_after if e.retry_after is not None else min(60.0, 2.0 ** attempt))
+        else:
+            raise RuntimeError("요청 한도 초과 재시도 횟수 초과")
+
+        key = f"{CATALOG_FOLDER}{entry_id(clothing_type, pattern, tone, variant)}.png"
+        url, error = await storage.save(content, key, generator.content_type)
+        if error:
+            raise RuntimeError(error)
+        return url, prompt
+
+    async def worker():
+        while True:
+            try:
+                entry = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            clothing_type, pattern, tone, variant = entry
+            try:
+                url, prompt = await process(*entry)
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"[ERROR] 카탈로그 항목 생성 실패 - {entry_id(*entry)}: {e}")
+                continue
+
+            record = {
+                "id": entry_id(*entry), "type": clothing_type, "pattern": pattern, "tone": tone,
+                "variant": variant, "url": url, "prompt": prompt, "created_at": time.time()
+            }
+            # 한 줄씩 바로 기록해 중단되어도 완료 항목은 다시 만들지 않음
+            manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+            manifest.flush()
+            if library is not None:
+                library.add(make_library_key(clothing_type, pattern, tone), url)
+            stats["generated"] += 1
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    finally:
+        manifest.close()
+    stats["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    print(f"[INFO] 카탈로그 생성 완료 - {stats}")
+    return stats
+
+
+def is_production_library(path: str):
+    """서비스가 사용하는 라이브러리 파일(VIRTUAL_LIBRARY_PATH)인지 확인"""
+    production_path = os.getenv("VIRTUAL_LIBRARY_PATH")
+    if not production_path or path == ":memory:":
+        return False
+    return os.path.realpath(path) == os.path.realpath(production_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가상 옷 카탈로그 사전 생성")
+    parser.add_argument("--dry-run", action="store_true", help="스텁 생성기 + local 저장으로 실행 (DALL-E/S3 호출 없음)")
+    parser.add_argument("--storage", choices=["s3", "local"], default="s3")
+    parser.add_argument("--output-dir", default="virtual_catalog", help="local 저장 디렉터리")
+    parser.add_argument("--public-base-url", help="local 저장 파일을 서빙하는 URL (없으면 file:// URL)")
+    parser.add_argument("--manifest", default="virtual_catalog_manifest.jsonl")
+    parser.add_argument("--library-path", required=True, help="가상 옷 라이브러리 SQLite 경로")
+    parser.add_argument("--variants", type=int, default=1, help="조합별 변형 수")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate-per-minute", type=float, default=5, help="이미지 생성 분당 요청 수 (0이면 제한 없음)")
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--limit", type=int, help="이번 실행에서 생성할 최대 항목 수")
+    parser.add_argument("--stub-latency", type=float, default=0.05)
+    parser.add_argument("--stub-rate-limit-every", type=int, default=0, help="스텁이 N번째 요청마다 한도 초과 응답")
+    args = parser.parse_args()
+    if args.dry_run:
+        args.storage = "local"
+
+    # 스텁 이미지나 file:// URL이 운영 라이브러리에 등록되지 않도록 차단
+    if args.storage == "local" and is_production_library(args.library_path):
+        parser.error(
+            "--library-path가 운영 라이브러리(VIRTUAL_LIBRARY_PATH)입니다. "
+            "--dry-run 또는 --storage local은 다른 경로에서만 실행할 수 있습니다."
+        )
+
+    if args.dry_run:
+        generator = StubGenerator(latency=args.stub_latency, rate_limit_every=args.stub_rate_limit_every)
+    else:
+        generator = DalleGenerator()
+    storage = S3Storage() if args.storage == "s3" else LocalStorage(args.output_dir, args.public_base_url)
+    library = VirtualGarmentLibrary(args.library_path, max_variants=max(args.variants, 1))
+
+    async def run():
+        try:
+            await run_catalog(
+                generator, storage, args.manifest, library, variants=args.variants,
+                concurrency=args.concurrency, rate_per_minute=args.rate_per_minute,
+                max_retries=args.max_retries, limit=args.limit
+            )
+        finally:
+            if args.storage == "s3":
+                from http_client import close_http_session
+                await close_http_session()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import re
+import json
+
+from outfit_rules import TOPS, BOTTOMS, ONEPIECES
+
+PATTERNS = ['PLAIN', 'STRIPE', 'CHECK', 'DOT', 'ANIMAL', 'ARTIFACT', 'ETC', 'NATURE', 'GEOMETRIC', 'PLANT', 'SYMBOL']
+TONES = ['LIGHT', 'DARK', 'NOT_CONSIDERED']
+MAX_OUTFITS = 3
+
+# 옷 1벌 (옷장 옷이면 clothing_id, 옷장에 없는 옷이면 clothing_id=null + 패턴/톤), 해당 없으면 null
+ITEM_SCHEMA = {
+    "anyOf": [
+        {
+            "type": "object",
+            "properties": {
+                "clothing_id": {"type": ["string", "null"]},
+                "category": {"type": "string", "enum": TOPS + BOTTOMS + ONEPIECES},
+                "pattern": {"type": ["string", "null"], "enum": PATTERNS + [None]},
+                "tone": {"type": ["string", "null"], "enum": TONES + [None]}
+            },
+            "required": ["clothing_id", "category", "pattern", "tone"],
+            "additionalProperties": False
+        },
+        {"type": "null"}
+    ]
+}
+
+# OpenAI structured output(strict json_schema)용 응답 스키마
+RECOMMENDATION_SCHEMA = {
+    "title": "outfit_recommendation",
+    "description": "상황에 맞는 코디 추천 결과",
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "outfits": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "combination_type": {"type": "string", "enum": ["TOP_BOTTOM", "ONEPIECE"]},
+                    "top": ITEM_SCHEMA,
+                    "bottom": ITEM_SCHEMA,
+                    "onepiece": ITEM_SCHEMA,
+                    "reason": {"type": "string"}
+                },
+                "required": ["combination_type", "top", "bottom", "onepiece", "reason"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["summary", "outfits"],
+    "additionalProperties": False
+}
+
+
+def load_json_result(raw):
+    """dict 또는 JSON 문자열(코드 블록 포함)을 dict로 변환 (실패 시 None)"""
+    if isinstance(raw, dict):
+        return raw
+    if not isinstance(raw, str):
+        return None
+
+    match = re.search(r"\{.*\}", raw, re.DOTALL)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+
+
+def _normalize_choice(value, choices, default):
+    value = str(value or "").strip().upper()
+    return value if value in choices else default
+
+
+def _repair_item(item, allowed_categories, closet_by_id, closet_by_category, used_ids, is_closet_only):
+    """옷 1벌 검증/보정 -> (선택 문자열, 카테고리) 또는 None"""
+    if not isinstance(item, dict):
+        return None
+
+    category = str(item.get("category") or "").strip().upper()
+    clothing_id = str(item.get("clothing_id") or "").strip() or None
+
+    # 옷장 옷: ID가 옷장에 있고 같은 종류이면 그대로 사용 (카테고리는 옷장 기준)
+    if clothing_id and clothing_id in closet_by_id:
+        closet_category = closet_by_id[clothing_id]['attributes']['category']
+        if closet_category in allowed_categories:
+            used_ids.add(clothing_id)
+            return f"{clothing_id} ({closet_category})", closet_category
+
+    if category not in allowed_categories:
+        return None
+
+    if is_closet_only:
+        # 옷장에 없는 ID -> 같은 카테고리의 옷장 옷으로 대체 (이미 쓴 옷은 뒤로)
+        candidates = sorted(closet_by_category.get(category, []), key=lambda c: c['clothing_id'] in used_ids)
+        if not candidates:
+            return None
+        replacement = candidates[0]['clothing_id']
+        used_ids.add(replacement)
+        return f"{replacement} ({category})", category
+
+    # 옷장에 없는 옷 -> 가상 옷 추천 형식
+    pattern = _normalize_choice(item.get("pattern"), PATTERNS, "PLAIN")
+    tone = _normalize_choice(item.get("tone"), TONES, "LIGHT")
+    return f"추천: {category} ({pattern}, {tone})", category
+
+
+def repair_structured_result(raw, closet, is_closet_only, gender):
+    """구조화 응답을 검증/보정해 parse_gpt_result와 같은 형태로 변환 (closet: ClosetIndex)"""
+    result = load_json_result(raw)
+    if result is None:
+        return {"summary": "", "outfits": []}
+
+    closet_by_id = closet.by_id
+    closet_by_category = closet.by_category
+
+    used_ids = set()
+    outfits = []
+    for outfit in result.get("outfits") or []:
+        if len(outfits) >= MAX_OUTFITS:
+            break
+        if not isinstance(outfit, dict):
+            continue
+
+        onepiece = outfit.get("onepiece")
+        has_top_bottom = isinstance(outfit.get("top"), dict) or isinstance(outfit.get("bottom"), dict)
+        is_onepiece = outfit.get("combination_type") == "ONEPIECE" or (isinstance(onepiece, dict) and not has_top_bottom)
+
+        if is_onepiece:
+            # 남성에게는 원피스 조합을 추천하지 않음
+            if gender != "FEMALE":
+                continue
+            repaired = _repair_item(onepiece, ONEPIECES, closet_by_id, closet_by_category, used_ids, is_closet_only)
+            if repaired is None:
+                continue
+            selected, category = repaired
+            combination = f"ONEPIECE: {category}"
+        else:
+            top = _repair_item(outfit.get("top"), TOPS, closet_by_id, closet_by_category, used_ids, is_closet_only)
+            bottom = _repair_item(outfit.get("bottom"), BOTTOMS, closet_by_id, closet_by_category, used_ids, is_closet_only)
+            if top is None or bottom is None:
+                continue
+            selected = f"{top[0]} + {bottom[0]}"
+            combination = f"TOP: {top[1]}, BOTTOM: {bottom[1]}"
+
+        outfits.append({
+            "combination": combination,
+            "selected": selected,
+            "reason": str(outfit.get("reason") or "").strip()
+        })
+
+    return {"summary": str(result.get("summary") or "").strip(), "outfits": outfits}
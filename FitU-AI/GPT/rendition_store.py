@@ -0,0 +1,167 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+
+from ttl_cache import TTLCache
+from image_prep import encode_fashn_jpeg
+from observability import log
+
+RENDITION_DIR = os.getenv("RENDITION_DIR", os.path.join(tempfile.gettempdir(), "fitu_renditions"))
+RENDITION_MEMORY_MAXSIZE = int(os.getenv("RENDITION_MEMORY_MAXSIZE", "500"))
+# 렌디션 디렉터리 최대 크기 (넘으면 가장 오래 사용되지 않은 파일부터 삭제, 0이면 제한 없음)
+RENDITION_DISK_MAX_BYTES = int(os.getenv("RENDITION_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+# 정리할 때 최대 크기의 이 비율까지 줄임 (쓰기마다 정리하지 않도록 여유를 둠)
+RENDITION_DISK_TARGET_RATIO = 0.9
+
+
+class RenditionStore:
+    """FASHN 입력용 640px 의류 JPEG 저장소 (원본 이미지 URL 기준, 메모리 LRU + 로컬 디스크)
+
+    옷 이미지가 바뀌면 URL도 바뀌므로 URL 해시를 키로 쓰면 별도 무효화가 필요 없다.
+    디스크는 파일 수정 시각(디스크에서 읽을 때 갱신) 기준 LRU로 disk_max_bytes 이하를 유지한다.
+    """
+
+    def __init__(self, directory: str = RENDITION_DIR, memory_maxsize: int = RENDITION_MEMORY_MAXSIZE,
+                 disk_max_bytes: int = RENDITION_DISK_MAX_BYTES):
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._memory = TTLCache(maxsize=memory_maxsize, ttl=float("inf"))
+        self._creating = {}  # URL -> 생성 중인 asyncio.Task
+        # 다른 워커도 같은 디렉터리에 쓰므로 근사치 (정리할 때 실제 크기로 다시 맞춤)
+        self._disk_bytes = sum(size for _, size, _ in self._scan())
+        self._sweeping = None
+        self.disk_hits = 0
+        self.created = 0
+        self.failed = 0
+        self.disk_evictions = 0
+
+    def _scan(self):
+        """디렉터리의 렌디션 파일 목록 -> [(경로, 크기, 수정 시각)]"""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".jpg"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _sweep(self):
+        """가장 오래 사용되지 않은 파일부터 삭제해 목표 크기 이하로 줄임 -> (남은 바이트, 삭제 수)"""
+        files = sorted(self._scan(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        target = self.disk_max_bytes * RENDITION_DISK_TARGET_RATIO
+        removed = 0
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return total, removed
+
+    def _sweep_if_needed(self):
+        """최대 크기를 넘으면 백그라운드에서 정리 (한 번에 하나만 실행, 응답은 기다리지 않음)"""
+        if not self.disk_max_bytes or self._disk_bytes <= self.disk_max_bytes or self._sweeping is not None:
+            return
+        self._sweeping = asyncio.ensure_future(self._run_sweep())
+
+    async def _run_sweep(self):
+        try:
+            self._disk_bytes, removed = await asyncio.to_thread(self._sweep)
+            self.disk_evictions += removed
+            if removed:
+                log(f"렌디션 디스크 정리 - {removed}개 삭제, 남은 크기 {self._disk_bytes / 1024 / 1024:.1f}MB")
+        except Exception as e:
+            log(f"렌디션 디스크 정리 실패: {e}", "ERROR")
+        finally:
+            self._sweeping = None
+
+    def _path(self, image_url: str):
+        return os.path.join(self.directory, hashlib.sha256(image_url.encode("utf-8")).hexdigest() + ".jpg")
+
+    def _read(self, path):
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        # 수정 시각을 마지막 사용 시각으로 사용 (디스크 LRU 정리 기준)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return content
+
+    def _write(self, path, content: bytes):
+        # 다른 워커가 읽는 중에 덮어쓰지 않도록 임시 파일에 쓴 뒤 교체
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    async def get(self, image_url: str):
+        """저장된 렌디션 반환 (없으면 None)"""
+        rendition = self._memory.get(image_url)
+        if rendition is not None:
+            return rendition
+
+        rendition = await asyncio.to_thread(self._read, self._path(image_url))
+        if rendition is not None:
+            self.disk_hits += 1
+            self._memory.set(image_url, rendition)
+        return rendition
+
+    async def get_or_create(self, image_url: str, fetch):
+        """렌디션 반환, 없으면 fetch(URL)로 원본을 받아 생성 후 저장 (같은 URL 동시 생성은 1회만 실행)"""
+        rendition = await self.get(image_url)
+        if rendition is not None:
+            return rendition
+
+        task = self._creating.get(image_url)
+        if task is None:
+            task = asyncio.ensure_future(self._create(image_url, fetch))
+            self._creating[image_url] = task
+            task.add_done_callback(lambda _: self._creating.pop(image_url, None))
+        return await task
+
+    async def _create(self, image_url: str, fetch):
+        content = await fetch(image_url)
+        if content is None:
+            return None
+
+        # 디코딩에 실패한 원본은 저장하지 않음 (저장하면 같은 URL이 계속 깨진 렌디션으로 응답)
+        try:
+            rendition = await asyncio.to_thread(encode_fashn_jpeg, content)
+        except Exception as e:
+            self.failed += 1
+            log(f"의류 렌디션 변환 실패 - {image_url}: {e}", "ERROR")
+            return None
+        await asyncio.to_thread(self._write, self._path(image_url), rendition)
+        self._disk_bytes += len(rendition)
+        self._sweep_if_needed()
+        self._memory.set(image_url, rendition)
+        self.created += 1
+        return rendition
+
+    def stats(self):
+        memory = self._memory.stats()
+        return {
+            "memory_size": memory["size"],
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "disk_bytes": self._disk_bytes,
+            "disk_max_bytes": self.disk_max_bytes,
+            "disk_evictions": self.disk_evictions,
+            "created": self.created,
+            "failed": self.failed,
+            "directory": self.directory
+        }
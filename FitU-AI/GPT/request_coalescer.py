@@ -0,0 +1,50 @@
+import asyncio
+
+from ttl_cache import TTLCache
+
+
+class RequestCoalescer:
+    """같은 키의 요청을 한 번만 실행 (single-flight) + 직후 반복 요청은 짧은 TTL 결과 캐시로 응답
+
+    실행 중인 키로 요청이 오면 새로 실행하지 않고 진행 중인 작업의 결과를 함께 기다린다.
+    먼저 온 요청이 취소(클라이언트 연결 종료 등)되어도 공유 작업은 계속 실행된다.
+    """
+
+    def __init__(self, result_ttl: float = 30, maxsize: int = 1000):
+        self.result_ttl = result_ttl
+        self._results = TTLCache(maxsize=maxsize, ttl=result_ttl)
+        self._in_flight = {}  # 키 -> 실행 중인 asyncio.Task
+        self.computed = 0
+        self.coalesced = 0
+
+    async def run(self, key, compute, cacheable=lambda result: True):
+        """캐시된 결과 -> 실행 중인 작업 -> 새로 실행 순으로 결과 반환 (cacheable이 False인 결과는 캐시하지 않음)"""
+        if self.result_ttl > 0:
+            cached = self._results.get(key)
+            if cached is not None:
+                return cached
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.computed += 1
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+
+            def on_done(task):
+                self._in_flight.pop(key, None)
+                if self.result_ttl > 0 and not task.cancelled() and task.exception() is None and cacheable(task.result()):
+                    self._results.set(key, task.result())
+
+            task.add_done_callback(on_done)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            "computed": self.computed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "result_ttl": self.result_ttl,
+            "results": self._results.stats()
+        }
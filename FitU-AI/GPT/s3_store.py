@@ -0,0 +1,199 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from observability import log
+
+# S3 업로드 스레드 수 (boto3 클라이언트는 동기식이므로 제한된 스레드 풀에서 실행)
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", "8"))
+# 이 크기를 넘는 이미지는 멀티파트 업로드 (S3 최소 파트 크기는 5MB)
+S3_MULTIPART_PART_SIZE = max(int(os.getenv("S3_MULTIPART_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+# 객체 하나당 동시에 업로드하는 파트 수
+S3_MAX_PARTS_IN_FLIGHT = int(os.getenv("S3_MAX_PARTS_IN_FLIGHT", "2"))
+# true면 다운로드가 끝나는 즉시 URL을 반환하고 업로드는 백그라운드에서 완료
+S3_DEFERRED_UPLOAD = os.getenv("S3_DEFERRED_UPLOAD", "false").lower() == "true"
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+
+class S3ImageStore:
+    """외부 이미지 URL을 S3로 옮기는 비동기 저장소
+
+    다운로드를 청크 단위로 읽으면서 업로드하고, 큰 이미지는 멀티파트로 파트별 업로드한다.
+    boto3 호출은 제한된 스레드 풀에서 실행해 이벤트 루프를 막지 않는다.
+    """
+
+    def __init__(self, s3_client, bucket: str, public_base_url: str, session_getter,
+                 max_workers: int = S3_UPLOAD_WORKERS, part_size: int = S3_MULTIPART_PART_SIZE,
+                 max_parts_in_flight: int = S3_MAX_PARTS_IN_FLIGHT, deferred_upload: bool = S3_DEFERRED_UPLOAD):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.public_base_url = public_base_url.rstrip("/")
+        self.session_getter = session_getter
+        self.part_size = part_size
+        self.max_parts_in_flight = max_parts_in_flight
+        self.deferred_upload = deferred_upload
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-upload")
+        self._pending = set()  # 백그라운드 업로드 Task
+        self.uploaded = 0
+        self.multipart_uploaded = 0
+        self.failed = 0
+        self.bytes_uploaded = 0
+
+    def url_for(self, key: str):
+        return f"{self.public_base_url}/{key}"
+
+    async def _call(self, method, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: method(**kwargs))
+
+    async def save(self, image_url: str, key: str, content_type: str = "image/jpeg", image_fetcher=None, on_uploaded=None):
+        """image_url의 이미지를 S3 key에 저장 -> (S3 URL, 에러)
+
+        image_fetcher가 있으면 저장한 바이트를 등록해 다음 단계에서 다시 받지 않는다.
+        on_uploaded(S3 URL)는 업로드가 실제로 끝난 뒤 호출된다 (지연 업로드에서도 동일).
+        """
+        if self.deferred_upload:
+            return await self._save_deferred(image_url, key, content_type, image_fetcher, on_uploaded)
+
+        try:
+            async with self.session_getter().get(image_url) as response:
+                if response.status != 200:
+                    return None, "이미지 다운로드 실패"
+                # 다음 단계에 넘길 바이트가 필요할 때만 전체 내용을 보관
+                kept = [] if image_fetcher is not None else None
+                await self._stream_upload(response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE), key, content_type, kept)
+        except Exception as e:
+            self.failed += 1
+            return None, f"S3 저장 중 오류 발생: {str(e)}"
+
+        s3_url = self.url_for(key)
+        if image_fetcher is not None:
+            image_fetcher.seed(s3_url, b"".join(kept))
+        if on_uploaded is not None:
+            on_uploaded(s3_url)
+        return s3_url, None
+
+    async def save_bytes(self, content: bytes, key: str, content_type: str = "image/jpeg"):
+        """이미 가지고 있는 이미지 바이트를 S3 key에 저장 -> (S3 URL, 에러)"""
+        try:
+            await self._stream_upload(_chunks_of(content, DOWNLOAD_CHUNK_SIZE), key, content_type)
+        except Exception as e:
+            self.failed += 1
+            return None, f"S3 저장 중 오류 발생: {str(e)}"
+        return self.url_for(key), None
+
+    async def _save_deferred(self, image_url, key, content_type, image_fetcher, on_uploaded):
+        """다운로드 완료 후 바로 URL 반환, 업로드는 백그라운드에서 진행"""
+        try:
+            async with self.session_getter().get(image_url) as response:
+                if response.status != 200:
+                    return None, "이미지 다운로드 실패"
+                content = await response.read()
+        except Exception as e:
+            self.failed += 1
+            return None, f"S3 저장 중 오류 발생: {str(e)}"
+
+        s3_url = self.url_for(key)
+        if image_fetcher is not None:
+            image_fetcher.seed(s3_url, content)
+
+        async def upload():
+            try:
+                await self._stream_upload(_chunks_of(content, DOWNLOAD_CHUNK_SIZE), key, content_type)
+            except Exception as e:
+                self.failed += 1
+                log(f"S3 백그라운드 업로드 실패 - {key}: {e}", "ERROR")
+                return
+            if on_uploaded is not None:
+                on_uploaded(s3_url)
+
+        task = asyncio.create_task(upload())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return s3_url, None
+
+    async def _stream_upload(self, chunks, key, content_type, kept=None):
+        """청크 스트림을 S3에 업로드 (part_size 이하면 put_object, 넘으면 멀티파트)"""
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+        in_flight = []
+
+        try:
+            async for chunk in chunks:
+                if kept is not None:
+                    kept.append(chunk)
+                buffer.extend(chunk)
+                while len(buffer) >= self.part_size:
+                    if upload_id is None:
+                        created = await self._call(
+                            self.s3_client.create_multipart_upload,
+                            Bucket=self.bucket, Key=key, ContentType=content_type
+                        )
+                        upload_id = created["UploadId"]
+                    body = bytes(buffer[:self.part_size])
+                    del buffer[:self.part_size]
+                    in_flight.append(asyncio.ensure_future(self._upload_part(key, upload_id, len(parts) + len(in_flight) + 1, body)))
+                    # 메모리 사용량을 파트 몇 개로 제한
+                    if len(in_flight) >= self.max_parts_in_flight:
+                        parts.append(await in_flight.pop(0))
+
+            if upload_id is None:
+                await self._call(
+                    self.s3_client.put_object,
+                    Bucket=self.bucket, Key=key, Body=bytes(buffer), ContentType=content_type
+                )
+                self.bytes_uploaded += len(buffer)
+                self.uploaded += 1
+                return
+
+            if buffer or not (parts or in_flight):
+                in_flight.append(asyncio.ensure_future(self._upload_part(key, upload_id, len(parts) + len(in_flight) + 1, bytes(buffer))))
+            parts.extend(await asyncio.gather(*in_flight))
+            in_flight = []
+            await self._call(
+                self.s3_client.complete_multipart_upload,
+                Bucket=self.bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+            self.uploaded += 1
+            self.multipart_uploaded += 1
+
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            if upload_id is not None:
+                try:
+                    await self._call(self.s3_client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id)
+                except Exception as e:
+                    log(f"멀티파트 업로드 취소 실패 - {key}: {e}", "ERROR")
+            raise
+
+    async def _upload_part(self, key, upload_id, part_number, body: bytes):
+        response = await self._call(
+            self.s3_client.upload_part,
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=body
+        )
+        self.bytes_uploaded += len(body)
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    async def drain(self):
+        """진행 중인 백그라운드 업로드가 끝날 때까지 대기 (종료 시 호출)"""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def stats(self):
+        return {
+            "uploaded": self.uploaded,
+            "multipart_uploaded": self.multipart_uploaded,
+            "failed": self.failed,
+            "bytes_uploaded": self.bytes_uploaded,
+            "pending": len(self._pending),
+            "deferred_upload": self.deferred_upload
+        }
+
+
+async def _chunks_of(content: bytes, size: int):
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
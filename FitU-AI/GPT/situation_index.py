@@ -0,0 +1,259 @@
+import os
+import re
+import math
+from collections import OrderedDict, defaultdict
+
+# 이 유사도 이상이면 같은 상황으로 간주
+SITUATION_SIMILARITY_THRESHOLD = float(os.getenv("SITUATION_SIMILARITY_THRESHOLD", "0.5"))
+SITUATION_INDEX_MAXSIZE = int(os.getenv("SITUATION_INDEX_MAXSIZE", "5000"))
+
+# 영문 상황 입력을 한글 대표 표현으로 맞추기 위한 단어 매핑
+SITUATION_ALIASES = {
+    "wedding": "결혼식",
+    "guest": "하객",
+    "friend": "친구",
+    "friends": "친구",
+    "interview": "면접",
+    "job": "취업",
+    "date": "데이트",
+    "meeting": "회의",
+    "office": "출근",
+    "work": "출근",
+    "commute": "출근",
+    "party": "파티",
+    "birthday": "생일",
+    "travel": "여행",
+    "trip": "여행",
+    "exercise": "운동",
+    "workout": "운동",
+    "gym": "운동",
+    "hiking": "등산",
+    "school": "학교",
+    "class": "수업",
+    "funeral": "장례식",
+    "concert": "콘서트",
+    "picnic": "소풍",
+    "camping": "캠핑",
+    "graduation": "졸업식",
+    "family": "가족",
+    "dinner": "저녁 식사",
+    "lunch": "점심 식사",
+    "shopping": "쇼핑",
+    "presentation": "발표",
+}
+
+NGRAM_SIZES = (2, 3)
+
+# 옷차림이 달라지는 상황 요소별 핵심 단어 -> 같은 의미 묶음
+# 두 상황이 같은 요소에 서로 다른 묶음만 가지면(예: "친구 여행"과 "가족 여행") 유사도가 높아도 합치지 않음
+SITUATION_CONTEXT_SLOTS = {
+    "companion": {
+        "여자친구": "partner", "남자친구": "partner", "연인": "partner",
+        "친구": "friend", "지인": "friend", "동창": "friend",
+        "가족": "family", "부모님": "family",
+        "동료": "colleague",
+    },
+    "event": {
+        "결혼식": "wedding", "하객": "wedding",
+        "면접": "interview", "취업": "interview",
+        "데이트": "date", "소개팅": "date",
+        "출근": "work", "회의": "work", "발표": "work",
+        "파티": "party", "생일": "party",
+        "여행": "travel",
+        "운동": "exercise", "헬스": "exercise",
+        "등산": "hiking",
+        "학교": "school", "수업": "school", "대학": "school",
+        "장례식": "funeral", "조문": "funeral",
+        "콘서트": "concert", "공연": "concert",
+        "소풍": "picnic",
+        "캠핑": "camping",
+        "졸업식": "graduation",
+        "식사": "meal", "외식": "meal",
+        "쇼핑": "shopping",
+    },
+}
+
+
+def normalize_situation(situation: str) -> str:
+    """소문자화, 특수문자 제거, 영문 단어를 한글 대표 표현으로 치환"""
+    words = re.sub(r"[^\w\s]", " ", str(situation or "").lower()).split()
+    return " ".join(SITUATION_ALIASES.get(word, word) for word in words)
+
+
+def char_ngrams(text: str):
+    """단어 경계를 포함한 문자 n-gram 빈도"""
+    counts = defaultdict(int)
+    for word in text.split():
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                counts[padded[i:i + n]] += 1
+    return dict(counts)
+
+
+def situation_context(normalized: str):
+    """정규화된 상황의 요소별 의미 묶음 (예: "친구 여행" -> {"companion": {"friend"}, "event": {"travel"}})"""
+    context = {}
+    for slot, keywords in SITUATION_CONTEXT_SLOTS.items():
+        text = normalized
+        # 긴 단어부터 찾고 지워서 "여자친구"가 "친구"로도 잡히지 않게 함 (조사가 붙은 "친구들과"도 포함)
+        for keyword in sorted(keywords, key=len, reverse=True):
+            if keyword in text:
+                context.setdefault(slot, set()).add(keywords[keyword])
+                text = text.replace(keyword, " ")
+    return context
+
+
+def contexts_conflict(a: dict, b: dict):
+    """같은 요소를 둘 다 가지고 있는데 겹치는 의미 묶음이 없으면 다른 상황"""
+    return any(slot in b and not (classes & b[slot]) for slot, classes in a.items())
+
+
+class SituationIndex:
+    """이전에 본 상황 문자열에 대한 문자 n-gram TF-IDF 유사도 인덱스 (CPU 전용)
+
+    대표 상황마다 가중치 벡터와 노름을 미리 계산해 두고, 조회 시에는 질의 n-gram의 포스팅만 따라가며
+    내적을 누적한다. 포스팅이 짧은(드문) n-gram부터 처리하고, 남은 흔한 n-gram만으로는 min_score에
+    도달할 수 없게 되면 새 후보를 더 받지 않는다. IDF는 항목 수가 일정 비율 바뀔 때마다 한 번에 다시 계산한다.
+    """
+
+    # 마지막 IDF 재계산 이후 항목 수가 이 비율 이상 늘었거나, 최대 크기만큼 새 항목이 들어오면 재계산
+    IDF_REFRESH_RATIO = 0.1
+
+    def __init__(self, threshold: float = SITUATION_SIMILARITY_THRESHOLD, maxsize: int = SITUATION_INDEX_MAXSIZE):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # 정규화된 대표 상황 -> n-gram 빈도
+        self._postings = defaultdict(dict)  # n-gram -> {대표 상황: 빈도}
+        self._norms = {}  # 대표 상황 -> 가중치 벡터 노름
+        self._contexts = {}  # 대표 상황 -> 요소별 의미 묶음
+        self._idf_table = {}  # n-gram -> 마지막 재계산 시점의 IDF
+        self._adds_since_refresh = 0
+        self._size_at_refresh = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _idf(self, gram, store: bool = True):
+        idf = self._idf_table.get(gram)
+        if idf is None:
+            # 재계산 이후 처음 보는 n-gram은 지금 값으로 고정 (다음 재계산 때 갱신)
+            idf = math.log((1 + len(self._entries)) / (1 + len(self._postings.get(gram, ())))) + 1
+            if store:
+                self._idf_table[gram] = idf
+        return idf
+
+    def _weights(self, grams, store: bool = True):
+        return {gram: count * self._idf(gram, store) for gram, count in grams.items()}
+
+    def _norm(self, grams):
+        return math.sqrt(sum(w * w for w in self._weights(grams).values()))
+
+    def _refresh_idf(self):
+        """현재 문서 빈도로 IDF와 모든 대표 상황의 노름 재계산 (포스팅은 빈도만 가지므로 그대로 사용)"""
+        total = len(self._entries)
+        self._idf_table = {
+            gram: math.log((1 + total) / (1 + len(entries))) + 1 for gram, entries in self._postings.items()
+        }
+        for normalized, grams in self._entries.items():
+            self._norms[normalized] = self._norm(grams)
+        self._adds_since_refresh = 0
+        self._size_at_refresh = total
+
+    def lookup(self, situation: str, min_score: float = 0.0):
+        """가장 유사한 대표 상황과 코사인 유사도 반환 (min_score 이상인 후보가 없으면 (None, 0.0)이 될 수 있음)"""
+        normalized = normalize_situation(situation)
+        if normalized in self._entries:
+            return normalized, 1.0
+
+        # 조회만으로는 IDF 표를 바꾸지 않음 (인덱스에 없는 n-gram도 노름에는 포함)
+        query = self._weights(char_ngrams(normalized), store=False)
+        query_norm = math.sqrt(sum(w * w for w in query.values()))
+        if not query_norm:
+            return None, 0.0
+
+        # 질의 n-gram의 포스팅만 따라가며 후보별 내적 누적
+        # 남은 n-gram들만 공유하는 후보의 유사도는 (남은 질의 가중치 노름 / 질의 노름) 이하
+        dots = {}
+        remaining = query_norm * query_norm
+        for gram, weight in sorted(query.items(), key=lambda item: len(self._postings.get(item[0], ()))):
+            admit = math.sqrt(max(remaining, 0.0)) >= min_score * query_norm - 1e-12
+            remaining -= weight * weight
+            postings = self._postings.get(gram)
+            if not postings:
+                continue
+            # 후보 가중치 = 빈도 x IDF 이므로 IDF는 질의 쪽에 한 번만 곱함
+            factor = weight * self._idf_table[gram]
+            if admit:
+                for candidate, count in postings.items():
+                    dots[candidate] = dots.get(candidate, 0.0) + factor * count
+            else:
+                for candidate in dots:
+                    count = postings.get(candidate)
+                    if count is not None:
+                        dots[candidate] += factor * count
+        if not dots:
+            return None, 0.0
+
+        # 가장 높은 후보가 핵심 요소와 충돌할 때만 다음 후보를 차례로 확인
+        context = situation_context(normalized)
+        scores = {candidate: dot / (query_norm * self._norms[candidate]) for candidate, dot in dots.items()}
+        best = max(scores, key=scores.get)
+        if not contexts_conflict(context, self._contexts[best]):
+            return best, scores[best]
+        for candidate in sorted(scores, key=scores.get, reverse=True):
+            if not contexts_conflict(context, self._contexts[candidate]):
+                return candidate, scores[candidate]
+        return None, 0.0
+
+    def add(self, situation: str) -> str:
+        normalized = normalize_situation(situation)
+        if normalized in self._entries:
+            self._entries.move_to_end(normalized)
+            return normalized
+
+        grams = char_ngrams(normalized)
+        self._entries[normalized] = grams
+        self._contexts[normalized] = situation_context(normalized)
+        self._norms[normalized] = self._norm(grams)
+        for gram, count in grams.items():
+            self._postings[gram][normalized] = count
+
+        while len(self._entries) > self.maxsize:
+            evicted, evicted_grams = self._entries.popitem(last=False)
+            del self._contexts[evicted]
+            del self._norms[evicted]
+            for gram in evicted_grams:
+                self._postings[gram].pop(evicted, None)
+                if not self._postings[gram]:
+                    del self._postings[gram]
+
+        self._adds_since_refresh += 1
+        if (len(self._entries) >= self._size_at_refresh * (1 + self.IDF_REFRESH_RATIO)
+                or self._adds_since_refresh >= self.maxsize):
+            self._refresh_idf()
+        return normalized
+
+    def canonicalize(self, situation: str) -> str:
+        """유사한 대표 상황이 있으면 그것을, 없으면 새 대표 상황으로 등록 후 반환"""
+        candidate, score = self.lookup(situation, self.threshold)
+        if candidate is not None and score >= self.threshold:
+            self._entries.move_to_end(candidate)
+            self.hits += 1
+            return candidate
+
+        self.misses += 1
+        return self.add(situation)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
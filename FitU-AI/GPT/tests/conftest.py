@@ -0,0 +1,5 @@
+import os
+import sys
+
+# FitU-AI/GPT 모듈을 패키지 없이 바로 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from job_store import InMemoryJobStore, SQLiteJobStore, JOB_QUEUED, JOB_RUNNING, JOB_DONE
+
+STALE_SECONDS = 600
+
+
+def test_sqlite_restart_requeues_running_job(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path)
+    running = store.create({"user_id": "u1"})
+    queued = store.create({"user_id": "u2"})
+    done = store.create({"user_id": "u3"})
+    assert store.claim(running["job_id"], STALE_SECONDS)
+    store.update(done["job_id"], status=JOB_DONE)
+
+    # 방금 갱신된 실행 중 작업은 재시작 전에는 다시 가져갈 수 없음
+    restarted = SQLiteJobStore(path)
+    assert not restarted.claim(running["job_id"], STALE_SECONDS)
+
+    # 같은 PID의 이전 인스턴스(재시작 전 프로세스)가 가진 작업은 바로 되돌림
+    assert restarted.requeue_running(STALE_SECONDS) == [running["job_id"]]
+    assert restarted.get(running["job_id"])["status"] == JOB_QUEUED
+    assert [job["job_id"] for job in restarted.list_unfinished()] == [running["job_id"], queued["job_id"]]
+    assert restarted.claim(running["job_id"], STALE_SECONDS)
+    assert restarted.get(running["job_id"])["status"] == JOB_RUNNING
+    assert restarted.get(done["job_id"])["status"] == JOB_DONE
+
+
+@pytest.mark.parametrize("make_store", [InMemoryJobStore, lambda: SQLiteJobStore(":memory:")])
+def test_requeue_running_leaves_other_jobs(make_store):
+    store = make_store()
+    running = store.create({"user_id": "u1"})
+    queued = store.create({"user_id": "u2"})
+    assert store.claim(running["job_id"], STALE_SECONDS)
+
+    assert store.requeue_running(STALE_SECONDS) == [running["job_id"]]
+    assert store.requeue_running(STALE_SECONDS) == []
+    assert store.get(running["job_id"])["status"] == JOB_QUEUED
+    assert store.get(queued["job_id"])["status"] == JOB_QUEUED
+    assert store.claim(running["job_id"], STALE_SECONDS)
+
+
+def test_sqlite_requeue_skips_jobs_of_live_processes(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    host = socket.gethostname()
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+
+    live = store.create({"user_id": "live"})
+    exited = store.create({"user_id": "exited"})
+    remote = store.create({"user_id": "remote"})
+    stale = store.create({"user_id": "stale"})
+    for job, owner, updated_at in [
+        (live, f"{host}:{os.getppid()}:boot", time.time()),
+        (exited, f"{host}:{dead.pid}:boot", time.time()),
+        (remote, "other-host:1:boot", time.time()),
+        (stale, f"{host}:{os.getppid()}:boot", time.time() - STALE_SECONDS - 1),
+    ]:
+        store._conn.execute(
+            "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE job_id = ?",
+            (JOB_RUNNING, owner, updated_at, job["job_id"])
+        )
+
+    assert sorted(store.requeue_running(STALE_SECONDS)) == sorted([exited["job_id"], stale["job_id"]])
+    assert store.get(live["job_id"])["status"] == JOB_RUNNING
+    assert store.get(remote["job_id"])["status"] == JOB_RUNNING
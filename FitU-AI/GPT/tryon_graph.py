@@ -0,0 +1,47 @@
+import asyncio
+
+
+class TryonStepGraph:
+    """요청 단위 가상 피팅 단계 그래프
+
+    각 단계는 (입력 이미지 URL, 의류 이미지 URL, 카테고리)로 식별되고, 단계 결과 URL이
+    다음 단계의 입력이 된다. 여러 조합에서 같은 단계가 필요하면 한 번만 실행하고 결과를 공유한다.
+    (예: 하의가 같은 두 조합은 하의 적용 단계를 공유하고 상의 단계만 따로 실행)
+    """
+
+    def __init__(self, run_step):
+        self.run_step = run_step  # async (입력 이미지 URL, 의류 이미지 URL, 카테고리) -> (결과 URL, 에러)
+        self._steps = {}  # 단계 키 -> asyncio.Task
+        self.requested = 0
+
+    async def _run(self, model_url, garment_url, category):
+        try:
+            return await self.run_step(model_url, garment_url, category)
+        except Exception as e:
+            return None, f"가상 피팅 처리 중 오류 발생: {e}"
+
+    def step(self, model_url, garment_url, category):
+        """단계 실행 (같은 단계가 이미 실행 중이거나 끝났으면 그 결과를 공유)"""
+        self.requested += 1
+        key = (model_url, garment_url, category)
+        task = self._steps.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(model_url, garment_url, category))
+            self._steps[key] = task
+        return task
+
+    async def run_chain(self, model_url, steps):
+        """[(의류 이미지 URL, 카테고리), ...]를 순서대로 적용 -> (최종 URL, 에러)"""
+        current_url = model_url
+        for garment_url, category in steps:
+            current_url, error = await self.step(current_url, garment_url, category)
+            if error:
+                return None, error
+        return current_url, None
+
+    def stats(self):
+        return {
+            "requested": self.requested,
+            "executed": len(self._steps),
+            "deduplicated": self.requested - len(self._steps)
+        }
@@ -0,0 +1,190 @@
+import json
+import time
+import asyncio
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# 디스크 캐시 항목 수를 실제 행 수로 다시 맞추는 쓰기 간격 (다른 프로세스가 같은 파일을 쓰는 경우 보정)
+DISK_CACHE_SIZE_SYNC_INTERVAL = 1000
+
+
+class TTLCache:
+    """TTL 만료와 LRU 제거를 지원하는 인메모리 캐시"""
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (만료 시각, 값)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def aget(self, key, default=None):
+        """DiskTTLCache와 같은 비동기 인터페이스 (메모리 조회라 바로 실행)"""
+        return self.get(key, default)
+
+    async def aset(self, key, value, ttl: float = None):
+        self.set(key, value, ttl)
+
+    def pop(self, key):
+        """키 무효화 (존재했으면 True)"""
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class DiskTTLCache:
+    """SQLite 파일 기반 TTL/LRU 캐시 (프로세스 재시작 후에도 유지, 워커 간 공유)
+
+    이벤트 루프에서는 aget/aset을 사용한다. 디스크 I/O는 캐시 전용 스레드 하나에서 순서대로 실행된다.
+    """
+
+    def __init__(self, path: str, maxsize: int = 10000, ttl: float = 3600):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)")
+        # 쓰기마다 COUNT(*)를 하지 않도록 항목 수를 직접 관리 (주기적으로 실제 행 수와 동기화)
+        self._size = self._count()
+        self._writes_since_sync = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk-cache")
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    async def aget(self, key, default=None):
+        """get을 캐시 전용 스레드에서 실행"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.get, key, default)
+
+    async def aset(self, key, value, ttl: float = None):
+        """set을 캐시 전용 스레드에서 실행"""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.set, key, value, ttl)
+
+    def get(self, key, default=None):
+        now = time.time()
+        row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = row
+        if expires_at < now:
+            self._size -= self._conn.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+            self.misses += 1
+            return default
+
+        self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value, ttl: float = None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        exists = self._conn.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone() is not None
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), expires_at, now)
+        )
+        if not exists:
+            self._size += 1
+
+        self._writes_since_sync += 1
+        if self._writes_since_sync >= DISK_CACHE_SIZE_SYNC_INTERVAL or self._size > self.maxsize:
+            self._size = self._count()
+            self._writes_since_sync = 0
+
+        overflow = self._size - self.maxsize
+        if overflow > 0:
+            # 가장 오래 사용되지 않은 항목부터 제거
+            evicted = self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            ).rowcount
+            self._size -= evicted
+            self.evictions += evicted
+
+    def pop(self, key):
+        removed = self._conn.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+        self._size -= removed
+        return removed > 0
+
+    def clear(self):
+        self._conn.execute("DELETE FROM cache")
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        row = self._conn.execute("SELECT expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] >= time.time()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "path": self.path
+        }
@@ -0,0 +1,117 @@
+import re
+import json
+import time
+import zlib
+import asyncio
+import sqlite3
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+# 라이브러리 최대 항목 수 (가장 오래 사용되지 않은 항목부터 제거)
+VIRTUAL_LIBRARY_MAXSIZE = 5000
+# 항목별 최대 변형(이미지) 수
+VIRTUAL_LIBRARY_MAX_VARIANTS = 4
+
+
+def normalize_description(description: str):
+    """설명 문구 정규화 (대소문자, 구두점, 공백 차이 무시)"""
+    text = unicodedata.normalize("NFKC", description or "").lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def make_library_key(clothing_type: str, pattern: str, tone: str, description: str = ""):
+    """라이브러리 키 (설명이 비어 있으면 상황과 무관한 카탈로그 항목)"""
+    return "|".join([clothing_type.upper(), pattern.upper(), tone.upper(), normalize_description(description)])
+
+
+class VirtualGarmentLibrary:
+    """사용자 공용 가상 옷 이미지 라이브러리 (SQLite, LRU 크기 제한)
+
+    (옷 종류, 패턴, 톤, 정규화된 설명)마다 여러 변형 이미지 URL을 보관한다.
+    같은 사용자는 항상 같은 변형을 받고, 사용자마다 변형이 고르게 나뉜다.
+    이벤트 루프에서는 alookup/aadd를 사용한다. 디스크 I/O는 라이브러리 전용 스레드 하나에서 순서대로 실행된다.
+    """
+
+    def __init__(self, path: str = ":memory:", maxsize: int = VIRTUAL_LIBRARY_MAXSIZE,
+                 max_variants: int = VIRTUAL_LIBRARY_MAX_VARIANTS):
+        self.path = path
+        self.maxsize = maxsize
+        self.max_variants = max_variants
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS garments (
+                key TEXT PRIMARY KEY,
+                variants TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_garments_accessed ON garments (accessed_at)")
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="virtual-library")
+
+    async def alookup(self, keys, user_id=None):
+        """lookup을 라이브러리 전용 스레드에서 실행"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.lookup, keys, user_id)
+
+    async def aadd(self, key: str, url: str):
+        """add를 라이브러리 전용 스레드에서 실행"""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.add, key, url)
+
+    def variants(self, key: str):
+        row = self._conn.execute("SELECT variants FROM garments WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def get(self, key: str, user_id=None):
+        """변형 이미지 URL 하나 반환 (없으면 None)"""
+        return self.lookup([key], user_id)
+
+    def lookup(self, keys, user_id=None):
+        """키 목록을 순서대로 조회해 처음 찾은 항목의 변형 URL 반환 (예: 상황별 항목 -> 카탈로그 항목)"""
+        for key in keys:
+            variants = self.variants(key)
+            if variants:
+                self._conn.execute("UPDATE garments SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                self.hits += 1
+                return variants[zlib.crc32(str(user_id).encode("utf-8")) % len(variants)]
+
+        self.misses += 1
+        return None
+
+    def add(self, key: str, url: str):
+        """변형 추가 (최대 개수를 넘으면 가장 오래된 변형 제거)"""
+        now = time.time()
+        variants = [v for v in self.variants(key) if v != url] + [url]
+        variants = variants[-self.max_variants:]
+        self._conn.execute(
+            "INSERT INTO garments (key, variants, created_at, accessed_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET variants = excluded.variants, accessed_at = excluded.accessed_at",
+            (key, json.dumps(variants), now, now)
+        )
+
+        overflow = len(self) - self.maxsize
+        if overflow > 0:
+            self.evictions += self._conn.execute(
+                "DELETE FROM garments WHERE key IN (SELECT key FROM garments ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            ).rowcount
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM garments").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "max_variants": self.max_variants,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "path": self.path
+        }
@@ -0,0 +1,48 @@
+# 패턴별 프롬프트 매핑
+PATTERN_PROMPTS = {
+    "PLAIN": "solid color, minimal design",
+    "STRIPE": "striped pattern, clean lines",
+    "CHECK": "checkered pattern, classic design",
+    "DOT": "polka dot pattern, playful design",
+    "ANIMAL": "animal print pattern, bold design",
+    "ARTIFACT": "geometric artifact pattern, artistic design",
+    "ETC": "unique pattern, distinctive design",
+    "NATURE": "nature-inspired pattern, organic design",
+    "GEOMETRIC": "geometric pattern, modern design",
+    "PLANT": "floral pattern, botanical design",
+    "SYMBOL": "symbolic pattern, meaningful design"
+}
+
+# 톤별 색상 매핑
+TONE_PROMPTS = {
+    "LIGHT": "light colors, pastel tones, soft hues",
+    "DARK": "dark colors, deep tones, rich hues",
+    "NOT_CONSIDERED": "neutral colors, balanced tones"
+}
+
+# 옷 종류별 프롬프트
+CLOTHING_PROMPTS = {
+    "BLOUSE": "elegant blouse, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "SHIRT": "classic shirt, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "TSHIRT": "stylish t-shirt, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "SWEATER": "comfortable sweater, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "CARDIGAN": "elegant cardigan, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "JACKET": "stylish jacket, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "COAT": "elegant coat, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "JEANS": "classic jeans, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic denim texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "PANTS": "elegant pants, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "SKIRT": "stylish skirt, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "DRESS": "elegant dress, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment",
+    "JUMPSUIT": "stylish jumpsuit, top view, perfectly straight, laid flat, fully spread out, no folds, no wrinkles, no creases, centered, on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment"
+}
+
+
+def build_virtual_clothing_prompt(clothing_type, pattern, tone, description=""):
+    """DALL-E 가상 옷 생성 프롬프트"""
+    base_prompt = CLOTHING_PROMPTS.get(clothing_type, f"{clothing_type.lower()} laid flat on pure white background, professional product photography, high quality, realistic fabric texture, photorealistic, not illustration, not drawing, real clothing, no person, just the garment")
+    pattern_prompt = PATTERN_PROMPTS.get(pattern, "solid color, minimal design")
+    tone_prompt = TONE_PROMPTS.get(tone, "neutral colors, balanced tones")
+
+    # 상세 설명 추가
+    prompt = f"{base_prompt}, {pattern_prompt}, {tone_prompt}"
+    return f"{prompt}, {description}" if description else prompt
@@ -26,6 +26,7 @@ import com.fitu.fitu.global.error.exception.BusinessException;
 import com.fitu.fitu.infra.ai.ClothesAiModelClient;
 import com.fitu.fitu.infra.ai.clothes.AiAnalysisResponse;
 import com.fitu.fitu.infra.ai.clothes.AiClothesAnalysisResult;
+import com.fitu.fitu.infra.ai.recommendation.AiClosetCacheClient;
 import com.fitu.fitu.infra.s3.ClothesS3Service;
 
 import lombok.RequiredArgsConstructor;
@@ -39,6 +40,7 @@ public class ClothesService {
     private final ClothesRepository clothesRepository;
     private final ClothesS3Service s3Service;
     private final ClothesAiModelClient aiModelClient;
+    private final AiClosetCacheClient aiClosetCacheClient;
 
     public AiAnalysisResponse analyzeClothes(final MultipartFile clothesImage) {
 
@@ -136,6 +138,8 @@ public class ClothesService {
                         clothesItem.color());
             }
 
+            aiClosetCacheClient.invalidateClosetCache(userId);
+
         } catch (Exception e) {
             log.error("의류 및 사용자 정보 저장 중 오류 발생 - 오류: {}", e.getMessage(), e);
             throw e;
@@ -266,6 +270,8 @@ public class ClothesService {
 
             final Clothes updatedClothes = clothesRepository.save(existingClothes);
 
+            aiClosetCacheClient.invalidateClosetCache(userId);
+
             return ClothesUpdateResponse.success(
                     updatedClothes.getId(),
                     updatedClothes.getImageUrl(),
@@ -299,6 +305,8 @@ public class ClothesService {
 
             clothesRepository.delete(clothes);
 
+            aiClosetCacheClient.invalidateClosetCache(userId);
+
         } catch (Exception e) {
             log.error("의류 삭제 중 오류 발생 - 의류 ID: {}, 사용자 ID: {}, 오류: {}",
                     clothesId, userId, e.getMessage(), e);
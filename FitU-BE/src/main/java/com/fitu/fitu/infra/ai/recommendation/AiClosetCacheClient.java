@@ -0,0 +1,49 @@
+package com.fitu.fitu.infra.ai.recommendation;
+
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+import org.springframework.transaction.support.TransactionSynchronization;
+import org.springframework.transaction.support.TransactionSynchronizationManager;
+import org.springframework.web.client.RestClientException;
+import org.springframework.web.client.RestTemplate;
+
+import lombok.RequiredArgsConstructor;
+import lombok.extern.slf4j.Slf4j;
+
+@Slf4j
+@RequiredArgsConstructor
+@Component
+public class AiClosetCacheClient {
+
+    private final RestTemplate restTemplate;
+
+    @Value("${infra.ai.api.recommendation.closet-cache-url}")
+    private String closetCacheUrl;
+
+    /**
+     * AI 추천 서버의 옷장 스냅샷 캐시 무효화
+     * 트랜잭션 안에서 호출되면 커밋 이후에 무효화하여 이전 데이터가 다시 캐시되지 않도록 함
+     */
+    public void invalidateClosetCache(final String userId) {
+        if (TransactionSynchronizationManager.isSynchronizationActive()) {
+            TransactionSynchronizationManager.registerSynchronization(new TransactionSynchronization() {
+                @Override
+                public void afterCommit() {
+                    requestInvalidation(userId);
+                }
+            });
+            return;
+        }
+
+        requestInvalidation(userId);
+    }
+
+    private void requestInvalidation(final String userId) {
+        try {
+            restTemplate.delete(closetCacheUrl + "/{userId}", userId);
+        } catch (RestClientException e) {
+            // 캐시는 TTL로도 만료되므로 실패해도 의류 처리 흐름은 유지
+            log.warn("AI 옷장 캐시 무효화 실패 - 사용자 ID: {}, 오류: {}", userId, e.getMessage());
+        }
+    }
+}